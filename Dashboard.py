@@ -2,18 +2,68 @@
 
 # dashboard_retraites_drom_com.py
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+import importlib
+import sys
 import time
-import random
+import threading
+import gzip
+import io
+from collections import OrderedDict
 import warnings
 from functools import lru_cache
+import instrumentation
+from ingestion import IngestionError, ingest_pension_file
+from pension_simulator import REFERENCE_RULES, SimulationError, simulate_pension_file, simulate_pensions
+from projections import projection_by_bracket, projection_frame, scenario_parameters, simulate_projection_bands
+from reform_engine import REFORM_PRESETS, ReformEngine, get_reform_engine, load_career_cohorts
+from retraites_engine import (
+    DEFAULT_SEED,
+    LIVE_REFRESH_SECONDS,
+    MONTE_CARLO_WORKERS,
+    apply_live_ticks,
+    dataframe_memory_bytes,
+    generate_comparison_data,
+    generate_current_data,
+    generate_historical_data,
+    get_live_ticker,
+    get_rng,
+    get_simulation_pool,
+    get_territories_definitions,
+    get_territory_store,
+    get_warm_up,
+    has_real_data,
+    memory_report
+)
 warnings.filterwarnings('ignore')
 
+
+class LazyModule:
+    """Module importé au premier accès à l'un de ses attributs
+    
+    plotly.express coûte à lui seul ~0,3 s d'import : il n'est chargé qu'à la construction
+    du premier graphique, pas au démarrage de chaque worker.
+    """
+    
+    def __init__(self, nom):
+        self._nom = nom
+        self._module = None
+    
+    def __getattr__(self, attribut):
+        if self._module is None:
+            # Chaque exécution du script recrée le proxy : seul le premier import est mesuré
+            self._module = sys.modules.get(self._nom)
+        if self._module is None:
+            with instrumentation.measure(f'import/{self._nom}'):
+                self._module = importlib.import_module(self._nom)
+        return getattr(self._module, attribut)
+
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+
 # Configuration de la page
 st.set_page_config(
     page_title="Dashboard Retraites - DROM-COM",
@@ -22,6 +72,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Export Prometheus démarré dès la première exécution du script, avant tout rendu, et
+# non à l'ouverture du panneau d'instrumentation ; rien si désactivé
+instrumentation.get_metrics_server()
+
 # CSS personnalisé
 st.markdown("""
 <style>
@@ -128,473 +182,135 @@ if 'selected_territory' not in st.session_state:
     st.session_state.selected_territory = 'REUNION'
 if 'last_update' not in st.session_state:
     st.session_state.last_update = datetime.now()
+if 'seed' not in st.session_state:
+    st.session_state.seed = DEFAULT_SEED
+if 'auto_refresh' not in st.session_state:
+    st.session_state.auto_refresh = False
+if 'lazy_sections' not in st.session_state:
+    st.session_state.lazy_sections = True
+if 'section_timings' not in st.session_state:
+    st.session_state.section_timings = {}
 
-# Fonctions globales avec cache pour éviter les problèmes de hashage
-@st.cache_data(ttl=3600)
-def get_territories_definitions():
-    """Définit les territoires DROM-COM"""
-    return {
-        'REUNION': {
-            'nom_complet': 'La Réunion',
-            'type': 'DROM',
-            'population': 860000,
-            'superficie': 2511,
-            'pib': 19.8,
-            'drapeau': 'reunion-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 180000,
-            'montant_moyen_retraite': 1250
-        },
-        'GUADELOUPE': {
-            'nom_complet': 'Guadeloupe',
-            'type': 'DROM',
-            'population': 384000,
-            'superficie': 1628,
-            'pib': 9.1,
-            'drapeau': 'guadeloupe-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 85000,
-            'montant_moyen_retraite': 1180
-        },
-        'MARTINIQUE': {
-            'nom_complet': 'Martinique',
-            'type': 'DROM',
-            'population': 376000,
-            'superficie': 1128,
-            'pib': 8.9,
-            'drapeau': 'martinique-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 82000,
-            'montant_moyen_retraite': 1200
-        },
-        'GUYANE': {
-            'nom_complet': 'Guyane',
-            'type': 'DROM',
-            'population': 290000,
-            'superficie': 83534,
-            'pib': 4.8,
-            'drapeau': 'guyane-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 45000,
-            'montant_moyen_retraite': 1150
-        },
-        'MAYOTTE': {
-            'nom_complet': 'Mayotte',
-            'type': 'DROM',
-            'population': 270000,
-            'superficie': 374,
-            'pib': 2.4,
-            'drapeau': 'mayotte-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 28000,
-            'montant_moyen_retraite': 950
-        },
-        'STPIERRE': {
-            'nom_complet': 'Saint-Pierre-et-Miquelon',
-            'type': 'COM',
-            'population': 6000,
-            'superficie': 242,
-            'pib': 0.2,
-            'drapeau': 'spierre-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 1500,
-            'montant_moyen_retraite': 1350
-        },
-        'STBARTH': {
-            'nom_complet': 'Saint-Barthélemy',
-            'type': 'COM',
-            'population': 10000,
-            'superficie': 21,
-            'pib': 0.6,
-            'drapeau': 'stbarth-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 2200,
-            'montant_moyen_retraite': 1650
-        },
-        'STMARTIN': {
-            'nom_complet': 'Saint-Martin',
-            'type': 'COM',
-            'population': 32000,
-            'superficie': 54,
-            'pib': 0.9,
-            'drapeau': 'stmartin-flag',
-            'monnaie': 'EUR',
-            'retraites_actif': True,
-            'nombre_retraites': 6500,
-            'montant_moyen_retraite': 1400
-        },
-        'WALLIS': {
-            'nom_complet': 'Wallis-et-Futuna',
-            'type': 'COM',
-            'population': 11500,
-            'superficie': 142,
-            'pib': 0.2,
-            'drapeau': 'wallis-flag',
-            'monnaie': 'XPF',
-            'retraites_actif': True,
-            'nombre_retraites': 1800,
-            'montant_moyen_retraite': 950
-        },
-        'POLYNESIE': {
-            'nom_complet': 'Polynésie française',
-            'type': 'COM',
-            'population': 280000,
-            'superficie': 4167,
-            'pib': 7.2,
-            'drapeau': 'polynesie-flag',
-            'monnaie': 'XPF',
-            'retraites_actif': True,
-            'nombre_retraites': 52000,
-            'montant_moyen_retraite': 1100
-        },
-        'CALEDONIE': {
-            'nom_complet': 'Nouvelle-Calédonie',
-            'type': 'COM',
-            'population': 271000,
-            'superficie': 18575,
-            'pib': 9.7,
-            'drapeau': 'caledonie-flag',
-            'monnaie': 'XPF',
-            'retraites_actif': True,
-            'nombre_retraites': 48000,
-            'montant_moyen_retraite': 1250
-        }
-    }
+class FigureCache:
+    """Cache LRU des figures Plotly, borné en nombre d'entrées et en taille sérialisée
 
-@st.cache_data(ttl=3600)
-def get_categories_retraites(territory_code):
-    """Définit les catégories de retraites pour un territoire donné"""
-    # Facteurs d'ajustement selon le territoire
-    territory_factor = {
-        'REUNION': 1.0,
-        'GUADELOUPE': 0.95,
-        'MARTINIQUE': 0.9,
-        'GUYANE': 0.7,
-        'MAYOTTE': 0.5,
-        'STPIERRE': 1.1,
-        'STBARTH': 1.3,
-        'STMARTIN': 1.2,
-        'WALLIS': 0.8,
-        'POLYNESIE': 0.85,
-        'CALEDONIE': 0.9
-    }
+    Il accueille aussi les calculs coûteux qui alimentent plusieurs figures (size_of
+    donne alors leur taille), pour qu'ils partagent la même borne mémoire.
+    """
     
-    factor = territory_factor.get(territory_code, 1.0)
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
     
-    # Catégories de base avec ajustements selon le territoire
-    categories_base = {
-        'RETRAITE_GENERALE': {
-            'nom_complet': 'Retraite générale CNAV',
-            'categorie': 'Régime général',
-            'sous_categorie': 'Retraite de base',
-            'montant_moyen': 1250 * factor,
-            'nombre_beneficiaires': 120000 * factor,
-            'couleur': '#28a745',
-            'poids_total': 45.2 * factor,
-            'evolution_annuelle': 2.3,
-            'description': 'Retraite du régime général de la sécurité sociale'
-        },
-        'RETRAITE_COMPLEMENTAIRE': {
-            'nom_complet': 'Retraite complémentaire AGIRC-ARRCO',
-            'categorie': 'Régime complémentaire',
-            'sous_categorie': 'Points de retraite',
-            'montant_moyen': 650 * factor,
-            'nombre_beneficiaires': 95000 * factor,
-            'couleur': '#20c997',
-            'poids_total': 25.8 * factor,
-            'evolution_annuelle': 2.8,
-            'description': 'Retraite complémentaire des salariés du secteur privé'
-        },
-        'RETRAITE_FONCTIONNAIRE': {
-            'nom_complet': 'Retraite fonction publique',
-            'categorie': 'Régime spécial',
-            'sous_categorie': 'Fonctionnaires',
-            'montant_moyen': 2200 * factor,
-            'nombre_beneficiaires': 35000 * factor,
-            'couleur': '#fd7e14',
-            'poids_total': 18.5 * factor,
-            'evolution_annuelle': 1.9,
-            'description': 'Retraite des fonctionnaires de l\'État, territoriaux et hospitaliers'
-        },
-        'RETRAITE_AGRICOLE': {
-            'nom_complet': 'Retraite agricole MSA',
-            'categorie': 'Régime spécial',
-            'sous_categorie': 'Agriculteurs',
-            'montant_moyen': 850 * factor,
-            'nombre_beneficiaires': 15000 * factor,
-            'couleur': '#6f42c1',
-            'poids_total': 5.3 * factor,
-            'evolution_annuelle': 1.5,
-            'description': 'Retraite du régime agricole'
-        },
-        'RETRAITE_ARTISANALE': {
-            'nom_complet': 'Retraite artisans SSI',
-            'categorie': 'Régime spécial',
-            'sous_categorie': 'Artisans',
-            'montant_moyen': 950 * factor,
-            'nombre_beneficiaires': 12000 * factor,
-            'couleur': '#dc3545',
-            'poids_total': 4.2 * factor,
-            'evolution_annuelle': 1.8,
-            'description': 'Retraite des artisans et commerçants'
-        },
-        'RETRAITE_INVALIDITE': {
-            'nom_complet': 'Pension d\'invalidité',
-            'categorie': 'Pensions spécifiques',
-            'sous_categorie': 'Invalidité',
-            'montant_moyen': 800 * factor,
-            'nombre_beneficiaires': 8000 * factor,
-            'couleur': '#ffc107',
-            'poids_total': 2.7 * factor,
-            'evolution_annuelle': 0.8,
-            'description': 'Pension d\'invalidité pour incapacité de travail'
-        },
-        'RETRAITE_VEUVAGE': {
-            'nom_complet': 'Pension de veuvage',
-            'categorie': 'Pensions spécifiques',
-            'sous_categorie': 'Veuvage',
-            'montant_moyen': 600 * factor,
-            'nombre_beneficiaires': 18000 * factor,
-            'couleur': '#6610f2',
-            'poids_total': 3.8 * factor,
-            'evolution_annuelle': -0.5,
-            'description': 'Pension versée au conjoint survivant'
-        },
-        'RETRAITE_ORPHELIN': {
-            'nom_complet': 'Pension d\'orphelin',
-            'categorie': 'Pensions spécifiques',
-            'sous_categorie': 'Orphelin',
-            'montant_moyen': 300 * factor,
-            'nombre_beneficiaires': 5000 * factor,
-            'couleur': '#e83e8c',
-            'poids_total': 0.8 * factor,
-            'evolution_annuelle': -1.2,
-            'description': 'Pension versée aux enfants de parents décédés'
-        },
-        'RETRAITE_MINIMUM_VIEILLESSE': {
-            'nom_complet': 'Minimum vieillesse (ASPA)',
-            'categorie': 'Solidarité',
-            'sous_categorie': 'Minimum vieillesse',
-            'montant_moyen': 750 * factor,
-            'nombre_beneficiaires': 22000 * factor,
-            'couleur': '#0066CC',
-            'poids_total': 5.5 * factor,
-            'evolution_annuelle': 3.2,
-            'description': 'Allocation de solidarité aux personnes âgées'
-        },
-        'RETRAITE_COMPLEMENTAIRE_VOLONTAIRE': {
-            'nom_complet': 'Retraite complémentaire volontaire',
-            'categorie': 'Épargne retraite',
-            'sous_categorie': 'PER, Madelin...',
-            'montant_moyen': 450 * factor,
-            'nombre_beneficiaires': 15000 * factor,
-            'couleur': '#17a2b8',
-            'poids_total': 2.2 * factor,
-            'evolution_annuelle': 4.5,
-            'description': 'Dispositifs d\'épargne retraite volontaire'
-        }
-    }
-    
-    # Ajustements spécifiques selon le territoire
-    if territory_code == 'POLYNESIE':
-        categories_base['RETRAITE_POLYNESIE'] = {
-            'nom_complet': 'Régime de retraite polynésien',
-            'categorie': 'Régime local',
-            'sous_categorie': 'Retraite locale',
-            'montant_moyen': 950 * factor,
-            'nombre_beneficiaires': 25000 * factor,
-            'couleur': '#0077be',
-            'poids_total': 12.0 * factor,
-            'evolution_annuelle': 2.5,
-            'description': 'Régime de retraite spécifique à la Polynésie française'
-        }
-    
-    elif territory_code == 'CALEDONIE':
-        categories_base['RETRAITE_CALEDONIE'] = {
-            'nom_complet': 'Régime de retraite calédonien',
-            'categorie': 'Régime local',
-            'sous_categorie': 'Retraite locale',
-            'montant_moyen': 1100 * factor,
-            'nombre_beneficiaires': 22000 * factor,
-            'couleur': '#8B4513',
-            'poids_total': 10.0 * factor,
-            'evolution_annuelle': 2.2,
-            'description': 'Régime de retraite spécifique à la Nouvelle-Calédonie'
-        }
-    
-    return categories_base
-
-@st.cache_data(ttl=1800)
-def generate_historical_data(territory_code, categories):
-    """Génère les données historiques optimisées"""
-    dates = pd.date_range('2015-01-01', datetime.now(), freq='M')
-    data = []
-    
-    for date in dates:
-        # Impact des réformes des retraites
-        if date.year == 2019:
-            reforme_impact = random.uniform(1.0, 1.1)
-        elif date.year == 2020:
-            reforme_impact = random.uniform(0.95, 1.05)
-        else:
-            reforme_impact = random.uniform(1.0, 1.05)
+    def get_or_build(self, key, build_figure, size_of=None):
+        """Renvoie la figure associée à la clé, construite seulement en cas d'absence"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
         
-        # Variation saisonnière (généralement faible pour les retraites)
-        seasonal_impact = random.uniform(0.98, 1.02)
-        
-        for categorie_code, info in categories.items():
-            base_pension = info['montant_moyen'] * info['nombre_beneficiaires']
-            pension = base_pension * reforme_impact * seasonal_impact * random.uniform(0.98, 1.02)
-            beneficiaires = info['nombre_beneficiaires'] * random.uniform(0.99, 1.01)
-            
-            data.append({
-                'date': date,
-                'territoire': territory_code,
-                'categorie': categorie_code,
-                'montant_total_pensions': pension,
-                'nombre_beneficiaires': beneficiaires,
-                'montant_moyen': pension / beneficiaires,
-                'categorie_principale': info['categorie'],
-                'evolution_mensuelle': random.uniform(-0.5, 0.5)
-            })
-    
-    return pd.DataFrame(data)
-
-@st.cache_data(ttl=300)
-def generate_current_data(territory_code, categories, historical_data):
-    """Génère les données courantes optimisées"""
-    current_data = []
-    
-    for categorie_code, info in categories.items():
-        # Dernières données historiques
-        last_data = historical_data[historical_data['categorie'] == categorie_code].iloc[-1]
-        
-        # Variation mensuelle simulée
-        change_pct = random.uniform(-0.03, 0.03)
-        change_abs = last_data['montant_total_pensions'] * change_pct
-        
-        current_data.append({
-            'territoire': territory_code,
-            'categorie': categorie_code,
-            'nom_complet': info['nom_complet'],
-            'categorie_principale': info['categorie'],
-            'montant_mensuel': last_data['montant_total_pensions'] + change_abs,
-            'variation_pct': change_pct * 100,
-            'variation_abs': change_abs,
-            'nombre_beneficiaires': last_data['nombre_beneficiaires'] * random.uniform(0.99, 1.01),
-            'montant_moyen': info['montant_moyen'] * random.uniform(0.98, 1.02),
-            'poids_total': info['poids_total'],
-            'montant_annee_precedente': last_data['montant_total_pensions'] * random.uniform(0.95, 1.05),
-            'projection_annee_courante': last_data['montant_total_pensions'] * random.uniform(1.02, 1.04)
-        })
-    
-    return pd.DataFrame(current_data)
+        fig = build_figure()
+        # La taille JSON sert à borner le cache ; on garde l'objet Figure car le
+        # reconstruire depuis le JSON coûte plus cher que de le réutiliser tel quel
+        size = size_of(fig) if size_of is not None else len(fig.to_json())
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (fig, size)
+                self.total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return fig
 
-@st.cache_data(ttl=600)
-def generate_age_data(territory_code):
-    """Génère les données par tranche d'âge optimisées"""
-    age_ranges = [
-        {'tranche_age': '55-59 ans', 'nombre_beneficiaires': 5000, 'montant_moyen': 800},
-        {'tranche_age': '60-64 ans', 'nombre_beneficiaires': 15000, 'montant_moyen': 950},
-        {'tranche_age': '65-69 ans', 'nombre_beneficiaires': 35000, 'montant_moyen': 1200},
-        {'tranche_age': '70-74 ans', 'nombre_beneficiaires': 40000, 'montant_moyen': 1250},
-        {'tranche_age': '75-79 ans', 'nombre_beneficiaires': 30000, 'montant_moyen': 1300},
-        {'tranche_age': '80-84 ans', 'nombre_beneficiaires': 20000, 'montant_moyen': 1350},
-        {'tranche_age': '85-89 ans', 'nombre_beneficiaires': 12000, 'montant_moyen': 1400},
-        {'tranche_age': '90+ ans', 'nombre_beneficiaires': 8000, 'montant_moyen': 1450}
-    ]
-    
-    # Ajustement selon le territoire
-    territory_factor = {
-        'REUNION': 1.0, 'GUADELOUPE': 0.95, 'MARTINIQUE': 0.9, 'GUYANE': 0.7,
-        'MAYOTTE': 0.5, 'STPIERRE': 0.3, 'STBARTH': 0.4, 'STMARTIN': 0.45,
-        'WALLIS': 0.25, 'POLYNESIE': 0.8, 'CALEDONIE': 0.85
-    }
-    
-    factor = territory_factor.get(territory_code, 1.0)
-    for age_range in age_ranges:
-        age_range['nombre_beneficiaires'] *= factor
-        age_range['montant_moyen'] *= factor
-    
-    return pd.DataFrame(age_ranges)
+@st.cache_resource
+def get_figure_cache():
+    """Cache de figures partagé par toutes les sessions du processus"""
+    return FigureCache()
 
-@st.cache_data(ttl=3600)
-def generate_comparison_data(territories):
-    """Génère les données de comparaison entre territoires"""
-    comparison_data = []
-    
-    for territory_code, territory_info in territories.items():
-        if not territory_info['retraites_actif']:
-            continue
-            
-        categories = get_categories_retraites(territory_code)
-        total_pensions = sum(
-            categorie_info['montant_moyen'] * categorie_info['nombre_beneficiaires']
-            for categorie_info in categories.values()
-        )
-        
-        comparison_data.append({
-            'territoire': territory_code,
-            'nom_complet': territory_info['nom_complet'],
-            'type': territory_info['type'],
-            'population': territory_info['population'],
-            'superficie': territory_info['superficie'],
-            'pib': territory_info['pib'],
-            'montant_total_pensions': total_pensions,
-            'nombre_retraites': territory_info['nombre_retraites'],
-            'montant_moyen_retraite': territory_info['montant_moyen_retraite'],
-            'pension_par_habitant': total_pensions / territory_info['population'],
-            'retraites_actif': territory_info['retraites_actif']
-        })
-    
-    return pd.DataFrame(comparison_data)
 
 class RetraitesDashboard:
+    # Sections principales du dashboard et méthode qui construit chacune d'elles
+    SECTIONS = {
+        "Vue d'ensemble": 'create_retraites_overview',
+        "Catégories en direct": 'create_categories_live',
+        "Analyse par catégorie": 'create_categorie_analysis',
+        "Évolution et projections": 'create_evolution_analysis',
+        "Comparaison territoires": 'create_comparison_territories'
+    }
+    
     def __init__(self):
         self.territories = get_territories_definitions()
         
+    @instrumentation.timed()
     def get_territory_data(self, territory_code):
-        """Récupère les données d'un territoire avec cache"""
-        if territory_code not in st.session_state.territories_data:
+        """Récupère les données d'un territoire depuis le stockage partagé"""
+        seed = st.session_state.seed
+        store = get_territory_store()
+        if (territory_code, seed) in store:
+            shared = store.get(territory_code, seed)
+        else:
             with st.spinner(f"Chargement des données pour {self.territories[territory_code]['nom_complet']}..."):
-                categories = get_categories_retraites(territory_code)
-                historical_data = generate_historical_data(territory_code, categories)
-                current_data = generate_current_data(territory_code, categories, historical_data)
-                age_data = generate_age_data(territory_code)
-                
-                st.session_state.territories_data[territory_code] = {
-                    'categories': categories,
-                    'historical_data': historical_data,
-                    'current_data': current_data,
-                    'age_data': age_data,
-                    'last_update': datetime.now()
-                }
-        
-        return st.session_state.territories_data[territory_code]
+                shared = store.get(territory_code, seed)
+        
+        # La session ne conserve que ses propres mises à jour en direct
+        session = st.session_state.territories_data.get(territory_code)
+        if session is None or session['seed'] != seed or session['history_end'] != shared['history_end']:
+            session = {
+                'seed': seed,
+                'history_end': shared['history_end'],
+                'live_ticks': 0,
+                'current_data': None,
+                'last_update': datetime.now()
+            }
+            st.session_state.territories_data[territory_code] = session
+        
+        # Les mises à jour forment une seule séquence : dès que l'état partagé a rattrapé
+        # la session, sa copie locale est identique et peut être libérée
+        if session['live_ticks'] <= shared['live_ticks']:
+            session['current_data'] = None
+            session['live_ticks'] = shared['live_ticks']
+            data = {**shared, 'current_data': shared['live_data'], 'seed': seed}
+        else:
+            data = {
+                **shared,
+                'current_data': session['current_data'],
+                'seed': seed,
+                'live_ticks': session['live_ticks'],
+                'last_update': session['last_update']
+            }
+        
+        # Versions des données, utilisées comme clés du cache de figures
+        data['history_version'] = (territory_code, seed, shared['created'], shared['history_end'])
+        data['live_version'] = (*data['history_version'], data['live_ticks'])
+        return data
     
-    def update_live_data(self, territory_code):
-        """Met à jour les données en temps réel"""
+    def update_live_data(self, territory_code, n_ticks=1):
+        """Met à jour les données en temps réel (n mises à jour appliquées en un seul lot)
+
+        Renvoie False pour des données réelles, qui ne reçoivent pas de mises à jour simulées.
+        """
         if territory_code in st.session_state.territories_data:
+            visible = self.get_territory_data(territory_code)
+            if visible['donnees_reelles']:
+                return False
             data = st.session_state.territories_data[territory_code]
-            current_data = data['current_data'].copy()
-            
-            # Mise à jour légère des données
-            for idx in current_data.index:
-                if random.random() < 0.3:  # 30% de chance de changement
-                    variation = random.uniform(-0.01, 0.01)
-                    current_data.loc[idx, 'montant_mensuel'] *= (1 + variation)
-                    current_data.loc[idx, 'variation_pct'] = variation * 100
-                    current_data.loc[idx, 'nombre_beneficiaires'] *= random.uniform(0.99, 1.01)
+            # Les données partagées ne sont jamais modifiées : apply_live_ticks renvoie une copie
+            current_data = apply_live_ticks(
+                visible['current_data'], territory_code, data['seed'], visible['live_ticks'], n_ticks
+            )
+            data['live_ticks'] = visible['live_ticks'] + n_ticks
             
             st.session_state.territories_data[territory_code]['current_data'] = current_data
             st.session_state.territories_data[territory_code]['last_update'] = datetime.now()
+        return True
     
     def display_territory_selector(self):
         """Affiche le sélecteur de territoire optimisé"""
@@ -654,10 +370,64 @@ class RetraitesDashboard:
         current_time = datetime.now().strftime('%H:%M:%S')
         st.sidebar.markdown(f"**🕐 Dernière mise à jour: {current_time}**")
     
+    def display_memory_footprint(self):
+        """Affiche l'empreinte mémoire de la session et du stockage partagé"""
+        session_bytes = dataframe_memory_bytes(*(
+            session['current_data'] for session in st.session_state.territories_data.values()
+        ))
+        shared_bytes = get_territory_store().memory_bytes()
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            instrumentation.record_session_memory(ctx.session_id, session_bytes)
+        
+        st.sidebar.markdown(f"**💾 Mémoire session:** {session_bytes/1e3:.1f} Ko")
+        st.sidebar.markdown(f"**🗄️ Données partagées:** {shared_bytes/1e6:.1f} Mo")
+        
+        historical_data = self.get_territory_data(st.session_state.selected_territory)['historical_data']
+        with st.sidebar.expander("📏 Mémoire de l'historique"):
+            st.dataframe(memory_report(historical_data), use_container_width=True)
+    
+    def display_data_import(self):
+        """Importe un export réel de paiements de pensions (CSV ou Excel)"""
+        source = "données réelles importées" if has_real_data(st.session_state.selected_territory) else "données simulées"
+        st.sidebar.markdown(f"**📂 Source:** {source}")
+        
+        with st.sidebar.expander("📥 Importer un export de pensions"):
+            fichier = st.file_uploader("Export CSV ou Excel:", type=['csv', 'xlsx'], key="import_export_pensions")
+            if fichier is not None and st.button("Lancer l'ingestion"):
+                suivi = st.empty()
+                try:
+                    rapport = ingest_pension_file(
+                        fichier, progress=lambda lignes, debit: suivi.markdown(f"{lignes:,} lignes ({debit:,.0f} lignes/s)")
+                    )
+                except IngestionError as exc:
+                    # Territoires écrits avant l'échec : leurs nouvelles données doivent être relues
+                    self.reload_imported_territories(exc.territoires)
+                    st.error(f"❌ {exc}")
+                    return
+                
+                self.reload_imported_territories(rapport['territoires'])
+                st.success(f"""
+                **Ingestion terminée:**
+                - Territoires: {', '.join(rapport['territoires']) or 'aucun'}
+                - Lignes lues: {rapport['lignes_lues']:,} (rejetées: {rapport['lignes_rejetees']:,})
+                - Débit: {rapport['lignes_par_s']:,.0f} lignes/s
+                """)
+    
+    def reload_imported_territories(self, territory_codes):
+        """Les caches et le stockage partagé relisent les territoires importés"""
+        if not territory_codes:
+            return
+        generate_historical_data.clear()
+        generate_current_data.clear()
+        for territory_code in territory_codes:
+            get_territory_store().invalidate(territory_code)
+    
     def display_key_metrics(self):
         """Affiche les métriques clés des retraites"""
         data = self.get_territory_data(st.session_state.selected_territory)
         current_data = data['current_data']
+        rng = get_rng(st.session_state.selected_territory, data['seed'], 'metriques', data['live_ticks'])
         
         st.markdown('<h3 class="section-header">📊 INDICATEURS CLÉS DES RETRAITES</h3>', 
                    unsafe_allow_html=True)
@@ -686,21 +456,21 @@ class RetraitesDashboard:
             st.metric(
                 "Montant Annuel Projeté",
                 f"{montant_annuel_projete/1e6:.1f} M€",
-                f"{random.uniform(1, 4):.1f}% vs année précédente"
+                f"{rng.uniform(1, 4):.1f}% vs année précédente"
             )
         
         with col3:
             st.metric(
                 "Nombre de Bénéficiaires",
                 f"{beneficiaires_total:,.0f}",
-                f"{random.randint(-2, 5)}% vs mois dernier"
+                f"{rng.integers(-2, 6)}% vs mois dernier"
             )
         
         with col4:
             st.metric(
                 "Pension Moyenne",
                 f"{montant_total/beneficiaires_total:.0f} €",
-                f"{random.uniform(-1, 3):.1f}% vs période précédente"
+                f"{rng.uniform(-1, 3):.1f}% vs période précédente"
             )
         
         # Métriques spécifiques au territoire
@@ -710,21 +480,21 @@ class RetraitesDashboard:
             st.metric(
                 "Pension par Habitant",
                 f"{pension_par_habitant:.0f} €",
-                f"{random.uniform(-5, 5):.1f}% vs moyenne DROM-COM"
+                f"{rng.uniform(-5, 5):.1f}% vs moyenne DROM-COM"
             )
         
         with col2:
             st.metric(
                 "Taux de Couverture",
                 f"{(beneficiaires_total/territory_info['population'])*100:.1f}%",
-                f"{random.uniform(-1, 2):.1f}% vs objectif"
+                f"{rng.uniform(-1, 2):.1f}% vs objectif"
             )
         
         with col3:
             st.metric(
                 "Contribution au PIB",
                 f"{(montant_annuel_projete/territory_info['pib']/1e6)*100:.2f}%",
-                f"{random.uniform(-1, 3):.1f}% vs objectif"
+                f"{rng.uniform(-1, 3):.1f}% vs objectif"
             )
     
     def create_retraites_overview(self):
@@ -740,95 +510,96 @@ class RetraitesDashboard:
             col1, col2 = st.columns(2)
             
             with col1:
-                # Évolution des montants totaux
-                evolution_totale = data['historical_data'].groupby('date')['montant_total_pensions'].sum().reset_index()
-                evolution_totale['montant_mensuel_M'] = evolution_totale['montant_total_pensions'] / 1e6
-                
-                fig = px.line(evolution_totale, 
-                             x='date', 
-                             y='montant_mensuel_M',
-                             title=f'Évolution des Montants - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
-                             color_discrete_sequence=['#0055A4'])
-                fig.update_layout(yaxis_title="Montants (Millions €)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def evolution_montants():
+                    # Évolution des montants totaux
+                    fig = px.line(data['aggregates']['totaux_mensuels'], 
+                                 x='date', 
+                                 y='montant_mensuel_M',
+                                 title=f'Évolution des Montants - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
+                                 color_discrete_sequence=['#0055A4'])
+                    fig.update_layout(yaxis_title="Montants (Millions €)")
+                    return fig
+                self.plot_chart('overview_evolution_montants', data['history_version'], evolution_montants)
             
             with col2:
-                # Performance par catégorie
-                performance_categories = data['current_data'].groupby('categorie_principale').agg({
-                    'variation_pct': 'mean',
-                    'montant_mensuel': 'sum'
-                }).reset_index()
-                
-                fig = px.bar(performance_categories, 
-                            x='categorie_principale', 
-                            y='variation_pct',
-                            title='Performance Mensuelle par Catégorie (%)',
-                            color='categorie_principale',
-                            color_discrete_sequence=px.colors.qualitative.Set3)
-                fig.update_layout(yaxis_title="Variation (%)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def performance_categories():
+                    # Performance par catégorie
+                    performance_categories = data['current_data'].groupby('categorie_principale').agg({
+                        'variation_pct': 'mean',
+                        'montant_mensuel': 'sum'
+                    }).reset_index()
+                    
+                    fig = px.bar(performance_categories, 
+                                x='categorie_principale', 
+                                y='variation_pct',
+                                title='Performance Mensuelle par Catégorie (%)',
+                                color='categorie_principale',
+                                color_discrete_sequence=px.colors.qualitative.Set3)
+                    fig.update_layout(yaxis_title="Variation (%)")
+                    return fig
+                self.plot_chart('overview_performance', data['live_version'], performance_categories)
         
         with tab2:
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.pie(data['current_data'], 
-                            values='montant_mensuel', 
-                            names='categorie',
-                            title='Répartition des Montants par Catégorie',
-                            color_discrete_sequence=px.colors.qualitative.Set3)
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('overview_repartition', data['live_version'], lambda: px.pie(
+                    data['current_data'], 
+                    values='montant_mensuel', 
+                    names='categorie',
+                    title='Répartition des Montants par Catégorie',
+                    color_discrete_sequence=px.colors.qualitative.Set3))
             
             with col2:
-                fig = px.bar(data['current_data'], 
-                            x='categorie', 
-                            y='nombre_beneficiaires',
-                            title='Nombre de Bénéficiaires par Catégorie',
-                            color_discrete_sequence=px.colors.qualitative.Set3)
-                fig.update_layout(yaxis_title="Nombre de Bénéficiaires")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def beneficiaires_categories():
+                    fig = px.bar(data['current_data'], 
+                                x='categorie', 
+                                y='nombre_beneficiaires',
+                                title='Nombre de Bénéficiaires par Catégorie',
+                                color_discrete_sequence=px.colors.qualitative.Set3)
+                    fig.update_layout(yaxis_title="Nombre de Bénéficiaires")
+                    return fig
+                self.plot_chart('overview_beneficiaires', data['live_version'], beneficiaires_categories)
         
         with tab3:
             col1, col2 = st.columns(2)
             
             with col1:
-                top_categories = data['current_data'].nlargest(10, 'montant_mensuel')
-                fig = px.bar(top_categories, 
-                            x='montant_mensuel', 
-                            y='categorie',
-                            orientation='h',
-                            title='Top 10 des Catégories par Montant Total',
-                            color='montant_mensuel',
-                            color_continuous_scale='Blues')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('overview_top_montants', data['live_version'], lambda: px.bar(
+                    data['current_data'].nlargest(10, 'montant_mensuel'), 
+                    x='montant_mensuel', 
+                    y='categorie',
+                    orientation='h',
+                    title='Top 10 des Catégories par Montant Total',
+                    color='montant_mensuel',
+                    color_continuous_scale='Blues'))
             
             with col2:
-                top_croissance = data['current_data'].nlargest(10, 'variation_pct')
-                fig = px.bar(top_croissance, 
-                            x='variation_pct', 
-                            y='categorie',
-                            orientation='h',
-                            title='Top 10 des Croissances par Catégorie (%)',
-                            color='variation_pct',
-                            color_continuous_scale='Greens')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('overview_top_croissances', data['live_version'], lambda: px.bar(
+                    data['current_data'].nlargest(10, 'variation_pct'), 
+                    x='variation_pct', 
+                    y='categorie',
+                    orientation='h',
+                    title='Top 10 des Croissances par Catégorie (%)',
+                    color='variation_pct',
+                    color_continuous_scale='Greens'))
         
         with tab4:
             st.subheader("Analyse par Tranche d'Âge")
             
-            fig = px.bar(data['age_data'], 
-                       x='tranche_age', 
-                       y='nombre_beneficiaires',
-                       title='Nombre de Bénéficiaires par Tranche d\'Âge',
-                       color_discrete_sequence=px.colors.qualitative.Set3)
-            st.plotly_chart(fig, config={'displayModeBar': False})
+            self.plot_chart('overview_age_beneficiaires', data['history_version'], lambda: px.bar(
+                data['age_data'], 
+                x='tranche_age', 
+                y='nombre_beneficiaires',
+                title='Nombre de Bénéficiaires par Tranche d\'Âge',
+                color_discrete_sequence=px.colors.qualitative.Set3))
             
-            fig = px.line(data['age_data'], 
-                        x='tranche_age', 
-                        y='montant_moyen',
-                        title='Montant Moyen par Tranche d\'Âge',
-                        color_discrete_sequence=['#0055A4'])
-            st.plotly_chart(fig, config={'displayModeBar': False})
+            self.plot_chart('overview_age_montant', data['history_version'], lambda: px.line(
+                data['age_data'], 
+                x='tranche_age', 
+                y='montant_moyen',
+                title='Montant Moyen par Tranche d\'Âge',
+                color_discrete_sequence=['#0055A4']))
             
             st.dataframe(data['age_data'], use_container_width=True)
     
@@ -874,30 +645,29 @@ class RetraitesDashboard:
             elif tri_filtre == 'Montant moyen':
                 categories_filtrees = categories_filtrees.sort_values('montant_moyen', ascending=False)
             
-            # Affichage optimisé
-            for _, categorie in categories_filtrees.iterrows():
-                change_class = "positive" if categorie['variation_pct'] > 0 else "negative" if categorie['variation_pct'] < 0 else "neutral"
-                
-                col1, col2, col3, col4, col5 = st.columns([1, 2, 1, 1, 1])
-                with col1:
-                    st.markdown(f"**{categorie['categorie']}**")
-                    st.markdown(f"*{categorie['categorie_principale']}*")
-                with col2:
-                    st.markdown(f"**{categorie['nom_complet']}**")
-                    st.markdown(f"Montant moyen: {categorie['montant_moyen']:.0f}€")
-                with col3:
-                    st.markdown(f"**{categorie['montant_mensuel']/1e6:.1f}M€**")
-                    st.markdown(f"Bénéficiaires: {categorie['nombre_beneficiaires']:,.0f}")
-                with col4:
-                    variation_str = f"{categorie['variation_pct']:+.2f}%"
-                    st.markdown(f"**{variation_str}**")
-                    st.markdown(f"{categorie['variation_abs']/1e3:+.0f}K€")
-                with col5:
-                    st.markdown(f"<div class='pension-change {change_class}'>{variation_str}</div>", 
-                               unsafe_allow_html=True)
-                    st.markdown(f"Poids: {categorie['poids_total']:.1f}%")
-                
-                st.markdown("---")
+            # Un seul tableau (virtualisé par le navigateur), paginé côté serveur
+            tableau = pd.DataFrame({
+                'categorie': categories_filtrees['categorie'],
+                'categorie_principale': categories_filtrees['categorie_principale'],
+                'nom_complet': categories_filtrees['nom_complet'],
+                'montant_mensuel_M': categories_filtrees['montant_mensuel'] / 1e6,
+                'variation_pct': categories_filtrees['variation_pct'],
+                'variation_abs_K': categories_filtrees['variation_abs'] / 1e3,
+                'nombre_beneficiaires': categories_filtrees['nombre_beneficiaires'],
+                'montant_moyen': categories_filtrees['montant_moyen'],
+                'poids_total': categories_filtrees['poids_total']
+            })
+            self.display_grid(tableau, key="tableau_pensions", column_config={
+                'categorie': st.column_config.TextColumn("Code"),
+                'categorie_principale': st.column_config.TextColumn("Catégorie"),
+                'nom_complet': st.column_config.TextColumn("Régime", width="large"),
+                'montant_mensuel_M': st.column_config.NumberColumn("Montant mensuel", format="%.1f M€"),
+                'variation_pct': st.column_config.NumberColumn("Variation", format="%+.2f %%"),
+                'variation_abs_K': st.column_config.NumberColumn("Variation (K€)", format="%+.0f K€"),
+                'nombre_beneficiaires': st.column_config.NumberColumn("Bénéficiaires", format="%.0f"),
+                'montant_moyen': st.column_config.NumberColumn("Montant moyen", format="%.0f €"),
+                'poids_total': st.column_config.ProgressColumn("Poids", format="%.1f %%", min_value=0, max_value=100)
+            }, colorer=['variation_pct', 'variation_abs_K'])
         
         with tab2:
             categorie_selectionnee = st.selectbox("Sélectionnez une catégorie:", 
@@ -911,20 +681,20 @@ class RetraitesDashboard:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig = px.bar(categories_categorie, 
-                                x='categorie', 
-                                y='variation_pct',
-                                title=f'Performance des Catégories - {categorie_selectionnee}',
-                                color='variation_pct',
-                                color_continuous_scale='RdYlGn')
-                    st.plotly_chart(fig, config={'displayModeBar': False})
+                    self.plot_chart('live_performance', (data['live_version'], categorie_selectionnee), lambda: px.bar(
+                        categories_categorie, 
+                        x='categorie', 
+                        y='variation_pct',
+                        title=f'Performance des Catégories - {categorie_selectionnee}',
+                        color='variation_pct',
+                        color_continuous_scale='RdYlGn'))
                 
                 with col2:
-                    fig = px.pie(categories_categorie, 
-                                values='montant_mensuel', 
-                                names='categorie',
-                                title=f'Répartition des Montants - {categorie_selectionnee}')
-                    st.plotly_chart(fig, config={'displayModeBar': False})
+                    self.plot_chart('live_repartition', (data['live_version'], categorie_selectionnee), lambda: px.pie(
+                        categories_categorie, 
+                        values='montant_mensuel', 
+                        names='categorie',
+                        title=f'Répartition des Montants - {categorie_selectionnee}'))
         
         with tab3:
             st.subheader("Simulateur de Calcul de Retraite")
@@ -951,15 +721,16 @@ class RetraitesDashboard:
                     data['current_data']['categorie'] == categorie_selectionnee
                 ].iloc[0]
                 
-                # Calcul simplifié de la pension
-                if type_taux == "Taux plein":
-                    taux = 0.5
-                elif type_taux == "Taux réduit":
-                    taux = 0.4
-                else:  # Décote
-                    taux = max(0.375, 0.5 - (0.625 * max(0, 162 - trimestres_valides) / 162))
-                
-                pension_estimee = salaire_moyen * taux
+                # Même formule que la simulation par lot, sur une carrière
+                resultat = simulate_pensions(pd.DataFrame({
+                    'salaire_moyen': [salaire_moyen],
+                    'trimestres_valides': [trimestres_valides],
+                    'age_depart': [age_depart],
+                    'categorie': [categorie_selectionnee],
+                    'type_calcul': [type_taux]
+                })).iloc[0]
+                taux = resultat['taux']
+                pension_estimee = resultat['pension_mensuelle']
                 
                 st.success(f"""
                 **Résultat du calcul:**
@@ -970,6 +741,41 @@ class RetraitesDashboard:
                 - **Pension mensuelle estimée: {pension_estimee:,.2f}€**
                 - Pension annuelle estimée: {pension_estimee*12:,.2f}€
                 """)
+            
+            self.display_batch_simulation()
+    
+    def display_batch_simulation(self):
+        """Simulation de pensions pour une table de carrières importée (CSV)"""
+        st.markdown("---")
+        st.subheader("Simulation par Lot")
+        st.caption("Colonnes: salaire_moyen, trimestres_valides, age_depart, categorie "
+                   "(type_calcul optionnel : Taux plein, Taux réduit ou Décote)")
+        
+        fichier = st.file_uploader("Table de carrières (CSV):", type=['csv'], key="simulation_lot")
+        if fichier is None or not st.button("Lancer la simulation par lot"):
+            return
+        
+        suivi = st.empty()
+        # Les résultats sont compressés au fil de l'eau : seul le CSV compressé reste en mémoire
+        sortie = io.BytesIO()
+        try:
+            with gzip.GzipFile(fileobj=sortie, mode='wb') as flux:
+                rapport = simulate_pension_file(
+                    fichier, flux, progress=lambda lignes, debit: suivi.markdown(
+                        f"{lignes:,} carrières simulées ({debit:,.0f} carrières/s)")
+                )
+        except (SimulationError, ValueError) as exc:
+            st.error(f"❌ {exc}")
+            return
+        
+        st.success(f"""
+        **Simulation terminée:**
+        - Carrières simulées: {rapport['lignes_ecrites']:,} (rejetées: {rapport['lignes_rejetees']:,})
+        - Durée: {rapport['duree_s']:.2f} s ({rapport['lignes_par_s']:,.0f} carrières/s)
+        """)
+        st.dataframe(rapport['synthese'], use_container_width=True)
+        st.download_button("📥 Télécharger les pensions simulées", data=sortie.getvalue(),
+                           file_name="pensions_simulees.csv.gz", mime="application/gzip")
     
     def create_categorie_analysis(self):
         """Analyse par catégorie détaillée"""
@@ -991,39 +797,36 @@ class RetraitesDashboard:
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.bar(categorie_performance, 
-                            x='categorie_principale', 
-                            y='variation_pct',
-                            title='Performance Moyenne par Catégorie (%)',
-                            color='variation_pct',
-                            color_continuous_scale='RdYlGn')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('analyse_performance', data['live_version'], lambda: px.bar(
+                    categorie_performance, 
+                    x='categorie_principale', 
+                    y='variation_pct',
+                    title='Performance Moyenne par Catégorie (%)',
+                    color='variation_pct',
+                    color_continuous_scale='RdYlGn'))
             
             with col2:
-                fig = px.scatter(categorie_performance, 
-                               x='montant_mensuel', 
-                               y='variation_pct',
-                               size='nombre_beneficiaires',
-                               color='categorie_principale',
-                               title='Performance vs Montants par Catégorie',
-                               hover_name='categorie_principale',
-                               size_max=60)
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('analyse_performance_montants', data['live_version'], lambda: px.scatter(
+                    categorie_performance, 
+                    x='montant_mensuel', 
+                    y='variation_pct',
+                    size='nombre_beneficiaires',
+                    color='categorie_principale',
+                    title='Performance vs Montants par Catégorie',
+                    hover_name='categorie_principale',
+                    size_max=60))
         
         with tab2:
-            categorie_evolution = data['historical_data'].groupby([
-                data['historical_data']['date'].dt.to_period('M').dt.to_timestamp(),
-                'categorie_principale'
-            ])['montant_total_pensions'].sum().reset_index()
-            
-            fig = px.line(categorie_evolution, 
-                         x='date', 
-                         y='montant_total_pensions',
-                         color='categorie_principale',
-                         title=f'Évolution Comparative - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
-                         color_discrete_sequence=px.colors.qualitative.Set3)
-            fig.update_layout(yaxis_title="Montants des Pensions (€)")
-            st.plotly_chart(fig, config={'displayModeBar': False})
+            def evolution_comparative():
+                fig = px.line(data['aggregates']['totaux_categories'], 
+                             x='date', 
+                             y='montant_total_pensions',
+                             color='categorie_principale',
+                             title=f'Évolution Comparative - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
+                             color_discrete_sequence=px.colors.qualitative.Set3)
+                fig.update_layout(yaxis_title="Montants des Pensions (€)")
+                return fig
+            self.plot_chart('analyse_evolution_comparative', data['history_version'], evolution_comparative)
         
         with tab3:
             st.subheader("Tendances et Perspectives par Catégorie")
@@ -1083,124 +886,240 @@ class RetraitesDashboard:
             col1, col2 = st.columns(2)
             
             with col1:
-                cumulative_data = data['historical_data'].copy()
-                cumulative_data['date_group'] = cumulative_data['date'].dt.to_period('M').dt.to_timestamp()
-                monthly_totals = cumulative_data.groupby('date_group')['montant_total_pensions'].sum().reset_index()
-                monthly_totals['cumulative_pensions'] = monthly_totals['montant_total_pensions'].cumsum()
-                
-                fig = px.line(monthly_totals, 
-                             x='date_group', 
-                             y='cumulative_pensions',
-                             title=f'Montants Cumulatifs - {self.territories[st.session_state.selected_territory]["nom_complet"]} (€)')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('evolution_cumul', data['history_version'], lambda: px.line(
+                    data['aggregates']['totaux_mensuels'], 
+                    x='date_group', 
+                    y='cumulative_pensions',
+                    title=f'Montants Cumulatifs - {self.territories[st.session_state.selected_territory]["nom_complet"]} (€)'))
             
             with col2:
-                monthly_heatmap = monthly_totals.copy()
-                monthly_heatmap['annee'] = monthly_heatmap['date_group'].dt.year
-                monthly_heatmap['mois'] = monthly_heatmap['date_group'].dt.month
-                
-                heatmap_data = monthly_heatmap.pivot(index='annee', columns='mois', values='montant_total_pensions')
-                
-                fig = px.imshow(heatmap_data, 
-                               labels=dict(x="Mois", y="Année", color="Montant (€)"),
-                               x=["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc"],
-                               title='Heatmap Mensuel des Montants de Pensions')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plot_chart('evolution_heatmap', data['history_version'], lambda: px.imshow(
+                    data['aggregates']['heatmap'], 
+                    labels=dict(x="Mois", y="Année", color="Montant (€)"),
+                    x=["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc"],
+                    title='Heatmap Mensuel des Montants de Pensions'))
         
         with tab2:
             st.subheader("Projections Démographiques et Impact sur les Retraites")
             
-            # Données de projection simulées
-            years = list(range(2023, 2043))
-            projection_data = []
-            
-            for year in years:
-                # Simulation de l'évolution démographique
-                age_65_plus = data['age_data'][data['age_data']['tranche_age'].str.contains('65+')]['nombre_beneficiaires'].sum()
-                population_65_plus = age_65_plus * (1 + (year - 2023) * 0.02)  # Croissance de 2% par an
-                
-                # Simulation de l'évolution des pensions
-                total_pensions = data['current_data']['montant_mensuel'].sum() * 12
-                projected_pensions = total_pensions * (1 + (year - 2023) * 0.025)  # Croissance de 2.5% par an
-                
-                projection_data.append({
-                    'année': year,
-                    'population_65_plus': population_65_plus,
-                    'montant_total_pensions': projected_pensions,
-                    'pension_moyenne': projected_pensions / population_65_plus
-                })
+            # Paramètres des tranches d'âge, ajustés par les curseurs
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                entrees = st.slider("Entrées supplémentaires (pts/an)", -2.0, 2.0, 0.0, 0.1, key="projection_entrees")
+            with col2:
+                mortalite = st.slider("Mortalité (× taux actuels)", 0.5, 1.5, 1.0, 0.05, key="projection_mortalite")
+            with col3:
+                revalorisation = st.slider("Revalorisation (%/an)", 0.0, 5.0, 2.0, 0.1, key="projection_revalorisation")
             
-            projection_df = pd.DataFrame(projection_data)
+            age_data = data['age_data']
+            parametres = scenario_parameters(
+                age_data,
+                croissance=age_data['croissance'].to_numpy() + entrees / 100,
+                mortalite=age_data['mortalite'].to_numpy() * mortalite,
+                revalorisation=revalorisation / 100
+            )
+            projection_df = projection_frame(age_data, parametres,
+                                             montant_annuel_actuel=data['current_data']['montant_mensuel'].sum() * 12)
+            projection_version = (data['live_version'], entrees, mortalite, revalorisation)
             
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.line(projection_df, 
-                             x='année', 
-                             y='population_65_plus',
-                             title='Projection de la Population de 65+',
-                             color_discrete_sequence=['#0055A4'])
-                fig.update_layout(yaxis_title="Population")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def projection_population():
+                    fig = px.line(projection_df, 
+                                 x='année', 
+                                 y='population_65_plus',
+                                 title='Projection de la Population de 65+',
+                                 color_discrete_sequence=['#0055A4'])
+                    fig.update_layout(yaxis_title="Population")
+                    return fig
+                self.plot_chart('projection_population', projection_version, projection_population)
             
             with col2:
-                fig = px.line(projection_df, 
-                             x='année', 
-                             y='montant_total_pensions',
-                             title='Projection du Montant Total des Pensions',
-                             color_discrete_sequence=['#EF4135'])
-                fig.update_layout(yaxis_title="Montant Total (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def projection_montants():
+                    fig = px.line(projection_df, 
+                                 x='année', 
+                                 y='montant_total_pensions',
+                                 title='Projection du Montant Total des Pensions',
+                                 color_discrete_sequence=['#EF4135'])
+                    fig.update_layout(yaxis_title="Montant Total (€)")
+                    return fig
+                self.plot_chart('projection_montants', projection_version, projection_montants)
+            
+            self.plot_chart('projection_tranches', (data['history_version'], entrees, mortalite), lambda: px.area(
+                projection_by_bracket(age_data, parametres),
+                x='année',
+                y='nombre_beneficiaires',
+                color='tranche_age',
+                title='Projection des Bénéficiaires par Tranche d\'Âge'))
             
             st.dataframe(projection_df, use_container_width=True)
+            
+            self.display_projection_bands(data, parametres, projection_df, projection_version)
         
         with tab3:
             st.subheader("Impact des Réformes des Retraites")
-            
-            # Données simulées d'impact des réformes
-            reformes_data = [
-                {'reforme': 'Réforme 2014 (Touraine)', 'année': 2014, 'impact_pct': 0.8, 'description': 'Allongement de la durée de cotisation'},
-                {'reforme': 'Réforme 2020 (Delevoye)', 'année': 2020, 'impact_pct': 1.2, 'description': 'Système universel par points'},
-                {'reforme': 'Réforme 2023', 'année': 2023, 'impact_pct': 2.5, 'description': 'Report de l\'âge légal de départ'},
-                {'reforme': 'Prochaine réforme', 'année': 2027, 'impact_pct': 1.8, 'description': 'Projet en discussion'}
-            ]
-            
-            reformes_df = pd.DataFrame(reformes_data)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig = px.bar(reformes_df, 
-                            x='reforme', 
-                            y='impact_pct',
-                            title='Impact des Réformes sur les Pensions (%)',
-                            color='impact_pct',
-                            color_continuous_scale='RdYlGn')
-                st.plotly_chart(fig, config={'displayModeBar': False})
-            
-            with col2:
-                fig = px.scatter(reformes_df, 
-                               x='année', 
-                               y='impact_pct',
-                               size='impact_pct',
-                               color='reforme',
-                               title='Chronologie des Réformes et Impact',
-                               hover_name='reforme',
-                               size_max=60)
-                st.plotly_chart(fig, config={'displayModeBar': False})
-            
-            for _, reforme in reformes_df.iterrows():
-                st.markdown(f"""
-                **{reforme['reforme']} ({reforme['année']})**: {reforme['description']}
-                - Impact estimé: {reforme['impact_pct']}%
-                """)
+            self.display_reform_impact(data)
+    
+    def display_reform_impact(self, data):
+        """Coût des pensions sous des règles réformées, calculé sur une population de carrières"""
+        territory_code = st.session_state.selected_territory
+        population = st.radio("Population de carrières:", ["Synthétique (tous territoires)", "Importée (CSV)"],
+                              horizontal=True, key="reformes_population")
+        if population == "Synthétique (tous territoires)":
+            engine = get_reform_engine(data['seed'])
+            engine_version = ('synthetique', data['seed'])
+        else:
+            fichier = st.file_uploader("Carrières (CSV, colonnes du simulateur par lot, territoire et poids "
+                                       "optionnels):", type=['csv'], key="reformes_carrieres")
+            if fichier is None:
+                st.info("Importez une table de carrières pour simuler les réformes.")
+                return
+            # Le moteur (et ses résultats de référence) est conservé tant que le fichier ne change pas
+            importe = st.session_state.get('reform_engine_importe')
+            if importe is None or importe['fichier'] != fichier.file_id:
+                try:
+                    cohorts, rejetees = load_career_cohorts(fichier, territory_code)
+                except (SimulationError, ValueError) as exc:
+                    st.error(f"❌ {exc}")
+                    return
+                importe = {'fichier': fichier.file_id, 'engine': ReformEngine(cohorts), 'rejetees': rejetees}
+                st.session_state.reform_engine_importe = importe
+            engine = importe['engine']
+            engine_version = ('importe', importe['fichier'])
+            st.caption(f"{len(engine.cohorts):,} cohortes, {importe['rejetees']:,} carrières rejetées")
+        
+        # Réformes prédéfinies : impact calculé sur la population du territoire sélectionné
+        reformes_data = []
+        for nom, reforme in REFORM_PRESETS.items():
+            tableau, _ = engine.simulate(**reforme['regles'])
+            ligne = tableau[tableau['territoire'] == territory_code]
+            ecart = ligne['ecart_viager_pct'].iloc[0] if len(ligne) else tableau['ecart_viager_pct'].mean()
+            reformes_data.append({'reforme': nom, 'année': reforme['année'], 'impact_pct': round(ecart, 2),
+                                  'description': reforme['description']})
+        reformes_df = pd.DataFrame(reformes_data)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            self.plot_chart('reformes_impact', (engine_version, territory_code), lambda: px.bar(
+                reformes_df, 
+                x='reforme', 
+                y='impact_pct',
+                title='Impact des Réformes sur le Coût des Pensions (%)',
+                color='impact_pct',
+                color_continuous_scale='RdYlGn_r'))
+        
+        with col2:
+            self.plot_chart('reformes_chronologie', (engine_version, territory_code), lambda: px.scatter(
+                reformes_df.assign(amplitude=reformes_df['impact_pct'].abs()), 
+                x='année', 
+                y='impact_pct',
+                size='amplitude',
+                color='reforme',
+                title='Chronologie des Réformes et Impact',
+                hover_name='reforme',
+                size_max=60))
+        
+        for _, reforme in reformes_df.iterrows():
+            st.markdown(f"""
+            **{reforme['reforme']} ({reforme['année']})**: {reforme['description']}
+            - Impact estimé sur le coût des pensions: {reforme['impact_pct']}%
+            """)
+        
+        # Réforme paramétrable : seules les cohortes concernées sont recalculées
+        st.markdown("**Réforme personnalisée:**")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            age_legal = st.slider("Âge légal", 60, 67, REFERENCE_RULES['age_legal'], key="reforme_age_legal")
+        with col2:
+            trimestres_requis = st.slider("Trimestres requis", 150, 180, REFERENCE_RULES['trimestres_requis'],
+                                          key="reforme_trimestres")
+        with col3:
+            coefficient_decote = st.slider("Coefficient de décote", 0.0, 1.25, REFERENCE_RULES['coefficient_decote'],
+                                           0.025, key="reforme_decote")
+        with col4:
+            age_taux_plein = st.slider("Âge du taux plein", 65, 70, REFERENCE_RULES['age_taux_plein'],
+                                       key="reforme_age_taux_plein")
+        
+        regles = {'age_legal': age_legal, 'trimestres_requis': trimestres_requis,
+                  'coefficient_decote': coefficient_decote, 'age_taux_plein': age_taux_plein}
+        tableau, informations = engine.simulate(**regles)
+        st.caption(f"{informations['cohortes_recalculees']:,} cohortes recalculées sur {informations['cohortes_total']:,} "
+                   + ("(résultat en cache)" if informations['cache'] else f"en {informations['duree_s']*1000:.1f} ms"))
+        
+        tableau = tableau.assign(nom_complet=[self.territories.get(code, {}).get('nom_complet', code)
+                                              for code in tableau['territoire']])
+        self.plot_chart('reformes_territoires', (engine_version, tuple(regles.values())), lambda: px.bar(
+            tableau,
+            x='nom_complet',
+            y='ecart_viager_pct',
+            title='Écart du Coût Viager des Pensions par Territoire (%)',
+            color='ecart_viager_pct',
+            color_continuous_scale='RdYlGn_r'))
+        st.dataframe(tableau, use_container_width=True)
+    
+    def display_projection_bands(self, data, parametres, projection_df, projection_version):
+        """Bandes d'incertitude P5/P50/P95 issues de trajectoires Monte Carlo"""
+        st.subheader("Incertitude des Projections (Monte Carlo)")
+        n_paths = st.select_slider("Nombre de trajectoires simulées", options=[1_000, 5_000, 10_000, 50_000],
+                                   value=10_000, key="projection_trajectoires")
+        
+        # Simulation (~200 ms pour 10 000 trajectoires) mise en cache avec les figures : une
+        # réexécution sans changement de données, de curseurs ni de trajectoires la réutilise
+        calcul = []
+        def simuler():
+            calcul.append(True)
+            return simulate_projection_bands(
+                data['age_data'], parametres, n_paths=n_paths,
+                montant_annuel_actuel=projection_df['montant_total_pensions'].iloc[0],
+                seed=data['seed'], territory_code=st.session_state.selected_territory,
+                executor=get_simulation_pool()
+            )
+        bandes, informations = get_figure_cache().get_or_build(
+            ('bandes_monte_carlo', projection_version, n_paths), simuler,
+            size_of=lambda resultat: int(resultat[0].memory_usage(deep=True).sum()))
+        st.caption(f"{informations['n_paths']:,} trajectoires en {informations['chunks']} blocs, "
+                   f"calculées en {informations['duree_s']*1000:.0f} ms "
+                   f"({MONTE_CARLO_WORKERS if informations['multicoeur'] else 1} cœur(s))"
+                   + ("" if calcul else ", réutilisées depuis le cache"))
+        
+        def bandes_figure(indicateur, titre, couleur, deterministe):
+            fig = go.Figure([
+                go.Scatter(x=bandes['année'], y=bandes[f'{indicateur}_p95'], mode='lines',
+                           line=dict(width=0), name='P95', showlegend=False),
+                go.Scatter(x=bandes['année'], y=bandes[f'{indicateur}_p5'], mode='lines',
+                           line=dict(width=0), fill='tonexty', fillcolor=couleur.replace('1)', '0.2)'),
+                           name='P5 - P95'),
+                go.Scatter(x=bandes['année'], y=bandes[f'{indicateur}_p50'], mode='lines',
+                           line=dict(color=couleur), name='Médiane (P50)'),
+                go.Scatter(x=projection_df['année'], y=projection_df[deterministe], mode='lines',
+                           line=dict(color=couleur, dash='dot'), name='Scénario central')
+            ])
+            fig.update_layout(title=titre, xaxis_title="Année")
+            return fig
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            self.plot_chart('bandes_population', (projection_version, n_paths), lambda: bandes_figure(
+                'population_65_plus', 'Population de 65+ (P5 / P50 / P95)', 'rgba(0, 85, 164, 1)',
+                'population_65_plus'))
+        with col2:
+            self.plot_chart('bandes_montants', (projection_version, n_paths), lambda: bandes_figure(
+                'montant_total_pensions', 'Montant Total des Pensions (P5 / P50 / P95)', 'rgba(239, 65, 53, 1)',
+                'montant_total_pensions'))
     
     def create_comparison_territories(self):
         """Crée une vue de comparaison entre territoires"""
         st.markdown('<h3 class="section-header">🌍 COMPARAISON INTER-TERRITOIRES</h3>', 
                    unsafe_allow_html=True)
         
-        comparison_data = generate_comparison_data(self.territories)
+        # Montants en direct des territoires chargés (celui de la session peut être en avance)
+        live_data = get_territory_store().live_data(st.session_state.seed)
+        territory_code = st.session_state.selected_territory
+        live_data[territory_code] = self.get_territory_data(territory_code)['current_data']
+        comparison_data = generate_comparison_data(self.territories, live_data)
+        comparison_version = tuple(comparison_data['montant_total_pensions'].round(2))
         
         tab1, tab2, tab3 = st.tabs(["Comparaison Globale", "Indicateurs par Territoire", "Classement"])
         
@@ -1208,24 +1127,28 @@ class RetraitesDashboard:
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.bar(comparison_data, 
-                            x='nom_complet', 
-                            y='montant_total_pensions',
-                            title='Montant Total des Pensions par Territoire',
-                            color='type',
-                            color_discrete_sequence=px.colors.qualitative.Set3)
-                fig.update_layout(yaxis_title="Montant Total (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def montants_territoires():
+                    fig = px.bar(comparison_data, 
+                                x='nom_complet', 
+                                y='montant_total_pensions',
+                                title='Montant Total des Pensions par Territoire',
+                                color='type',
+                                color_discrete_sequence=px.colors.qualitative.Set3)
+                    fig.update_layout(yaxis_title="Montant Total (€)")
+                    return fig
+                self.plot_chart('comparaison_montants', comparison_version, montants_territoires)
             
             with col2:
-                fig = px.bar(comparison_data, 
-                            x='nom_complet', 
-                            y='nombre_retraites',
-                            title='Nombre de Retraités par Territoire',
-                            color='type',
-                            color_discrete_sequence=px.colors.qualitative.Set3)
-                fig.update_layout(yaxis_title="Nombre de Retraités")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                def retraites_territoires():
+                    fig = px.bar(comparison_data, 
+                                x='nom_complet', 
+                                y='nombre_retraites',
+                                title='Nombre de Retraités par Territoire',
+                                color='type',
+                                color_discrete_sequence=px.colors.qualitative.Set3)
+                    fig.update_layout(yaxis_title="Nombre de Retraités")
+                    return fig
+                self.plot_chart('comparaison_retraites', None, retraites_territoires)
         
         with tab2:
             selected_territories = st.multiselect(
@@ -1240,26 +1163,26 @@ class RetraitesDashboard:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig = px.scatter(filtered_data, 
-                                   x='pib', 
-                                   y='montant_total_pensions',
-                                   size='population',
-                                   color='nom_complet',
-                                   title='PIB vs Montant Total des Pensions',
-                                   hover_name='nom_complet',
-                                   size_max=60)
-                    st.plotly_chart(fig, config={'displayModeBar': False})
+                    self.plot_chart('comparaison_pib', (comparison_version, tuple(selected_territories)), lambda: px.scatter(
+                        filtered_data, 
+                        x='pib', 
+                        y='montant_total_pensions',
+                        size='population',
+                        color='nom_complet',
+                        title='PIB vs Montant Total des Pensions',
+                        hover_name='nom_complet',
+                        size_max=60))
                 
                 with col2:
-                    fig = px.scatter(filtered_data, 
-                                   x='montant_moyen_retraite', 
-                                   y='pension_par_habitant',
-                                   size='population',
-                                   color='nom_complet',
-                                   title='Pension Moyenne vs Pension par Habitant',
-                                   hover_name='nom_complet',
-                                   size_max=60)
-                    st.plotly_chart(fig, config={'displayModeBar': False})
+                    self.plot_chart('comparaison_pension_habitant', (comparison_version, tuple(selected_territories)), lambda: px.scatter(
+                        filtered_data, 
+                        x='montant_moyen_retraite', 
+                        y='pension_par_habitant',
+                        size='population',
+                        color='nom_complet',
+                        title='Pension Moyenne vs Pension par Habitant',
+                        hover_name='nom_complet',
+                        size_max=60))
                 
                 st.dataframe(filtered_data, use_container_width=True)
         
@@ -1270,64 +1193,176 @@ class RetraitesDashboard:
             
             with col1:
                 st.markdown("**Par Montant Total des Pensions:**")
-                top_pensions = comparison_data.sort_values('montant_total_pensions', ascending=False)
-                for i, (_, row) in enumerate(top_pensions.iterrows()):
-                    st.markdown(f"{i+1}. {row['nom_complet']}: {row['montant_total_pensions']/1e6:.1f} M€")
+                self.display_ranking(comparison_data, 'montant_total_pensions', "Montant total",
+                                     format="%.1f M€", echelle=1e6)
             
             with col2:
                 st.markdown("**Par Pension Moyenne:**")
-                top_moyenne = comparison_data.sort_values('montant_moyen_retraite', ascending=False)
-                for i, (_, row) in enumerate(top_moyenne.iterrows()):
-                    st.markdown(f"{i+1}. {row['nom_complet']}: {row['montant_moyen_retraite']:.0f} €")
+                self.display_ranking(comparison_data, 'montant_moyen_retraite', "Pension moyenne", format="%.0f €")
             
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("**Par Nombre de Retraités:**")
-                top_nombre = comparison_data.sort_values('nombre_retraites', ascending=False)
-                for i, (_, row) in enumerate(top_nombre.iterrows()):
-                    st.markdown(f"{i+1}. {row['nom_complet']}: {row['nombre_retraites']:,}")
+                self.display_ranking(comparison_data, 'nombre_retraites', "Retraités", format="%d")
             
             with col2:
                 st.markdown("**Par Pension par Habitant:**")
-                top_par_habitant = comparison_data.sort_values('pension_par_habitant', ascending=False)
-                for i, (_, row) in enumerate(top_par_habitant.iterrows()):
-                    st.markdown(f"{i+1}. {row['nom_complet']}: {row['pension_par_habitant']:.0f} €")
+                self.display_ranking(comparison_data, 'pension_par_habitant', "Pension par habitant", format="%.0f €")
+    
+    # Lignes affichées par page dans les tableaux paginés
+    TABLE_PAGE_SIZE = 100
+    
+    def display_grid(self, tableau, key, column_config=None, colorer=()):
+        """Affiche un tableau en un seul élément, paginé côté serveur au-delà de TABLE_PAGE_SIZE lignes"""
+        n_pages = max(1, -(-len(tableau) // self.TABLE_PAGE_SIZE))
+        page = 1
+        if n_pages > 1:
+            # Après un filtrage, la page mémorisée peut ne plus exister
+            if st.session_state.get(f"{key}_page", 1) > n_pages:
+                st.session_state[f"{key}_page"] = 1
+            page = st.number_input(f"Page (sur {n_pages}):", min_value=1, max_value=n_pages, key=f"{key}_page")
+        page_tableau = tableau.iloc[(page - 1) * self.TABLE_PAGE_SIZE:page * self.TABLE_PAGE_SIZE]
+        
+        # Le style n'est calculé que pour la page affichée
+        donnees = page_tableau
+        if colorer:
+            donnees = page_tableau.style.map(
+                lambda valeur: f"color: {'#00C853' if valeur > 0 else '#FF1744' if valeur < 0 else '#FF9800'}",
+                subset=list(colorer))
+        st.dataframe(donnees, column_config=column_config, hide_index=True, use_container_width=True)
+        st.caption(f"{len(tableau):,} lignes" + (f" — page {page}/{n_pages}" if n_pages > 1 else ""))
+    
+    def display_ranking(self, comparison_data, colonne, libelle, format, echelle=1):
+        """Classement des territoires sur un indicateur, en un seul tableau"""
+        classement = comparison_data.sort_values(colonne, ascending=False)
+        st.dataframe(
+            pd.DataFrame({
+                'rang': range(1, len(classement) + 1),
+                'nom_complet': classement['nom_complet'],
+                colonne: classement[colonne] / echelle
+            }),
+            column_config={
+                'rang': st.column_config.NumberColumn("#", width="small"),
+                'nom_complet': st.column_config.TextColumn("Territoire"),
+                colonne: st.column_config.NumberColumn(libelle, format=format)
+            },
+            hide_index=True, use_container_width=True
+        )
+    
+    def plot_chart(self, chart_id, version, build_figure):
+        """Affiche une figure Plotly, reconstruite seulement si ses données ou sélections ont changé"""
+        # Construction et sérialisation de la figure, mesurées ensemble par graphique
+        with instrumentation.measure(f'plot_chart/{chart_id}'):
+            fig = get_figure_cache().get_or_build((chart_id, version), build_figure)
+            st.plotly_chart(fig, config={'displayModeBar': False})
+    
+    def render_section(self, section):
+        """Construit une section et mesure son temps de rendu"""
+        debut = time.perf_counter()
+        getattr(self, self.SECTIONS[section])()
+        duree = time.perf_counter() - debut
+        st.session_state.section_timings[section] = duree * 1000
+        instrumentation.record(self.SECTIONS[section], duree)
+    
+    def display_warm_up_status(self, warm_up):
+        """Affiche l'avancement et les temps du préchargement des territoires"""
+        if warm_up is None:
+            return
+        status = warm_up.status()
+        if not status['termine']:
+            st.sidebar.info(f"⏳ Préchargement: {status['territoires_charges']}/{status['territoires_total']} territoires")
+            return
+        icone = "🚀" if status['pret'] else "⚠️"
+        with st.sidebar.expander(f"{icone} Préchargement: {status['duree_s']:.1f} s"):
+            for territory_code, duree in sorted(status['temps_par_territoire_s'].items(), key=lambda item: -item[1]):
+                st.markdown(f"{self.territories[territory_code]['nom_complet']}: **{duree*1000:.0f} ms**")
+            for territory_code, erreur in status['erreurs'].items():
+                st.markdown(f"❌ {territory_code}: {erreur}")
+    
+    def display_section_timings(self):
+        """Affiche les derniers temps de rendu mesurés par section"""
+        with st.sidebar.expander("⏱️ Temps de rendu par section"):
+            for section in self.SECTIONS:
+                duree = st.session_state.section_timings.get(section)
+                st.markdown(f"{section}: " + ("non calculée" if duree is None else f"**{duree:.0f} ms**"))
+            figure_cache = get_figure_cache()
+            st.markdown(f"Cache figures: {figure_cache.hits} réutilisées, {figure_cache.misses} construites "
+                        f"({figure_cache.total_bytes/1e6:.1f} Mo)")
+    
+    def display_instrumentation(self):
+        """Panneau d'administration : temps cumulés, caches et mémoire des sessions (si activé)"""
+        if not instrumentation.ENABLED:
+            return
+        durees, caches, sessions = instrumentation.METRICS.snapshot()
+        with st.sidebar.expander("🩺 Instrumentation"):
+            if durees:
+                st.markdown("**Temps cumulés**")
+                st.dataframe(pd.DataFrame([
+                    {'nom': nom, 'appels': appels, 'total_ms': total * 1000,
+                     'moyenne_ms': total / appels * 1000, 'max_ms': maximum * 1000}
+                    for nom, (appels, total, maximum) in durees.items()
+                ]).sort_values('total_ms', ascending=False), hide_index=True, use_container_width=True,
+                    column_config={colonne: st.column_config.NumberColumn(format="%.1f")
+                                   for colonne in ('total_ms', 'moyenne_ms', 'max_ms')})
+            if caches:
+                st.markdown("**Caches st.cache_data**")
+                st.dataframe(pd.DataFrame([
+                    {'fonction': nom, 'succès': hits, 'défauts': misses, 'taux_succès': hits / (hits + misses)}
+                    for nom, (hits, misses) in sorted(caches.items())
+                ]), hide_index=True, use_container_width=True,
+                    column_config={'taux_succès': st.column_config.ProgressColumn(min_value=0, max_value=1,
+                                                                                  format="percent")})
+            st.markdown(f"**Mémoire des sessions:** {len(sessions)} sessions, "
+                        f"{sum(sessions.values())/1e6:.1f} Mo")
+            server = instrumentation.get_metrics_server()
+            if server is not None:
+                st.caption(f"Export Prometheus: http://127.0.0.1:{server.server_address[1]}/metrics")
+            st.download_button("📥 Exporter (Prometheus)", instrumentation.prometheus_text(),
+                               file_name="metriques_retraites.prom", mime="text/plain")
     
     def run(self):
         """Fonction principale pour exécuter le dashboard"""
+        st.sidebar.number_input("🎲 Scénario (graine de simulation):", min_value=0, step=1, key="seed")
+        st.sidebar.toggle(f"⏱️ Actualisation automatique ({LIVE_REFRESH_SECONDS:.0f} s)", key="auto_refresh")
+        get_live_ticker()
+        warm_up = get_warm_up()
+        
         self.display_territory_selector()
         self.display_header()
-        self.display_key_metrics()
+        
+        if st.session_state.auto_refresh:
+            # Seules les métriques sont ré-exécutées à chaque intervalle, pas les onglets
+            st.fragment(run_every=LIVE_REFRESH_SECONDS)(self.display_key_metrics)()
+        else:
+            self.display_key_metrics()
         
         # Mise à jour automatique des données
         if st.sidebar.button("🔄 Mettre à jour les données"):
-            self.update_live_data(st.session_state.selected_territory)
-            st.success("✅ Données mises à jour avec succès!")
-        
-        # Création des onglets
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
-            "Vue d'ensemble", 
-            "Catégories en direct", 
-            "Analyse par catégorie", 
-            "Évolution et projections",
-            "Comparaison territoires"
-        ])
+            if self.update_live_data(st.session_state.selected_territory) is False:
+                st.info("ℹ️ Données réelles : actualisées au rechargement de leur source")
+            else:
+                st.success("✅ Données mises à jour avec succès!")
         
-        with tab1:
-            self.create_retraites_overview()
+        self.display_memory_footprint()
+        self.display_data_import()
+        self.display_warm_up_status(warm_up)
         
-        with tab2:
-            self.create_categories_live()
+        st.sidebar.toggle("💤 Calculer uniquement la section affichée", key="lazy_sections")
         
-        with tab3:
-            self.create_categorie_analysis()
-        
-        with tab4:
-            self.create_evolution_analysis()
+        if st.session_state.lazy_sections:
+            # Navigation paresseuse : seule la section active est calculée
+            section = st.radio("Section:", list(self.SECTIONS), horizontal=True,
+                               key="active_section", label_visibility="collapsed")
+            self.render_section(section)
+        else:
+            # Onglets classiques : toutes les sections sont calculées à chaque exécution
+            for tab, section in zip(st.tabs(list(self.SECTIONS)), self.SECTIONS):
+                with tab:
+                    self.render_section(section)
         
-        with tab5:
-            self.create_comparison_territories()
+        self.display_section_timings()
+        self.display_instrumentation()
         
         # Footer
         st.markdown("---")
@@ -0,0 +1,340 @@
+# api.py
+"""API HTTP JSON, sans interface, sur le moteur de données du dashboard.
+
+Sert l'historique, l'instantané courant, les tranches d'âge et la comparaison des
+territoires depuis le même stockage que le dashboard (TerritoryDataStore et caches
+du moteur). L'historique d'un territoire pas encore en mémoire est lu sur disque,
+limité aux colonnes et aux années demandées. Chaque réponse porte un ETag tiré de
+la version des données : un client qui renvoie If-None-Match reçoit 304 sans que
+rien ne soit relu ni sérialisé.
+Les réponses sont compressées en gzip si le client l'accepte.
+
+    python api.py [--port 8502] [--live] [--metrics-port 9465]
+
+    GET /territories
+    GET /territories/<code>/history?columns=date,categorie,montant_total_pensions&start=2020-01&end=2023-12
+    GET /territories/<code>/current?columns=categorie,montant_mensuel
+    GET /territories/<code>/age
+    GET /comparison?columns=territoire,montant_total_pensions&live=1
+
+Paramètre commun : seed (graine du scénario, 2025 par défaut). start et end acceptent
+une année, un mois ou une date (end=2023 inclut toute l'année). /comparison sert par
+défaut les montants de référence ; live=1 y reporte les données en direct, ce qui
+charge tous les territoires actifs.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+from streamlit import logger as st_logger
+
+import instrumentation
+from retraites_engine import (
+    DEFAULT_SEED,
+    HISTORICAL_DTYPES,
+    generate_comparison_data,
+    get_live_ticker,
+    get_territories_definitions,
+    get_territory_store,
+    persisted_history_end,
+    persisted_history_version,
+    read_persisted_history
+)
+
+logger = st_logger.get_logger(__name__)
+
+DEFAULT_PORT = 8502
+# Export Prometheus de l'API (avec RETRAITES_INSTRUMENTATION=1), distinct de celui du
+# dashboard pour que les deux processus tournent sur le même hôte ; 0 pour ne pas le démarrer
+METRICS_PORT = int(os.environ.get('RETRAITES_API_METRICS_PORT', 9465))
+# Réponses plus petites envoyées sans compression
+GZIP_MIN_BYTES = 1024
+
+TERRITORY_FRAMES = {'history': 'historical_data', 'current': 'live_data', 'age': 'age_data'}
+
+
+class ApiError(ValueError):
+    """Requête invalide : code HTTP et message renvoyés au client"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """Corps JSON déjà sérialisés (et leur version gzip), indexés par ETag"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, etag, body):
+        entry = {'body': body, 'gzip': None}
+        with self._lock:
+            self._entries[etag] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def _liste(params, nom):
+    valeur = params.get(nom)
+    return [element.strip() for element in valeur.split(',') if element.strip()] if valeur else None
+
+
+def _date(valeur):
+    date = pd.Timestamp(valeur)
+    if date is pd.NaT:
+        raise ValueError(f"{valeur!r} n'est pas une date")
+    # Les dates des données sont naïves (heure locale du territoire) : un fuseau
+    # éventuel est retiré en gardant l'heure indiquée
+    return date.tz_localize(None) if date.tzinfo is not None else date
+
+
+def _bornes(start=None, end=None):
+    """Bornes incluses (Timestamp ou None) des paramètres start et end"""
+    try:
+        debut = _date(start) if start is not None else None
+        fin = None
+        if end is not None:
+            # end=2023 inclut toute l'année, end=2023-12 tout le mois de décembre
+            fin = _date(end)
+            if len(end) <= 7:
+                fin = pd.Period(fin, 'Y' if len(end) == 4 else 'M').end_time
+    except (ValueError, TypeError) as exc:
+        raise ApiError(400, f"Date invalide: {exc}") from exc
+    return debut, fin
+
+
+def _verifier_colonnes(columns, disponibles):
+    inconnues = [colonne for colonne in columns if colonne not in disponibles]
+    if inconnues:
+        raise ApiError(400, f"Colonnes inconnues: {', '.join(inconnues)} "
+                            f"(disponibles: {', '.join(disponibles)})")
+
+
+def select(frame, columns=None, start=None, end=None):
+    """Colonnes et période (bornes incluses, sur la colonne date) demandées par le client"""
+    if start is not None or end is not None:
+        if 'date' not in frame.columns:
+            raise ApiError(400, "Pas de colonne date : start et end ne s'appliquent pas")
+        debut, fin = _bornes(start, end)
+        if debut is not None:
+            frame = frame[frame['date'] >= debut]
+        if fin is not None:
+            frame = frame[frame['date'] <= fin]
+    if columns:
+        _verifier_colonnes(columns, list(frame.columns))
+        frame = frame[columns]
+    return frame
+
+
+def etag_for(version, route, params):
+    """ETag faible : même version des données et mêmes paramètres => même réponse"""
+    empreinte = hashlib.sha1(repr((version, route, sorted(params.items()))).encode('utf-8')).hexdigest()
+    return f'W/"{empreinte[:24]}"'
+
+
+class DataApi:
+    """Routage et construction des réponses, indépendants du serveur HTTP"""
+
+    def __init__(self, store=None, cache=None):
+        self.store = store if store is not None else get_territory_store()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.territories = get_territories_definitions()
+
+    def handle(self, path, query='', if_none_match=None, accept_gzip=False):
+        """Renvoie (statut, en-têtes, corps) pour une requête GET"""
+        params = {nom: valeurs[-1] for nom, valeurs in parse_qs(query).items()}
+        morceaux = [morceau for morceau in path.split('/') if morceau]
+        try:
+            route, version, construire = self._route(morceaux, params)
+        except ApiError as exc:
+            return self._erreur(exc.status, str(exc))
+        except Exception as exc:  # chargement du territoire en échec (disque, source distante...)
+            logger.exception("Erreur sur %s", path)
+            return self._erreur(500, f"Erreur interne: {exc!r}")
+
+        etag = etag_for(version, route, params)
+        entetes = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if if_none_match and (if_none_match.strip() == '*' or etag in
+                              [valeur.strip() for valeur in if_none_match.split(',')]):
+            return 304, entetes, b''
+
+        entry = self.cache.get(etag)
+        if entry is None:
+            with instrumentation.measure(f'api/{route}'):
+                try:
+                    corps = construire()
+                except ApiError as exc:
+                    return self._erreur(exc.status, str(exc))
+                except Exception as exc:
+                    logger.exception("Erreur sur %s", path)
+                    return self._erreur(500, f"Erreur interne: {exc!r}")
+            entry = self.cache.put(etag, corps)
+
+        entetes['Content-Type'] = 'application/json; charset=utf-8'
+        if accept_gzip and len(entry['body']) >= GZIP_MIN_BYTES:
+            if entry['gzip'] is None:
+                entry['gzip'] = gzip.compress(entry['body'], compresslevel=6)
+            entetes['Content-Encoding'] = 'gzip'
+            return 200, entetes, entry['gzip']
+        return 200, entetes, entry['body']
+
+    @staticmethod
+    def _erreur(status, message):
+        corps = json.dumps({'erreur': message}, ensure_ascii=False).encode('utf-8')
+        return status, {'Content-Type': 'application/json; charset=utf-8'}, corps
+
+    def _seed(self, params):
+        try:
+            return int(params.get('seed', DEFAULT_SEED))
+        except ValueError as exc:
+            raise ApiError(400, "seed doit être un entier") from exc
+
+    def _route(self, morceaux, params):
+        """Identifie la ressource : (nom de route, version des données, construction du corps)"""
+        if morceaux == ['territories']:
+            return 'territories', None, lambda: self._json({'territoires': self.territories})
+
+        if morceaux == ['comparison']:
+            seed = self._seed(params)
+            # live=1 charge tous les territoires actifs : à demander explicitement
+            live = params.get('live', '0') != '0'
+            codes = [code for code, info in self.territories.items() if info['retraites_actif']]
+            entries = {code: self.store.get(code, seed) for code in codes} if live else {}
+            version = (seed, live, tuple((code, entry['created'], entry['history_end'], entry['live_ticks'])
+                                         for code, entry in entries.items()))
+
+            def comparison():
+                live_data = {code: entry['live_data'] for code, entry in entries.items()} or None
+                frame = select(generate_comparison_data(self.territories, live_data), _liste(params, 'columns'))
+                return self._json({'seed': seed, 'live': live}, frame)
+            return 'comparison', version, comparison
+
+        if len(morceaux) == 3 and morceaux[0] == 'territories' and morceaux[2] in TERRITORY_FRAMES:
+            territory_code, ressource = morceaux[1].upper(), morceaux[2]
+            if territory_code not in self.territories:
+                raise ApiError(404, f"Territoire inconnu: {territory_code}")
+            seed = self._seed(params)
+            if ressource == 'history' and (territory_code, seed) not in self.store:
+                persiste = self._persisted_history(territory_code, seed, params)
+                if persiste is not None:
+                    return persiste
+            entry = self.store.get(territory_code, seed)
+            version = (territory_code, seed, entry['created'], entry['history_end'])
+            if ressource == 'current':
+                version += (entry['live_ticks'],)
+
+            def territory_frame():
+                frame = select(entry[TERRITORY_FRAMES[ressource]], _liste(params, 'columns'),
+                               params.get('start'), params.get('end'))
+                return self._json({'territoire': territory_code, 'seed': seed,
+                                   'fin_historique': entry['history_end'].strftime('%Y-%m-%d'),
+                                   'mises_a_jour_en_direct': entry['live_ticks']}, frame)
+            return ressource, version, territory_frame
+
+        raise ApiError(404, f"Ressource inconnue: /{'/'.join(morceaux)}")
+
+    def _persisted_history(self, territory_code, seed, params):
+        """Historique d'un territoire absent de la mémoire, lu directement sur disque
+
+        Seules les colonnes et les partitions annuelles demandées sont lues : une requête
+        sur un worker froid ne charge pas le territoire entier dans le stockage partagé.
+        """
+        fin_historique = persisted_history_end(territory_code, seed)
+        if fin_historique is None:
+            return None
+        columns = _liste(params, 'columns')
+        if columns:
+            _verifier_colonnes(columns, list(HISTORICAL_DTYPES))
+        debut, fin = _bornes(params.get('start'), params.get('end'))
+        # Scénario et identité des fichiers : un export réingéré ou un mois réécrit
+        # change la version même si la dernière date reste la même
+        version = (territory_code, seed, 'disque', fin_historique, persisted_history_version(territory_code, seed))
+
+        def persisted_history():
+            frame = read_persisted_history(territory_code, seed, columns, debut, fin)
+            return self._json({'territoire': territory_code, 'seed': seed,
+                               'fin_historique': fin_historique.strftime('%Y-%m-%d'),
+                               'mises_a_jour_en_direct': 0}, frame)
+        return 'history', version, persisted_history
+
+    @staticmethod
+    def _json(meta, frame=None):
+        """Corps JSON : métadonnées et lignes du tableau (dates ISO)"""
+        if frame is None:
+            return json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        meta = {**meta, 'lignes': len(frame), 'colonnes': list(frame.columns)}
+        lignes = frame.to_json(orient='records', date_format='iso', force_ascii=False)
+        return f'{{"meta": {json.dumps(meta, ensure_ascii=False)}, "donnees": {lignes}}}'.encode('utf-8')
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    api = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        statut, entetes, corps = self.api.handle(
+            url.path, url.query, self.headers.get('If-None-Match'),
+            'gzip' in self.headers.get('Accept-Encoding', '')
+        )
+        self.send_response(statut)
+        for nom, valeur in entetes.items():
+            self.send_header(nom, valeur)
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(port=DEFAULT_PORT, host='127.0.0.1', api=None):
+    """Serveur HTTP multi-fils de l'API (à lancer avec serve_forever)"""
+    handler = type('ApiHandler', (_ApiHandler,), {'api': api or DataApi()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON des données de retraites DROM-COM")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse d'écoute (locale par défaut)")
+    parser.add_argument('--live', action='store_true', help="Fait avancer les données en direct comme le dashboard")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help="Port de l'export Prometheus (avec RETRAITES_INSTRUMENTATION=1, 0 pour aucun)")
+    args = parser.parse_args()
+
+    # Hors `streamlit run`, chaque appel en cache produirait un avertissement
+    st_logger.set_log_level('error')
+    metrics_server = instrumentation.get_metrics_server(args.metrics_port)
+    if args.live:
+        get_live_ticker()
+    server = create_server(args.port, args.host)
+    print(f"API sur http://{args.host}:{server.server_address[1]}/territories")
+    if metrics_server is not None:
+        print(f"Métriques sur http://127.0.0.1:{metrics_server.server_address[1]}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
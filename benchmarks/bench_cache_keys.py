@@ -0,0 +1,65 @@
+# bench_cache_keys.py
+"""Micro-benchmark du coût de recherche en cache de st.cache_data.
+
+Compare une lecture en cache (cache hit) avec l'ancienne signature, qui passait
+le dictionnaire des catégories et l'historique complet en arguments, et avec la
+nouvelle signature (code territoire + graine) pour plusieurs longueurs d'historique.
+
+    python benchmarks/bench_cache_keys.py
+"""
+import os
+import sys
+import time
+
+import streamlit as st
+from streamlit import logger as st_logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import retraites_engine  # noqa: E402
+
+# Hors `streamlit run`, Streamlit avertit à chaque appel en cache : on ne garde que les erreurs
+st_logger.set_log_level('error')
+
+REPETITIONS = 50
+DATES_DEBUT = ['2015-01-01', '1990-01-01', '1950-01-01']
+
+
+@st.cache_data(ttl=300)
+def current_data_par_frames(territory_code, categories, historical_data, seed=retraites_engine.DEFAULT_SEED):
+    """Ancienne signature : le dictionnaire et l'historique font partie de la clé"""
+    return retraites_engine.build_current_frame(territory_code, categories, historical_data, seed)
+
+
+@st.cache_data(ttl=300)
+def current_data_par_cle(territory_code, seed=retraites_engine.DEFAULT_SEED, date_debut='2015-01-01'):
+    """Nouvelle signature : seuls le code territoire et la graine sont hachés"""
+    categories = retraites_engine.get_categories_retraites(territory_code)
+    historical_data = retraites_engine.generate_historical_data(territory_code, seed, date_debut)
+    return retraites_engine.build_current_frame(territory_code, categories, historical_data, seed)
+
+
+def mesurer(fonction, *args):
+    """Temps moyen (ms) d'un appel servi par le cache"""
+    fonction(*args)  # remplissage du cache
+    debut = time.perf_counter()
+    for _ in range(REPETITIONS):
+        fonction(*args)
+    return (time.perf_counter() - debut) / REPETITIONS * 1000
+
+
+def main():
+    territory_code = 'REUNION'
+    seed = retraites_engine.DEFAULT_SEED
+    categories = retraites_engine.get_categories_retraites(territory_code)
+
+    print(f"{'Début historique':<18}{'Lignes':>10}{'Avant (ms)':>14}{'Après (ms)':>14}")
+    for date_debut in DATES_DEBUT:
+        historical_data = retraites_engine.generate_historical_data(territory_code, seed, date_debut)
+        avant = mesurer(current_data_par_frames, territory_code, categories, historical_data, seed)
+        apres = mesurer(current_data_par_cle, territory_code, seed, date_debut)
+        print(f"{date_debut:<18}{len(historical_data):>10,}{avant:>14.3f}{apres:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# bench_comparison.py
+"""Benchmark du tableau de comparaison : boucle par unité contre passe vectorisée.
+
+Les DROM-COM sont complétés par des communes synthétiques (une unité par commune,
+avec ses propres catégories) pour vérifier le passage à plusieurs centaines d'unités.
+
+    python benchmarks/bench_comparison.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit import logger as st_logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import retraites_engine  # noqa: E402
+
+st_logger.set_log_level('error')
+
+REPETITIONS = 20
+NOMBRES_UNITES = [11, 100, 500, 2000]
+CATEGORIES_PAR_UNITE = 12
+
+
+def synthetic_units(n_unites, seed=retraites_engine.DEFAULT_SEED):
+    """Unités et table empilée (unité × catégorie) synthétiques"""
+    rng = np.random.default_rng(seed)
+    codes = [f'COMMUNE_{i:04d}' for i in range(n_unites)]
+    units = pd.DataFrame({
+        'nom_complet': codes,
+        'type': 'Commune',
+        'population': rng.integers(1_000, 150_000, n_unites),
+        'superficie': rng.uniform(5, 500, n_unites),
+        'pib': rng.uniform(0.05, 5, n_unites),
+        'nombre_retraites': rng.integers(100, 30_000, n_unites),
+        'montant_moyen_retraite': rng.uniform(800, 1600, n_unites),
+        'retraites_actif': True
+    }, index=codes)
+    stacked = pd.DataFrame({
+        'territoire': np.repeat(codes, CATEGORIES_PAR_UNITE),
+        'categorie': np.tile([f'CAT_{j}' for j in range(CATEGORIES_PAR_UNITE)], n_unites),
+        'montant_reference': rng.uniform(1e4, 1e7, n_unites * CATEGORIES_PAR_UNITE)
+    })
+    live = stacked.sample(frac=0.5, random_state=0).set_index(['territoire', 'categorie'])['montant_reference'] * 1.01
+    return units, stacked, live
+
+
+def compare_par_boucle(units, stacked, live):
+    """Ancienne approche : une somme Python par unité"""
+    lignes = []
+    for code, info in units.iterrows():
+        categories = stacked[stacked['territoire'] == code]
+        total = sum(
+            live.get((code, row.categorie), row.montant_reference) for row in categories.itertuples()
+        )
+        lignes.append({'territoire': code, 'montant_total_pensions': total,
+                       'pension_par_habitant': total / info['population']})
+    return pd.DataFrame(lignes)
+
+
+def mesurer(fonction, *args, repetitions=REPETITIONS):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction(*args)
+    return resultat, (time.perf_counter() - debut) / repetitions * 1000
+
+
+def main():
+    print(f"{'Unités':>8}{'Boucle (ms)':>14}{'Vectorisé (ms)':>17}{'Gain':>8}")
+    for n_unites in NOMBRES_UNITES:
+        units, stacked, live = synthetic_units(n_unites)
+        boucle, avant = mesurer(compare_par_boucle, units, stacked, live, repetitions=max(1, REPETITIONS // 10))
+        vectorise, apres = mesurer(retraites_engine.compare_units, units, stacked, live)
+        np.testing.assert_allclose(boucle['montant_total_pensions'], vectorise['montant_total_pensions'])
+        print(f"{n_unites:>8,}{avant:>14.2f}{apres:>17.2f}{avant / apres:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
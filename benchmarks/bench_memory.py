@@ -0,0 +1,50 @@
+# bench_memory.py
+"""Rapport mémoire de l'historique : ancien schéma (objets, float64) contre schéma compact.
+
+    python benchmarks/bench_memory.py
+"""
+import os
+import sys
+
+from streamlit import logger as st_logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import retraites_engine  # noqa: E402
+
+st_logger.set_log_level('error')
+
+
+def legacy_schema(historical_data, territory_code):
+    """Reproduit l'ancien schéma : chaînes répétées et float64 partout"""
+    legacy = historical_data.astype({
+        'categorie': object,
+        'categorie_principale': object,
+        'nombre_beneficiaires': 'float64',
+        'montant_moyen': 'float64',
+        'evolution_mensuelle': 'float64'
+    })
+    legacy.insert(1, 'territoire', territory_code)
+    return legacy
+
+
+def main():
+    territories = retraites_engine.get_territories_definitions()
+    total_avant = total_apres = 0
+
+    for territory_code in territories:
+        compact = retraites_engine.generate_historical_data(territory_code, retraites_engine.DEFAULT_SEED)
+        avant = retraites_engine.dataframe_memory_bytes(legacy_schema(compact, territory_code))
+        apres = retraites_engine.dataframe_memory_bytes(compact)
+        total_avant += avant
+        total_apres += apres
+        print(f"{territory_code:<12}{len(compact):>8,} lignes"
+              f"{avant / len(compact):>10.1f} -> {apres / len(compact):>5.1f} octets/ligne")
+
+    print(f"\nOnze territoires résidents: {total_avant / 1e6:.2f} Mo -> {total_apres / 1e6:.2f} Mo")
+    print("\nDétail (REUNION, schéma compact):")
+    print(retraites_engine.memory_report(retraites_engine.generate_historical_data('REUNION', retraites_engine.DEFAULT_SEED)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# bench_projections.py
+"""Benchmark des projections démographiques : boucle annuelle contre calcul vectorisé.
+
+L'ancienne boucle recalculait le filtre des tranches d'âge et la somme des données
+courantes à chaque année, pour un seul scénario. Le moteur vectorisé calcule toutes
+les années × tranches × scénarios en une opération.
+
+    python benchmarks/bench_projections.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit import logger as st_logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import projections  # noqa: E402
+import retraites_engine  # noqa: E402
+
+st_logger.set_log_level('error')
+
+NOMBRES_SCENARIOS = [1, 100, 1_000, 10_000]
+
+
+def projection_par_boucle(age_data, current_data):
+    """Ancienne boucle du tableau « Projections Démographiques » (un scénario)"""
+    projection_data = []
+    for year in range(2023, 2043):
+        age_65_plus = age_data[age_data['tranche_age'].str.contains('65+')]['nombre_beneficiaires'].sum()
+        population_65_plus = age_65_plus * (1 + (year - 2023) * 0.02)
+        total_pensions = current_data['montant_mensuel'].sum() * 12
+        projected_pensions = total_pensions * (1 + (year - 2023) * 0.025)
+        projection_data.append({
+            'année': year,
+            'population_65_plus': population_65_plus,
+            'montant_total_pensions': projected_pensions,
+            'pension_moyenne': projected_pensions / population_65_plus
+        })
+    return pd.DataFrame(projection_data)
+
+
+def scenarios_aleatoires(age_data, n_scenarios, seed=retraites_engine.DEFAULT_SEED):
+    """n scénarios tirés autour des paramètres de référence des tranches"""
+    rng = np.random.default_rng(seed)
+    return projections.scenario_parameters(
+        age_data, n_scenarios,
+        croissance=age_data['croissance'].to_numpy() + rng.uniform(-0.02, 0.02, (n_scenarios, 1)),
+        mortalite=age_data['mortalite'].to_numpy() * rng.uniform(0.5, 1.5, (n_scenarios, 1)),
+        revalorisation=rng.uniform(0.0, 0.05, (n_scenarios, 1))
+    )
+
+
+def mesurer(fonction, *args, repetitions=10):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction(*args)
+    return (time.perf_counter() - debut) / repetitions * 1000
+
+
+def main():
+    territory_code = 'REUNION'
+    age_data = retraites_engine.generate_age_data(territory_code)
+    current_data = retraites_engine.generate_current_data(territory_code, retraites_engine.DEFAULT_SEED)
+    montant_annuel = current_data['montant_mensuel'].sum() * 12
+
+    print(f"Boucle annuelle (1 scénario): {mesurer(projection_par_boucle, age_data, current_data):.2f} ms")
+    print(f"{'Scénarios':>10}{'Vectorisé (ms)':>17}{'µs/scénario':>14}")
+    for n_scenarios in NOMBRES_SCENARIOS:
+        parametres = scenarios_aleatoires(age_data, n_scenarios)
+
+        def calcul():
+            projection = projections.project_demography(age_data, parametres)
+            return projections.projection_totals(age_data, projection, montant_annuel)
+
+        duree = mesurer(calcul)
+        print(f"{n_scenarios:>10,}{duree:>17.2f}{duree * 1000 / n_scenarios:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
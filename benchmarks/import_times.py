@@ -0,0 +1,82 @@
+# import_times.py
+"""Temps d'import au démarrage d'un worker, ventilé par paquet (équivalent de python -X importtime).
+
+Le module est importé dans un interpréteur neuf avec -X importtime ; les temps propres
+de chaque module sont cumulés par paquet de premier niveau. Sert à suivre le temps
+avant le premier affichage d'un nouveau pod.
+
+    python benchmarks/import_times.py                    # imports de Dashboard.py
+    python benchmarks/import_times.py --module retraites_engine --top 30
+    python benchmarks/import_times.py --json import_times.json
+
+Code de sortie 1 si un module lourd différé (MODULES_DIFFERES) est chargé au démarrage.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules lourds qui ne doivent pas être chargés au démarrage (Streamlit importe lui-même
+# plotly.graph_objects et plotly.io, peu coûteux ; plotly.express attend le premier graphique)
+MODULES_DIFFERES = ['plotly.express', 'matplotlib', 'seaborn', 'scipy', 'folium', 'streamlit_folium']
+
+
+def measure_imports(module):
+    """Temps propre et cumulé (µs) de chaque module importé par `import module`"""
+    env = {**os.environ, 'RETRAITES_WARMUP': '0', 'PYTHONPATH': RACINE}
+    resultat = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              cwd=RACINE, env=env, capture_output=True, text=True)
+    if resultat.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible:\n{resultat.stderr[-2000:]}")
+
+    modules = []
+    for ligne in resultat.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not ligne.startswith('import time:') or 'self [us]' in ligne:
+            continue
+        propre, cumule, nom = ligne[len('import time:'):].split('|')
+        modules.append({'module': nom.strip(), 'propre_us': int(propre), 'cumule_us': int(cumule)})
+    return modules
+
+
+def by_package(modules):
+    """Temps propre cumulé par paquet de premier niveau, du plus coûteux au moins coûteux"""
+    paquets = defaultdict(int)
+    for module in modules:
+        paquets[module['module'].split('.')[0]] += module['propre_us']
+    return dict(sorted(paquets.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ventilation des temps d'import au démarrage")
+    parser.add_argument('--module', default='Dashboard', help="Module importé (défaut: Dashboard)")
+    parser.add_argument('--top', type=int, default=15, help="Nombre de paquets affichés")
+    parser.add_argument('--json', help="Écrit le rapport complet dans ce fichier")
+    args = parser.parse_args()
+
+    modules = measure_imports(args.module)
+    paquets = by_package(modules)
+    total_us = sum(paquets.values())
+
+    print(f"Import de {args.module}: {total_us/1000:.0f} ms, {len(modules)} modules")
+    for paquet, duree_us in list(paquets.items())[:args.top]:
+        print(f"  {paquet:<30}{duree_us/1000:>10.1f} ms{duree_us/total_us*100:>8.1f} %")
+    noms = {module['module'] for module in modules}
+    charges = [nom for nom in MODULES_DIFFERES if nom in noms]
+    print("Modules différés chargés au démarrage: " + (', '.join(charges) if charges else "aucun"))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fichier:
+            json.dump({'module': args.module, 'total_ms': total_us / 1000, 'paquets_ms':
+                       {paquet: duree_us / 1000 for paquet, duree_us in paquets.items()},
+                       'modules': modules}, fichier, indent=2)
+        print(f"Rapport: {args.json}")
+    return 1 if charges else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+# run_suite.py
+"""Suite de benchmarks : générateurs, agrégations, sections du dashboard et page complète.
+
+Chaque mesure est répétée ; minimum et médiane sont écrits dans un fichier JSON puis
+comparés à une référence (benchmarks/baseline.json). Le minimum, peu sensible à la
+charge de la machine, est la mesure comparée. Une mesure est en régression si son
+minimum dépasse celui de la référence de plus de --seuil % augmenté du bruit observé
+dans la référence (écart médiane/minimum), et de plus de --marge ms (la marge absolue
+évite de signaler le bruit des mesures de quelques millisecondes) ; sa médiane doit
+aussi avoir dépassé la référence.
+
+    python benchmarks/run_suite.py --update-baseline    # référence, sur le commit de base
+    python benchmarks/run_suite.py                      # mesure et compare
+    python benchmarks/run_suite.py --filtre page        # seulement les mesures contenant « page »
+
+La référence dépend de la machine et n'est pas versionnée : l'intégration continue la
+génère avec --update-baseline sur le commit de base, puis mesure la branche sur la même
+machine. Sans référence, les mesures sont seulement écrites. Code de sortie 1 en cas
+de régression.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Historique persisté dans un dossier temporaire : les mesures ne touchent pas data_store/
+os.environ.setdefault('RETRAITES_DATA_DIR', tempfile.mkdtemp(prefix='retraites_bench_'))
+# Pas de préchargement en arrière-plan pendant les mesures de page
+os.environ.setdefault('RETRAITES_WARMUP', '0')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from streamlit import logger as st_logger  # noqa: E402
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RACINE)
+
+import pension_simulator  # noqa: E402
+import projections  # noqa: E402
+import reform_engine  # noqa: E402
+import retraites_engine  # noqa: E402
+
+st_logger.set_log_level('error')
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'latest.json')
+DEFAULT_THRESHOLD_PCT = 30.0
+DEFAULT_MARGIN_MS = 5.0
+
+DATES_DEBUT = ['2015-01-01', '1990-01-01', '1950-01-01']
+NOMBRES_CATEGORIES = [9, 50, 200]
+SECTIONS = ["Vue d'ensemble", "Catégories en direct", "Analyse par catégorie", "Évolution et projections",
+            "Comparaison territoires"]
+
+
+def mesurer(fonction, repetitions=10, echauffement=1):
+    """Médiane et minimum (ms) de plusieurs appels, après échauffement"""
+    for _ in range(echauffement):
+        fonction()
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return {'median_ms': statistics.median(durees), 'min_ms': min(durees), 'repetitions': repetitions}
+
+
+def calibrer():
+    """Minimum (ms) d'un calcul fixe numpy/pandas : vitesse de la machine au moment du run"""
+    rng = np.random.default_rng(0)
+    valeurs = rng.standard_normal(200_000)
+    frame = pd.DataFrame({'cle': rng.integers(0, 1_000, 200_000), 'valeur': valeurs})
+    return mesurer(lambda: (np.sort(valeurs), frame.groupby('cle')['valeur'].sum()), repetitions=20)['min_ms']
+
+
+def synthetic_categories(territory_code, n_categories):
+    """Catégories du territoire répétées jusqu'à n_categories (sous-régimes fictifs)"""
+    base = list(retraites_engine.get_categories_retraites(territory_code).items())
+    categories = {}
+    for i in range(n_categories):
+        code, info = base[i % len(base)]
+        categories[code if i < len(base) else f'{code}_{i}'] = info
+    return categories
+
+
+def bench_generators():
+    """Générateurs de données à plusieurs longueurs d'historique et nombres de catégories"""
+    territory_code, seed = 'REUNION', retraites_engine.DEFAULT_SEED
+    categories = retraites_engine.get_categories_retraites(territory_code)
+    resultats = {}
+
+    for date_debut in DATES_DEBUT:
+        for n_categories in NOMBRES_CATEGORIES:
+            cats = synthetic_categories(territory_code, n_categories)
+            resultats[f'historique/{date_debut[:4]}/{n_categories}cat'] = mesurer(
+                lambda: retraites_engine.build_historical_frame(territory_code, cats, seed, date_debut))
+
+    historique = retraites_engine.build_historical_frame(territory_code, categories, seed)
+    resultats['courant/build_current_frame'] = mesurer(
+        lambda: retraites_engine.build_current_frame(territory_code, categories, historique, seed))
+
+    territories = retraites_engine.get_territories_definitions()
+    store = retraites_engine.TerritoryDataStore()
+    live_data = {code: store.get(code, seed)['live_data'] for code in territories}
+    resultats['comparaison/statique'] = mesurer(lambda: retraites_engine.generate_comparison_data(territories))
+    resultats['comparaison/en_direct'] = mesurer(
+        lambda: retraites_engine.generate_comparison_data(territories, live_data))
+    resultats['stockage/chargement_territoire'] = mesurer(
+        lambda: retraites_engine.load_territory_frames(territory_code, seed), repetitions=5)
+    return resultats
+
+
+def bench_aggregations():
+    """Agrégats, mises à jour en direct et moteurs de calcul"""
+    territory_code, seed = 'REUNION', retraites_engine.DEFAULT_SEED
+    categories = retraites_engine.get_categories_retraites(territory_code)
+    resultats = {}
+
+    for date_debut in DATES_DEBUT:
+        historique = retraites_engine.build_historical_frame(territory_code, categories, seed, date_debut)
+        resultats[f'agregats/build/{date_debut[:4]}'] = mesurer(lambda: retraites_engine.build_aggregates(historique))
+        anciens = historique[historique['date'] < historique['date'].iloc[-1]]
+        nouveaux = historique[historique['date'] == historique['date'].iloc[-1]]
+        agregats = retraites_engine.build_aggregates(anciens)
+        resultats[f'agregats/update_1_mois/{date_debut[:4]}'] = mesurer(
+            lambda: retraites_engine.update_aggregates(agregats, nouveaux))
+
+    courant = retraites_engine.build_current_frame(
+        territory_code, categories, retraites_engine.build_historical_frame(territory_code, categories, seed), seed)
+    for n_ticks in [1, 100]:
+        resultats[f'live/apply_live_ticks/{n_ticks}'] = mesurer(
+            lambda: retraites_engine.apply_live_ticks(courant, territory_code, seed, 0, n_ticks))
+
+    age_data = retraites_engine.generate_age_data(territory_code)
+    parametres = projections.scenario_parameters(age_data, 1_000)
+    resultats['projections/1000_scenarios'] = mesurer(lambda: projections.project_demography(age_data, parametres))
+    resultats['projections/monte_carlo_10000'] = mesurer(
+        lambda: projections.simulate_projection_bands(age_data, n_paths=10_000,
+                                                     territory_code=territory_code), repetitions=5)
+
+    rng = np.random.default_rng(seed)
+    carrieres = pd.DataFrame({
+        'salaire_moyen': rng.uniform(1000, 5000, 100_000),
+        'trimestres_valides': rng.integers(80, 180, 100_000),
+        'age_depart': rng.integers(58, 70, 100_000),
+        'categorie': 'CNAV'
+    })
+    resultats['simulateur/100000_carrieres'] = mesurer(lambda: pension_simulator.simulate_pensions(carrieres))
+
+    engine = reform_engine.ReformEngine.from_careers(pd.concat(
+        [reform_engine.generate_synthetic_careers(code, seed) for code in ('REUNION', 'GUADELOUPE', 'MARTINIQUE')]))
+    appels = iter(range(1_000))
+
+    def reforme_inedite():
+        # Règles différentes à chaque appel : mesure du recalcul, pas du cache des réformes
+        appel = next(appels)
+        return engine.simulate(age_legal=63 + appel % 4, coefficient_decote=0.5 + appel / 1e4)
+
+    resultats['reformes/simulate'] = mesurer(reforme_inedite)
+    return resultats
+
+
+def bench_page():
+    """Exécutions complètes du dashboard dans l'AppTest headless de Streamlit"""
+    from streamlit.testing.v1 import AppTest
+
+    resultats = {}
+    app = AppTest.from_file(os.path.join(RACINE, 'Dashboard.py'), default_timeout=300)
+    debut = time.perf_counter()
+    app.run()
+    duree_ms = (time.perf_counter() - debut) * 1000
+    resultats['page/premiere_execution'] = {'median_ms': duree_ms, 'min_ms': duree_ms, 'repetitions': 1}
+    if app.exception:
+        raise RuntimeError(f"Exception dans le dashboard: {app.exception[0].value}")
+
+    # Mode paresseux : une section par exécution, temps de page et temps de la section seule
+    for section in SECTIONS:
+        app.radio(key="active_section").set_value(section).run()
+        resultats[f'page/section/{section}'] = mesurer(app.run, repetitions=5)
+        duree_ms = app.session_state['section_timings'][section]
+        resultats[f'section/{section}'] = {'median_ms': duree_ms, 'min_ms': duree_ms, 'repetitions': 1}
+
+    # Mode onglets : toutes les sections calculées à chaque exécution (RetraitesDashboard.run complet)
+    app.toggle(key="lazy_sections").set_value(False).run()
+    resultats['page/run_complet'] = mesurer(app.run, repetitions=5)
+    return resultats
+
+
+GROUPS = {'generateurs': bench_generators, 'agregations': bench_aggregations, 'page': bench_page}
+
+
+def compare(resultats, reference, seuil_pct, marge_ms, facteur=1.0):
+    """Liste des régressions : (nom, référence ms, mesure ms, écart %) sur les minimums
+
+    facteur rapporte la référence à la vitesse actuelle de la machine (rapport des
+    calibrations). Les mesures uniques (moins de 3 répétitions) sont indicatives.
+    """
+    regressions = []
+    for nom, mesure in resultats.items():
+        ref = reference.get(nom)
+        if ref is None or not ref.get('min_ms') or mesure.get('repetitions', 1) < 3:
+            continue
+        # Bruit de la référence elle-même : une mesure dispersée tolère un écart plus grand
+        bruit_pct = max(ref['median_ms'] / ref['min_ms'] - 1, 0) * 100
+        ref_min, ref_median = ref['min_ms'] * facteur, ref['median_ms'] * facteur
+        ecart_ms = mesure['min_ms'] - ref_min
+        ecart_pct = ecart_ms / ref_min * 100
+        if ecart_pct <= seuil_pct + bruit_pct or ecart_ms <= marge_ms:
+            continue
+        # La médiane doit aussi avoir régressé : un minimum isolé peut venir d'une référence chanceuse
+        if mesure['median_ms'] <= ref_median * (1 + seuil_pct / 100):
+            continue
+        regressions.append((nom, ref_min, mesure['min_ms'], ecart_pct))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RACINE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks du dashboard des retraites")
+    parser.add_argument('--groupes', nargs='+', choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument('--filtre', help="Ne garder que les mesures dont le nom contient ce texte")
+    parser.add_argument('--output', default=OUTPUT_PATH, help="Fichier JSON des résultats")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Fichier JSON de référence")
+    parser.add_argument('--seuil', type=float, default=DEFAULT_THRESHOLD_PCT, help="Régression au-delà de ce %%")
+    parser.add_argument('--marge', type=float, default=DEFAULT_MARGIN_MS, help="Écart absolu minimal (ms)")
+    parser.add_argument('--update-baseline', action='store_true', help="Écrit les résultats comme référence")
+    args = parser.parse_args()
+
+    calibration_ms = calibrer()
+    resultats = {}
+    for groupe in args.groupes:
+        print(f"== {groupe}", flush=True)
+        for nom, mesure in GROUPS[groupe]().items():
+            if args.filtre and args.filtre not in nom:
+                continue
+            resultats[nom] = mesure
+            print(f"{nom:<55}{mesure['min_ms']:>12.2f} ms (médiane {mesure['median_ms']:.2f})", flush=True)
+    # Calibration avant et après : une machine qui ralentit en cours de run est prise en compte
+    calibration_ms = (calibration_ms + calibrer()) / 2
+
+    rapport = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'plateforme': platform.platform(),
+            'processeurs': os.cpu_count(),
+            'calibration_ms': calibration_ms
+        },
+        'resultats': resultats
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as fichier:
+        json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+    print(f"\nRésultats: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as fichier:
+            json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+        print(f"Référence mise à jour: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Pas de référence : la générer sur le commit de base avec --update-baseline")
+        return 0
+    with open(args.baseline, encoding='utf-8') as fichier:
+        reference = json.load(fichier)
+
+    facteur = calibration_ms / reference['meta'].get('calibration_ms', calibration_ms)
+    print(f"Vitesse de la machine par rapport à la référence: ×{1 / facteur:.2f}")
+    regressions = compare(resultats, reference['resultats'], args.seuil, args.marge, facteur)
+    if not regressions:
+        print(f"Aucune régression (seuil {args.seuil:.0f} %, marge {args.marge:.0f} ms)")
+        return 0
+    print(f"\n{len(regressions)} régression(s) (seuil {args.seuil:.0f} %, marge {args.marge:.0f} ms):")
+    for nom, avant, apres, ecart in regressions:
+        print(f"  {nom:<55}{avant:>10.2f} -> {apres:>10.2f} ms ({ecart:+.0f} %)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+# ingestion.py
+"""Ingestion en flux d'exports de paiements de pensions (CSV ou Excel).
+
+Le fichier est lu par blocs : chaque bloc est validé puis agrégé en lignes
+mensuelles par territoire et catégorie. La mémoire utilisée dépend du nombre
+de (territoire, mois, catégorie), pas de la taille du fichier. Les historiques
+obtenus respectent le schéma de build_historical_frame et sont écrits dans le
+stockage Parquet du dashboard, sous le scénario des données réelles.
+
+Colonnes attendues : date, territoire, categorie, montant
+Colonne optionnelle : nombre_beneficiaires (1 par ligne de paiement sinon)
+
+    python ingestion.py export_pensions.csv [--chunksize 200000]
+"""
+import argparse
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from retraites_engine import (
+    HISTORICAL_DTYPES,
+    REAL_DATA_SCENARIO,
+    get_categories_retraites,
+    get_territories_definitions,
+    parquet_store,
+    validate_historical_frame
+)
+
+REQUIRED_COLUMNS = ['date', 'territoire', 'categorie', 'montant']
+OPTIONAL_COLUMNS = ['nombre_beneficiaires']
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class IngestionError(ValueError):
+    """Fichier d'export inutilisable (colonnes manquantes, format inconnu, écriture impossible...)
+
+    territoires : territoires dont l'historique a malgré tout été écrit avant l'erreur
+    """
+
+    def __init__(self, message, territoires=()):
+        super().__init__(message)
+        self.territoires = list(territoires)
+
+
+def _file_name(source):
+    return source if isinstance(source, str) else getattr(source, 'name', '')
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Lit un export CSV ou Excel par blocs de chunksize lignes"""
+    try:
+        yield from _iter_file_chunks(source, chunksize)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, zipfile.BadZipFile) as exc:
+        # Export mal formé, vide ou mal encodé
+        raise IngestionError(f"Fichier illisible: {exc}") from exc
+
+
+def _iter_file_chunks(source, chunksize):
+    name = _file_name(source).lower()
+    if name.endswith(('.xlsx', '.xlsm')):
+        yield from _iter_excel_chunks(source, chunksize)
+    elif name.endswith(('.csv', '.txt', '.csv.gz')) or not name:
+        colonnes = set(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+        yield from pd.read_csv(source, chunksize=chunksize, usecols=lambda c: c in colonnes,
+                               dtype={'territoire': str, 'categorie': str})
+    else:
+        raise IngestionError(f"Format de fichier non pris en charge: {name}")
+
+
+def _iter_excel_chunks(source, chunksize):
+    """Lecture Excel en mode streaming (openpyxl read_only) : une ligne à la fois en mémoire"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise IngestionError("La lecture des fichiers Excel nécessite openpyxl") from exc
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        bloc = []
+        for row in rows:
+            bloc.append(row)
+            if len(bloc) >= chunksize:
+                yield pd.DataFrame(bloc, columns=header)
+                bloc = []
+        if bloc:
+            yield pd.DataFrame(bloc, columns=header)
+    finally:
+        workbook.close()
+
+
+def validate_chunk(chunk):
+    """Normalise un bloc et écarte les lignes invalides ; renvoie (lignes valides, nombre rejeté)"""
+    manquantes = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if manquantes:
+        raise IngestionError(f"Colonnes manquantes: {', '.join(manquantes)}")
+
+    bloc = pd.DataFrame({
+        'date': pd.to_datetime(chunk['date'], errors='coerce'),
+        'territoire': chunk['territoire'].astype(str).str.strip().str.upper(),
+        'categorie': chunk['categorie'].astype(str).str.strip().str.upper(),
+        'montant': pd.to_numeric(chunk['montant'], errors='coerce'),
+        'nombre_beneficiaires': (pd.to_numeric(chunk['nombre_beneficiaires'], errors='coerce')
+                                 if 'nombre_beneficiaires' in chunk.columns else 1.0)
+    })
+
+    territoires = get_territories_definitions()
+    valide = bloc['date'].notna() & (bloc['montant'] >= 0) & (bloc['nombre_beneficiaires'] > 0)
+    valide &= bloc['territoire'].isin(list(territoires))
+    # Catégorie connue pour le territoire de la ligne
+    for territory_code in bloc.loc[valide, 'territoire'].unique():
+        du_territoire = bloc['territoire'] == territory_code
+        valide &= ~du_territoire | bloc['categorie'].isin(list(get_categories_retraites(territory_code)))
+
+    return bloc[valide], int((~valide).sum())
+
+
+class MonthlyAccumulator:
+    """Totaux mensuels (territoire, mois, catégorie) cumulés bloc après bloc"""
+
+    def __init__(self):
+        self.totaux = None
+
+    def add(self, bloc):
+        mois = bloc['date'].dt.to_period('M').dt.to_timestamp(how='end').dt.normalize()
+        partiel = bloc.groupby([bloc['territoire'], mois.rename('date'), bloc['categorie']]).agg(
+            montant_total_pensions=('montant', 'sum'),
+            nombre_beneficiaires=('nombre_beneficiaires', 'sum')
+        )
+        self.totaux = partiel if self.totaux is None else self.totaux.add(partiel, fill_value=0)
+
+    def historical_frames(self):
+        """Une trame historique par territoire, au schéma de build_historical_frame"""
+        if self.totaux is None:
+            return {}
+        frames = {}
+        for territory_code, totaux in self.totaux.groupby(level='territoire'):
+            categories = get_categories_retraites(territory_code)
+            totaux = totaux.droplevel('territoire').reset_index().sort_values(['date', 'categorie'])
+            # Évolution mensuelle (%) par catégorie, 0 pour le premier mois connu
+            evolution = totaux.groupby('categorie')['montant_total_pensions'].pct_change().fillna(0) * 100
+            frame = pd.DataFrame({
+                'date': totaux['date'].to_numpy(dtype='datetime64[ns]'),
+                'categorie': pd.Categorical(totaux['categorie'], categories=list(categories)),
+                'montant_total_pensions': totaux['montant_total_pensions'].to_numpy(dtype=np.float64),
+                'nombre_beneficiaires': totaux['nombre_beneficiaires'].to_numpy(dtype=np.float32),
+                'montant_moyen': (totaux['montant_total_pensions'] / totaux['nombre_beneficiaires']).to_numpy(
+                    dtype=np.float32),
+                'categorie_principale': pd.Categorical(
+                    [categories[code]['categorie'] for code in totaux['categorie']],
+                    categories=list(dict.fromkeys(info['categorie'] for info in categories.values()))
+                ),
+                'evolution_mensuelle': evolution.to_numpy(dtype=np.float32)
+            })
+            frames[territory_code] = validate_historical_frame(frame.astype(HISTORICAL_DTYPES))
+        return frames
+
+
+def _merge_with_existing(territory_code, frame):
+    """Remplace les mois présents dans l'export et conserve les autres mois déjà ingérés"""
+    existant = parquet_store.read_history(territory_code, REAL_DATA_SCENARIO)
+    if existant is None:
+        return frame
+    conserves = existant[~existant['date'].isin(frame['date'].unique())]
+    fusion = pd.concat([conserves, frame], ignore_index=True).sort_values(['date', 'categorie'], kind='stable')
+    return fusion.reset_index(drop=True).astype(HISTORICAL_DTYPES)
+
+
+def ingest_pension_file(source, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """Ingère un export et écrit les historiques mensuels dans le stockage ; renvoie un rapport"""
+    if not parquet_store.is_available():
+        raise IngestionError("L'ingestion nécessite pyarrow pour écrire le stockage Parquet")
+
+    debut = time.perf_counter()
+    accumulateur = MonthlyAccumulator()
+    lignes_lues = lignes_rejetees = 0
+
+    for chunk in iter_chunks(source, chunksize):
+        bloc, rejetees = validate_chunk(chunk)
+        accumulateur.add(bloc)
+        lignes_lues += len(chunk)
+        lignes_rejetees += rejetees
+        if progress is not None:
+            progress(lignes_lues, lignes_lues / max(time.perf_counter() - debut, 1e-9))
+
+    frames = accumulateur.historical_frames()
+    if not frames:
+        raise IngestionError(f"Aucune ligne valide ({lignes_rejetees:,} lignes rejetées)")
+    ecrits, echecs = [], []
+    for territory_code, frame in frames.items():
+        if parquet_store.write_history(territory_code, REAL_DATA_SCENARIO, _merge_with_existing(territory_code, frame)):
+            ecrits.append(territory_code)
+        else:
+            echecs.append(territory_code)
+    if echecs:
+        raise IngestionError(f"Écriture impossible dans {parquet_store.root} pour: {', '.join(sorted(echecs))}",
+                             territoires=sorted(ecrits))
+
+    duree = time.perf_counter() - debut
+    return {
+        'lignes_lues': lignes_lues,
+        'lignes_rejetees': lignes_rejetees,
+        'territoires': sorted(frames),
+        'lignes_mensuelles': sum(len(frame) for frame in frames.values()),
+        'duree_s': duree,
+        'lignes_par_s': lignes_lues / duree if duree > 0 else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion d'exports de paiements de pensions")
+    parser.add_argument('fichier', help="Export CSV ou Excel (.xlsx)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Lignes lues par bloc")
+    args = parser.parse_args()
+
+    def progress(lignes, debit):
+        print(f"\r{lignes:,} lignes lues ({debit:,.0f} lignes/s)", end='', flush=True)
+
+    rapport = ingest_pension_file(args.fichier, args.chunksize, progress)
+    print(f"\nTerritoires: {', '.join(rapport['territoires']) or 'aucun'}")
+    print(f"Lignes lues: {rapport['lignes_lues']:,} | rejetées: {rapport['lignes_rejetees']:,} | "
+          f"lignes mensuelles écrites: {rapport['lignes_mensuelles']:,}")
+    print(f"Durée: {rapport['duree_s']:.1f} s | débit: {rapport['lignes_par_s']:,.0f} lignes/s")
+    print(f"Stockage: {os.path.abspath(parquet_store.root)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+# instrumentation.py
+"""Instrumentation des chemins chauds : temps d'exécution, succès du cache et mémoire des sessions.
+
+Activée par RETRAITES_INSTRUMENTATION=1. Désactivée, les décorateurs renvoient la
+fonction d'origine (ou le st.cache_data d'origine) : aucun surcoût par appel.
+Les mesures sont cumulées par processus et exportables au format texte Prometheus,
+depuis le panneau d'administration ou sur http://127.0.0.1:<port>/metrics. Le serveur
+d'export est démarré par chaque processus au lancement (get_metrics_server) : port
+RETRAITES_METRICS_PORT pour le dashboard, RETRAITES_API_METRICS_PORT pour api.py.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+from streamlit import logger as st_logger
+
+ENABLED = os.environ.get('RETRAITES_INSTRUMENTATION', '0') == '1'
+
+# Port local de l'export Prometheus (0 : pas de serveur, export depuis le panneau seulement)
+METRICS_PORT = int(os.environ.get('RETRAITES_METRICS_PORT', 9464))
+
+# Sessions dont la mémoire est conservée (les plus anciennes sont oubliées)
+MAX_SESSIONS = 256
+
+logger = st_logger.get_logger(__name__)
+
+
+class Metrics:
+    """Compteurs cumulés du processus : durées par nom, succès/défauts par cache, mémoire par session"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.durees = {}
+        self.caches = {}
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, nom, duree_s):
+        with self._lock:
+            appels, total, maximum = self.durees.get(nom, (0, 0.0, 0.0))
+            self.durees[nom] = (appels + 1, total + duree_s, max(maximum, duree_s))
+
+    def record_cache(self, nom, succes):
+        with self._lock:
+            hits, misses = self.caches.get(nom, (0, 0))
+            self.caches[nom] = (hits + 1, misses) if succes else (hits, misses + 1)
+
+    def record_session_memory(self, session_id, octets):
+        with self._lock:
+            self.sessions[session_id] = octets
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+    def snapshot(self):
+        """Copie cohérente des compteurs (durées, caches, sessions)"""
+        with self._lock:
+            return dict(self.durees), dict(self.caches), dict(self.sessions)
+
+    def reset(self):
+        with self._lock:
+            self.durees.clear()
+            self.caches.clear()
+            self.sessions.clear()
+
+
+METRICS = Metrics()
+
+# Pile des appels en cache en cours dans le thread : un appel imbriqué ne marque pas son parent
+_appels_en_cours = threading.local()
+
+
+def timed(nom=None):
+    """Décorateur : cumule le temps d'exécution de la fonction sous ce nom"""
+    def decorateur(fonction):
+        if not ENABLED:
+            return fonction
+        cle = nom or fonction.__name__
+
+        @functools.wraps(fonction)
+        def mesure(*args, **kwargs):
+            debut = time.perf_counter()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                METRICS.record(cle, time.perf_counter() - debut)
+        return mesure
+    return decorateur
+
+
+def cache_data(**options):
+    """st.cache_data instrumenté : temps de chaque appel et succès/défauts du cache"""
+    def decorateur(fonction):
+        if not ENABLED:
+            return st.cache_data(**options)(fonction)
+        cle = fonction.__name__
+
+        @functools.wraps(fonction)
+        def calcul(*args, **kwargs):
+            # Exécuté seulement en cas de défaut du cache
+            _appels_en_cours.pile[-1] = True
+            return fonction(*args, **kwargs)
+
+        cached = st.cache_data(**options)(calcul)
+
+        @functools.wraps(fonction)
+        def appel(*args, **kwargs):
+            pile = _appels_en_cours.__dict__.setdefault('pile', [])
+            pile.append(False)
+            debut = time.perf_counter()
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                METRICS.record(cle, time.perf_counter() - debut)
+                METRICS.record_cache(cle, succes=not pile.pop())
+
+        appel.clear = cached.clear
+        return appel
+    return decorateur
+
+
+@contextmanager
+def _mesure_bloc(nom):
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.record(nom, time.perf_counter() - debut)
+
+
+def measure(nom):
+    """Gestionnaire de contexte : cumule le temps du bloc sous ce nom (rien si désactivé)"""
+    return _mesure_bloc(nom) if ENABLED else _BLOC_VIDE
+
+
+class _BlocVide:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_BLOC_VIDE = _BlocVide()
+
+
+def record(nom, duree_s):
+    """Ajoute une durée déjà mesurée (rien si désactivé)"""
+    if ENABLED:
+        METRICS.record(nom, duree_s)
+
+
+def record_session_memory(session_id, octets):
+    if ENABLED:
+        METRICS.record_session_memory(session_id, octets)
+
+
+def _label(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(metrics=METRICS):
+    """Mesures au format d'exposition texte de Prometheus"""
+    durees, caches, sessions = metrics.snapshot()
+    lignes = [
+        '# HELP retraites_duration_seconds Temps d\'exécution cumulé par fonction ou section',
+        '# TYPE retraites_duration_seconds summary'
+    ]
+    for nom, (appels, total, _) in sorted(durees.items()):
+        lignes.append(f'retraites_duration_seconds_sum{{name="{_label(nom)}"}} {total:.6f}')
+        lignes.append(f'retraites_duration_seconds_count{{name="{_label(nom)}"}} {appels}')
+    lignes += ['# HELP retraites_duration_max_seconds Plus long appel observé',
+               '# TYPE retraites_duration_max_seconds gauge']
+    for nom, (_, _, maximum) in sorted(durees.items()):
+        lignes.append(f'retraites_duration_max_seconds{{name="{_label(nom)}"}} {maximum:.6f}')
+    lignes += ['# HELP retraites_cache_hits_total Appels servis par le cache st.cache_data',
+               '# TYPE retraites_cache_hits_total counter']
+    for nom, (hits, _) in sorted(caches.items()):
+        lignes.append(f'retraites_cache_hits_total{{function="{_label(nom)}"}} {hits}')
+    lignes += ['# HELP retraites_cache_misses_total Appels recalculés par st.cache_data',
+               '# TYPE retraites_cache_misses_total counter']
+    for nom, (_, misses) in sorted(caches.items()):
+        lignes.append(f'retraites_cache_misses_total{{function="{_label(nom)}"}} {misses}')
+    lignes += ['# HELP retraites_session_memory_bytes Mémoire des données propres à chaque session',
+               '# TYPE retraites_session_memory_bytes gauge']
+    for session_id, octets in sessions.items():
+        lignes.append(f'retraites_session_memory_bytes{{session="{_label(session_id)}"}} {octets}')
+    return '\n'.join(lignes) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        corps = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_server(port=METRICS_PORT):
+    """Serveur local de l'export Prometheus, démarré une fois par processus (None si désactivé)"""
+    if not ENABLED or not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(('127.0.0.1', port), _MetricsHandler)
+    except OSError as exc:
+        logger.warning("Export Prometheus indisponible sur le port %s: %s", port, exc)
+        return None
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,244 @@
+# parquet_store.py
+"""Stockage colonnaire sur disque des données de retraites par territoire.
+
+Historique : fichiers Parquet partitionnés par scénario, territoire et année
+    <racine>/historique/scenario=<s>/territoire=<code>/annee=<aaaa>/part-0.parquet
+Instantané courant : un fichier Arrow IPC par territoire et mois de référence
+    <racine>/courant/scenario=<s>/territoire=<code>/<aaaa-mm>.arrow
+
+Les lectures passent par un système de fichiers à mémoire mappée : seules les
+colonnes et les années demandées sont lues depuis le disque.
+"""
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow est optionnel : sans lui, les données sont régénérées en mémoire
+    PYARROW_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:  # hors POSIX : seuls les écrivains d'un même processus sont sérialisés
+    fcntl = None
+
+DEFAULT_DATA_DIR = os.environ.get(
+    'RETRAITES_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_store')
+)
+
+# Fichiers temporaires et versions en cours d'écriture, jamais lus comme données
+IGNORED_PREFIXES = ['.', '_']
+
+# Clé d'une ligne d'historique : un mois réécrit remplace les lignes existantes
+HISTORY_KEY = ['date', 'categorie']
+
+# Verrous par territoire des écrivains d'un même processus (le verrou de fichier
+# sérialise les processus : préchargement, sessions Streamlit, API)
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+class ParquetTerritoryStore:
+    """Lecture/écriture de l'historique (Parquet) et de l'instantané courant (Arrow IPC)"""
+
+    def __init__(self, root=DEFAULT_DATA_DIR):
+        self.root = root
+        self._filesystem = pafs.LocalFileSystem(use_mmap=True) if PYARROW_AVAILABLE else None
+
+    @staticmethod
+    def is_available():
+        return PYARROW_AVAILABLE
+
+    def _history_dir(self, territory_code, scenario):
+        return os.path.join(self.root, 'historique', f'scenario={scenario}', f'territoire={territory_code}')
+
+    def _current_path(self, territory_code, scenario, as_of):
+        return os.path.join(self.root, 'courant', f'scenario={scenario}', f'territoire={territory_code}',
+                            f'{pd.Timestamp(as_of):%Y-%m}.arrow')
+
+    @contextmanager
+    def _writer_lock(self, territory_code, scenario):
+        """Un seul écrivain à la fois par territoire, entre fils et entre processus
+
+        Les fichiers verrous sont rangés hors de l'historique (<racine>/.verrous) :
+        ils survivent au remplacement du répertoire du territoire par write_history.
+        """
+        lock_dir = os.path.join(self.root, '.verrous')
+        os.makedirs(lock_dir, exist_ok=True)
+        lock_path = os.path.join(lock_dir, f'historique-{scenario}-{territory_code}.lock')
+        with _THREAD_LOCKS_GUARD:
+            thread_lock = _THREAD_LOCKS.setdefault(lock_path, threading.Lock())
+        with thread_lock, open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def has_history(self, territory_code, scenario):
+        return PYARROW_AVAILABLE and os.path.isdir(self._history_dir(territory_code, scenario))
+
+    def write_history(self, territory_code, scenario, historical_data):
+        """Écrit (en remplaçant) l'historique d'un territoire, un fichier par année
+
+        La nouvelle version est construite dans un répertoire voisin puis mise en place
+        par renommage : un lecteur voit l'ancienne ou la nouvelle version, jamais un mélange.
+        """
+        if not PYARROW_AVAILABLE:
+            return False
+        territory_dir = self._history_dir(territory_code, scenario)
+        parent, nom = os.path.split(territory_dir)
+        suffixe = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        new_dir = os.path.join(parent, f'.{nom}.new-{suffixe}')
+        old_dir = os.path.join(parent, f'.{nom}.old-{suffixe}')
+        try:
+            with self._writer_lock(territory_code, scenario):
+                if not self._write_years(new_dir, historical_data):
+                    return False
+                # Un répertoire non vide ne peut pas être remplacé d'un seul rename :
+                # l'ancien est d'abord écarté, puis supprimé une fois le nouveau en place
+                if os.path.isdir(territory_dir):
+                    os.replace(territory_dir, old_dir)
+                os.replace(new_dir, territory_dir)
+        except OSError:
+            return False
+        finally:
+            shutil.rmtree(new_dir, ignore_errors=True)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        return True
+
+    def append_history(self, territory_code, scenario, new_rows):
+        """Ajoute des lignes à l'historique : seules les années concernées sont réécrites
+
+        Idempotent : un mois déjà présent (même passage de mois traité par un autre
+        processus) remplace les lignes existantes au lieu de les dupliquer.
+        """
+        if not PYARROW_AVAILABLE:
+            return False
+        try:
+            with self._writer_lock(territory_code, scenario):
+                return self._write_years(self._history_dir(territory_code, scenario), new_rows)
+        except OSError:
+            # Disque en lecture seule ou plein : les données restent servies depuis la mémoire
+            return False
+
+    @staticmethod
+    def _write_years(territory_dir, new_rows):
+        """Écrit les lignes dans les partitions annuelles de territory_dir (fusion avec l'existant)
+
+        À appeler sous _writer_lock : la partition lue ne doit pas changer avant son remplacement.
+        """
+        if new_rows.empty:
+            return False
+        for annee, rows in new_rows.groupby(new_rows['date'].dt.year, sort=True):
+            year_dir = os.path.join(territory_dir, f'annee={annee}')
+            path = os.path.join(year_dir, 'part-0.parquet')
+            if os.path.exists(path):
+                existants = pq.read_table(path, memory_map=True).to_pandas()
+                # Les nouvelles lignes l'emportent sur celles d'un mois déjà écrit
+                rows = (pd.concat([existants, rows], ignore_index=True)
+                        .drop_duplicates(subset=HISTORY_KEY, keep='last')
+                        .sort_values('date', kind='stable')
+                        .reset_index(drop=True))
+            os.makedirs(year_dir, exist_ok=True)
+            # Fichier temporaire puis renommage : un lecteur ne voit jamais un fichier partiel.
+            # Le préfixe '.' le tient hors du dataset (ignore_prefixes de read_history)
+            tmp_path = os.path.join(year_dir, f'.part-0.parquet.{uuid.uuid4().hex}.tmp')
+            try:
+                pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return True
+
+    def read_history(self, territory_code, scenario, columns=None, date_debut=None, date_fin=None):
+        """Lit l'historique, limité aux colonnes et à l'intervalle de dates demandés"""
+        if not self.has_history(territory_code, scenario):
+            return None
+        dataset = ds.dataset(self._history_dir(territory_code, scenario), format='parquet',
+                             partitioning='hive', filesystem=self._filesystem,
+                             ignore_prefixes=IGNORED_PREFIXES)
+
+        # Les bornes de dates élaguent d'abord les partitions annuelles, puis filtrent les lignes
+        filtre = None
+        if date_debut is not None:
+            date_debut = pd.Timestamp(date_debut)
+            filtre = (ds.field('annee') >= date_debut.year) & (ds.field('date') >= date_debut)
+        if date_fin is not None:
+            date_fin = pd.Timestamp(date_fin)
+            borne = (ds.field('annee') <= date_fin.year) & (ds.field('date') <= date_fin)
+            filtre = borne if filtre is None else filtre & borne
+
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name != 'annee']
+        table = dataset.to_table(columns=list(columns), filter=filtre)
+        frame = table.to_pandas()
+        if 'date' in frame.columns:
+            frame = frame.sort_values('date', kind='stable').reset_index(drop=True)
+        return frame
+
+    def last_history_date(self, territory_code, scenario):
+        """Dernière date présente sur disque, en ne lisant que la colonne date de la dernière année"""
+        if not self.has_history(territory_code, scenario):
+            return None
+        territory_dir = self._history_dir(territory_code, scenario)
+        annees = sorted(int(name.split('=')[1]) for name in os.listdir(territory_dir) if name.startswith('annee='))
+        if not annees:
+            return None
+        path = os.path.join(territory_dir, f'annee={annees[-1]}', 'part-0.parquet')
+        dates = pq.read_table(path, columns=['date'], memory_map=True).column('date')
+        return pd.Timestamp(dates.to_pandas().max())
+
+    def history_signature(self, territory_code, scenario):
+        """Identité de l'historique sur disque : (année, mtime, taille, inode) de chaque partition
+
+        Change dès qu'une partition est réécrite (ajout de mois, nouvel export ingéré),
+        même si la dernière date reste la même. None si l'historique n'est pas persisté.
+        """
+        if not self.has_history(territory_code, scenario):
+            return None
+        territory_dir = self._history_dir(territory_code, scenario)
+        signature = []
+        try:
+            for name in sorted(os.listdir(territory_dir)):
+                if name.startswith('annee='):
+                    stat = os.stat(os.path.join(territory_dir, name, 'part-0.parquet'))
+                    signature.append((name, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except OSError:  # historique remplacé pendant le parcours
+            return None
+        return tuple(signature)
+
+    def write_current(self, territory_code, scenario, as_of, current_data):
+        """Écrit l'instantané courant calculé à partir du mois de référence as_of (Arrow IPC)"""
+        if not PYARROW_AVAILABLE:
+            return False
+        path = self._current_path(territory_code, scenario, as_of)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            feather.write_feather(current_data, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        except OSError:
+            return False
+        return True
+
+    def read_current(self, territory_code, scenario, as_of, columns=None):
+        """Lit l'instantané courant (fichier non compressé, donc réellement mappé en mémoire)"""
+        path = self._current_path(territory_code, scenario, as_of)
+        if not PYARROW_AVAILABLE or not os.path.exists(path):
+            return None
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
@@ -0,0 +1,236 @@
+# pension_simulator.py
+"""Simulateur de pensions par lot : une pension par carrière, calculée de façon vectorisée.
+
+Reprend la formule simplifiée du simulateur du dashboard (taux plein, taux réduit,
+décote selon les trimestres validés) pour des tables de milliers à millions de
+carrières. Les fichiers CSV sont lus et écrits par blocs : la mémoire utilisée
+dépend de la taille des blocs, pas du nombre de carrières.
+
+Colonnes attendues : salaire_moyen, trimestres_valides, age_depart, categorie
+Colonne optionnelle : type_calcul (Taux plein, Taux réduit ou Décote)
+
+    python pension_simulator.py carrieres.csv -o pensions.csv [--chunksize 200000]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:  # écriture CSV par pandas, plus lente
+    PYARROW_AVAILABLE = False
+
+CAREER_COLUMNS = ['salaire_moyen', 'trimestres_valides', 'age_depart', 'categorie']
+OPTIONAL_COLUMNS = ['type_calcul']
+DEFAULT_CHUNKSIZE = 200_000
+# Décimales conservées dans les fichiers de résultats
+ARRONDIS = {'taux': 4, 'pension_mensuelle': 2, 'pension_annuelle': 2}
+
+TYPES_CALCUL = ['Taux plein', 'Taux réduit', 'Décote']
+TAUX_PLEIN = 0.5
+TAUX_REDUIT = 0.4
+TAUX_MINIMUM = 0.375
+TRIMESTRES_TAUX_PLEIN = 162
+# Âge d'annulation de la décote : taux plein quel que soit le nombre de trimestres
+AGE_TAUX_PLEIN = 67
+COEFFICIENT_DECOTE = 0.625
+
+# Règles de calcul en vigueur, modifiables par une réforme (voir reform_engine.py)
+REFERENCE_RULES = {
+    'age_legal': 62,
+    'trimestres_requis': TRIMESTRES_TAUX_PLEIN,
+    'coefficient_decote': COEFFICIENT_DECOTE,
+    'age_taux_plein': AGE_TAUX_PLEIN
+}
+
+
+class SimulationError(ValueError):
+    """Table de carrières inutilisable (colonnes manquantes...)"""
+
+
+def compute_rates(trimestres_valides, age_depart, type_calcul=None, regles=None):
+    """Taux de liquidation de chaque carrière
+
+    Sans type de calcul imposé, la décote s'applique avant l'âge du taux plein et
+    s'annule au nombre de trimestres requis (règles de REFERENCE_RULES par défaut).
+    """
+    regles = {**REFERENCE_RULES, **(regles or {})}
+    trimestres_valides = np.asarray(trimestres_valides, dtype=float)
+    trimestres_requis = regles['trimestres_requis']
+    decote = np.maximum(
+        TAUX_MINIMUM,
+        TAUX_PLEIN - regles['coefficient_decote'] * np.maximum(0, trimestres_requis - trimestres_valides)
+        / trimestres_requis
+    )
+    taux = np.where(np.asarray(age_depart, dtype=float) >= regles['age_taux_plein'], TAUX_PLEIN, decote)
+    if type_calcul is not None:
+        type_calcul = np.asarray(type_calcul, dtype=object)
+        taux = np.where(type_calcul == 'Taux plein', TAUX_PLEIN, taux)
+        taux = np.where(type_calcul == 'Taux réduit', TAUX_REDUIT, taux)
+        taux = np.where(type_calcul == 'Décote', decote, taux)
+    return taux
+
+
+def simulate_pensions(careers):
+    """Ajoute taux, pension mensuelle et pension annuelle à une table de carrières"""
+    manquantes = [c for c in CAREER_COLUMNS if c not in careers.columns]
+    if manquantes:
+        raise SimulationError(f"Colonnes manquantes: {', '.join(manquantes)}")
+    taux = compute_rates(careers['trimestres_valides'], careers['age_depart'], careers.get('type_calcul'))
+    pension_mensuelle = careers['salaire_moyen'].to_numpy(dtype=float) * taux
+    return careers.assign(taux=taux, pension_mensuelle=pension_mensuelle, pension_annuelle=pension_mensuelle * 12)
+
+
+def validate_careers(chunk):
+    """Normalise un bloc de carrières et écarte les lignes invalides ; renvoie (valides, nombre rejeté)"""
+    manquantes = [c for c in CAREER_COLUMNS if c not in chunk.columns]
+    if manquantes:
+        raise SimulationError(f"Colonnes manquantes: {', '.join(manquantes)}")
+
+    careers = pd.DataFrame({
+        'salaire_moyen': pd.to_numeric(chunk['salaire_moyen'], errors='coerce'),
+        'trimestres_valides': pd.to_numeric(chunk['trimestres_valides'], errors='coerce'),
+        'age_depart': pd.to_numeric(chunk['age_depart'], errors='coerce'),
+        'categorie': chunk['categorie'].astype(str).str.strip().str.upper()
+    })
+    if 'type_calcul' in chunk.columns:
+        careers['type_calcul'] = chunk['type_calcul'].astype(object)
+
+    valide = (careers['salaire_moyen'] >= 0) & (careers['trimestres_valides'] >= 0) & careers['age_depart'].notna()
+    if 'type_calcul' in careers.columns:
+        valide &= careers['type_calcul'].isna() | careers['type_calcul'].isin(TYPES_CALCUL)
+    # Types fixes d'un bloc à l'autre : trimestres et âge en années entières
+    careers = careers[valide].astype({'salaire_moyen': 'float64', 'trimestres_valides': 'int64',
+                                      'age_depart': 'int64'})
+    return careers, int((~valide).sum())
+
+
+def iter_simulated_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Lit une table de carrières CSV par blocs et renvoie chaque bloc simulé avec ses rejets"""
+    colonnes = set(CAREER_COLUMNS + OPTIONAL_COLUMNS)
+    for chunk in pd.read_csv(source, chunksize=chunksize, usecols=lambda c: c in colonnes,
+                             dtype={'categorie': str, 'type_calcul': str}):
+        careers, rejetees = validate_careers(chunk)
+        yield simulate_pensions(careers), len(chunk), rejetees
+
+
+class CohortSummary:
+    """Synthèse par catégorie cumulée bloc après bloc (effectifs, montants, taux moyen)"""
+
+    def __init__(self):
+        self.totaux = None
+
+    def add(self, pensions):
+        partiel = pensions.groupby('categorie').agg(
+            effectif=('pension_mensuelle', 'size'),
+            pension_mensuelle_totale=('pension_mensuelle', 'sum'),
+            taux_total=('taux', 'sum')
+        )
+        self.totaux = partiel if self.totaux is None else self.totaux.add(partiel, fill_value=0)
+
+    def frame(self):
+        if self.totaux is None:
+            return pd.DataFrame(columns=['categorie', 'effectif', 'pension_mensuelle_moyenne',
+                                         'pension_mensuelle_totale', 'taux_moyen'])
+        synthese = self.totaux.reset_index()
+        synthese['effectif'] = synthese['effectif'].astype(int)
+        synthese['pension_mensuelle_moyenne'] = synthese['pension_mensuelle_totale'] / synthese['effectif']
+        synthese['taux_moyen'] = synthese.pop('taux_total') / synthese['effectif']
+        return synthese[['categorie', 'effectif', 'pension_mensuelle_moyenne', 'pension_mensuelle_totale',
+                         'taux_moyen']]
+
+
+class CsvResultWriter:
+    """Écrit les blocs de résultats à la suite dans un CSV (pyarrow si disponible, sinon pandas)
+
+    destination est un chemin (compressé s'il finit par .gz) ou un fichier binaire ouvert.
+    """
+
+    def __init__(self, destination):
+        self.destination = destination
+        self.lignes = 0
+        self._schema = None
+        self._writer = None
+        self._stream = None
+        self._entete_ecrite = False
+
+    def write(self, frame):
+        frame = frame.round(ARRONDIS)
+        if PYARROW_AVAILABLE:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                # Une colonne entièrement vide du premier bloc (type_calcul) est typée en texte
+                self._schema = pa.schema([champ.with_type(pa.string()) if pa.types.is_null(champ.type) else champ
+                                          for champ in table.schema])
+                if isinstance(self.destination, str):
+                    self._stream = (pa.CompressedOutputStream(self.destination, 'gzip')
+                                    if self.destination.endswith('.gz') else pa.OSFile(self.destination, 'wb'))
+                self._writer = pa_csv.CSVWriter(self._stream or self.destination, self._schema)
+            self._writer.write_table(table.cast(self._schema))
+        else:
+            premier_bloc = not self._entete_ecrite
+            frame.to_csv(self.destination, mode='w' if isinstance(self.destination, str) and premier_bloc else 'a',
+                         header=premier_bloc, index=False)
+            self._entete_ecrite = True
+        self.lignes += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._stream is not None:
+            self._stream.close()
+
+
+def simulate_pension_file(source, destination, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """Simule un fichier de carrières et écrit les pensions au fil de l'eau ; renvoie un rapport
+
+    Chaque bloc est écrit dans destination (voir CsvResultWriter) dès qu'il est calculé.
+    """
+    debut = time.perf_counter()
+    synthese = CohortSummary()
+    writer = CsvResultWriter(destination)
+    lignes_lues = lignes_rejetees = 0
+
+    try:
+        for pensions, lues, rejetees in iter_simulated_chunks(source, chunksize):
+            writer.write(pensions)
+            synthese.add(pensions)
+            lignes_lues += lues
+            lignes_rejetees += rejetees
+            if progress is not None:
+                progress(lignes_lues, lignes_lues / max(time.perf_counter() - debut, 1e-9))
+    finally:
+        writer.close()
+
+    duree = time.perf_counter() - debut
+    return {
+        'lignes_lues': lignes_lues,
+        'lignes_rejetees': lignes_rejetees,
+        'lignes_ecrites': writer.lignes,
+        'synthese': synthese.frame(),
+        'duree_s': duree,
+        'lignes_par_s': lignes_lues / duree if duree > 0 else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation de pensions par lot")
+    parser.add_argument('fichier', help="Table de carrières CSV")
+    parser.add_argument('-o', '--sortie', default='-', help="Fichier CSV de résultats (- pour la sortie standard)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Carrières lues par bloc")
+    args = parser.parse_args()
+
+    destination = sys.stdout.buffer if args.sortie == '-' else args.sortie
+    rapport = simulate_pension_file(args.fichier, destination, args.chunksize)
+    print(f"Carrières lues: {rapport['lignes_lues']:,} | rejetées: {rapport['lignes_rejetees']:,} | "
+          f"durée: {rapport['duree_s']:.1f} s | débit: {rapport['lignes_par_s']:,.0f} carrières/s", file=sys.stderr)
+    print(rapport['synthese'].to_string(index=False), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+# projections.py
+"""Projections démographiques des retraites par tranche d'âge.
+
+Effectifs et pensions moyennes de chaque tranche évoluent chaque année selon trois
+paramètres : croissance (entrées dans la tranche), mortalité et revalorisation.
+Toutes les années × tranches × scénarios sont calculées en une seule opération
+sur des tableaux numpy (scénarios, années, tranches), sans boucle Python.
+
+Les bandes d'incertitude sont obtenues par simulation Monte Carlo de trajectoires
+stochastiques, par blocs (mémoire bornée) et éventuellement sur plusieurs cœurs.
+"""
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PROJECTION_PARAMETERS = ['croissance', 'mortalite', 'revalorisation']
+DEFAULT_HORIZON = 20
+
+# Âge à partir duquel une tranche est comptée dans la population « 65 ans et plus »
+SENIOR_AGE = 65
+
+
+def bracket_lower_bounds(age_data):
+    """Âge minimal de chaque tranche ('65-69 ans' -> 65, '90+ ans' -> 90)"""
+    return age_data['tranche_age'].str.extract(r'^(\d+)', expand=False).astype(int).to_numpy()
+
+
+def scenario_parameters(age_data, n_scenarios=1, **valeurs):
+    """Paramètres (scénarios × tranches) : ceux de age_data, remplacés par les valeurs fournies
+
+    Chaque valeur peut être un scalaire, un tableau par tranche, par scénario (colonne
+    de forme (n, 1)) ou complet (n, tranches) ; elle est diffusée sur la grille.
+    """
+    forme = (n_scenarios, len(age_data))
+    parametres = {}
+    for nom in PROJECTION_PARAMETERS:
+        valeur = valeurs.get(nom, age_data[nom].to_numpy(dtype=float))
+        parametres[nom] = np.broadcast_to(np.asarray(valeur, dtype=float), forme)
+    return parametres
+
+
+def project_demography(age_data, parametres=None, horizon=DEFAULT_HORIZON):
+    """Projette effectifs et montants annuels de chaque tranche pour chaque scénario
+
+    Renvoie les tableaux (scénarios, années, tranches) 'population' et
+    'montants_annuels' ; l'année 0 correspond aux données actuelles.
+    """
+    if parametres is None:
+        parametres = scenario_parameters(age_data)
+    effectifs = age_data['nombre_beneficiaires'].to_numpy(dtype=float)
+    pensions = age_data['montant_moyen'].to_numpy(dtype=float)
+
+    # Facteurs annuels (scénarios, 1, tranches) élevés à la puissance t (1, années, 1)
+    annees = np.arange(horizon + 1, dtype=float)[np.newaxis, :, np.newaxis]
+    evolution_effectifs = ((1 + parametres['croissance']) * (1 - parametres['mortalite']))[:, np.newaxis, :]
+    evolution_pensions = (1 + parametres['revalorisation'])[:, np.newaxis, :]
+
+    population = effectifs * evolution_effectifs ** annees
+    montants_annuels = population * (pensions * evolution_pensions ** annees) * 12
+    return {'population': population, 'montants_annuels': montants_annuels}
+
+
+def projection_totals(age_data, projection, montant_annuel_actuel=None):
+    """Totaux par scénario et par année : population 65+ et montant total des pensions
+
+    Avec montant_annuel_actuel, les montants sont recalés sur le niveau des données
+    courantes : les tranches d'âge donnent la dynamique, les données courantes le niveau.
+    """
+    seniors = bracket_lower_bounds(age_data) >= SENIOR_AGE
+    population_65_plus = projection['population'][:, :, seniors].sum(axis=2)
+    montants = projection['montants_annuels'].sum(axis=2)
+    if montant_annuel_actuel is not None:
+        montants = montants * (montant_annuel_actuel / montants[:, :1])
+    return population_65_plus, montants
+
+
+def projection_frame(age_data, parametres=None, horizon=DEFAULT_HORIZON, montant_annuel_actuel=None,
+                     annee_debut=None):
+    """Tableau annuel d'un scénario unique (premier scénario des paramètres)"""
+    annee_debut = datetime.now().year if annee_debut is None else annee_debut
+    projection = project_demography(age_data, parametres, horizon)
+    population_65_plus, montants = projection_totals(age_data, projection, montant_annuel_actuel)
+    return pd.DataFrame({
+        'année': np.arange(annee_debut, annee_debut + horizon + 1),
+        'population_65_plus': population_65_plus[0],
+        'montant_total_pensions': montants[0],
+        # Pension mensuelle moyenne par bénéficiaire, toutes tranches confondues
+        'pension_moyenne': montants[0] / 12 / projection['population'][0].sum(axis=1)
+    })
+
+
+def projection_by_bracket(age_data, parametres=None, horizon=DEFAULT_HORIZON, annee_debut=None):
+    """Effectifs projetés par année et par tranche (format long) d'un scénario unique"""
+    annee_debut = datetime.now().year if annee_debut is None else annee_debut
+    population = project_demography(age_data, parametres, horizon)['population'][0]
+    return pd.DataFrame({
+        'année': np.repeat(np.arange(annee_debut, annee_debut + horizon + 1), len(age_data)),
+        'tranche_age': np.tile(age_data['tranche_age'].to_numpy(), horizon + 1),
+        'nombre_beneficiaires': population.ravel()
+    })
+
+
+# Volatilités annuelles des trajectoires Monte Carlo : écart-type du choc de croissance
+# (propre à chaque tranche), écart-type relatif de la mortalité et de la revalorisation
+# (chocs communs à toutes les tranches d'une même année)
+DEFAULT_VOLATILITY = {'croissance': 0.01, 'mortalite': 0.10, 'revalorisation': 0.005}
+DEFAULT_PATHS = 10_000
+DEFAULT_CHUNK_SIZE = 2_000
+PERCENTILES = [5, 50, 95]
+BAND_INDICATORS = ['nombre_beneficiaires', 'population_65_plus', 'montant_total_pensions']
+
+
+def _simulate_chunk(effectifs, pensions, seniors, parametres, volatilite, horizon, n_paths, entropie):
+    """Simule un bloc de trajectoires ; renvoie les totaux (indicateurs, trajectoires, années)
+
+    Fonction de module (et non méthode) pour pouvoir être exécutée dans un processus du pool.
+    """
+    rng = np.random.default_rng(entropie)
+    n_tranches = len(effectifs)
+    # Un seul tirage par bloc : chocs par tranche pour la croissance, communs pour le reste
+    chocs = rng.standard_normal((n_paths, horizon, n_tranches + 2))
+
+    croissance = parametres['croissance'] + volatilite['croissance'] * chocs[:, :, :n_tranches]
+    sigma = volatilite['mortalite']
+    mortalite = parametres['mortalite'] * np.exp(sigma * chocs[:, :, n_tranches:n_tranches + 1] - sigma ** 2 / 2)
+    revalorisation = parametres['revalorisation'] + volatilite['revalorisation'] * chocs[:, :, -1:]
+
+    # Année 0 = données actuelles, puis produits cumulés des facteurs annuels
+    population = np.empty((n_paths, horizon + 1, n_tranches))
+    population[:, 0] = effectifs
+    population[:, 1:] = effectifs * np.cumprod((1 + croissance) * (1 - np.clip(mortalite, 0, 1)), axis=1)
+    niveau_pensions = np.ones((n_paths, horizon + 1, n_tranches))
+    niveau_pensions[:, 1:] = np.cumprod(1 + revalorisation, axis=1)
+
+    return np.stack([
+        population.sum(axis=2),
+        population[:, :, seniors].sum(axis=2),
+        (population * niveau_pensions * pensions).sum(axis=2) * 12
+    ])
+
+
+def simulate_projection_bands(age_data, parametres=None, n_paths=DEFAULT_PATHS, horizon=DEFAULT_HORIZON,
+                              montant_annuel_actuel=None, volatilite=None, seed=0, territory_code='',
+                              chunk_size=DEFAULT_CHUNK_SIZE, executor=None, annee_debut=None):
+    """Bandes P5/P50/P95 par année de trajectoires stochastiques des effectifs et pensions
+
+    Les trajectoires sont simulées par blocs de chunk_size : les tableaux par tranche d'âge
+    (chocs, effectifs, pensions) ne dépassent pas la taille d'un bloc. Seuls les totaux par
+    trajectoire et par année sont conservés pour calculer des percentiles exacts, soit
+    3 × n_paths × (horizon + 1) float32 (13 Mo pour 50 000 trajectoires sur 20 ans).
+    Avec un executor (pool de processus), les blocs sont répartis sur plusieurs cœurs ;
+    chaque bloc a sa propre graine, si bien que le résultat ne dépend ni du nombre de
+    cœurs ni de l'ordre d'exécution. Les graines dépendent aussi du territoire : deux
+    territoires d'un même scénario ne partagent pas leurs chocs.
+    Renvoie (bandes, informations sur la simulation).
+    """
+    debut = time.perf_counter()
+    annee_debut = datetime.now().year if annee_debut is None else annee_debut
+    if parametres is None:
+        parametres = scenario_parameters(age_data)
+    # Paramètres de référence : premier scénario, un vecteur par tranche
+    parametres = {nom: np.asarray(valeurs)[0] for nom, valeurs in parametres.items()}
+    volatilite = {**DEFAULT_VOLATILITY, **(volatilite or {})}
+
+    arguments = (
+        age_data['nombre_beneficiaires'].to_numpy(dtype=float),
+        age_data['montant_moyen'].to_numpy(dtype=float),
+        bracket_lower_bounds(age_data) >= SENIOR_AGE,
+        parametres, volatilite, horizon
+    )
+    tailles = [min(chunk_size, n_paths - depart) for depart in range(0, n_paths, chunk_size)]
+    # crc32 comme get_rng du moteur : stable d'un processus à l'autre, contrairement à hash()
+    territory_key = zlib.crc32(territory_code.encode('utf-8'))
+    entropies = [[int(seed), territory_key, bloc] for bloc in range(len(tailles))]
+
+    if executor is None:
+        blocs = (_simulate_chunk(*arguments, taille, entropie) for taille, entropie in zip(tailles, entropies))
+    else:
+        futures = [executor.submit(_simulate_chunk, *arguments, taille, entropie)
+                   for taille, entropie in zip(tailles, entropies)]
+        blocs = (future.result() for future in futures)
+
+    # Seuls les totaux par trajectoire et par année sont conservés (float32), pas les tranches :
+    # O(n_paths × horizon), le seul tableau dont la taille suit le nombre de trajectoires
+    totaux = np.empty((len(BAND_INDICATORS), n_paths, horizon + 1), dtype=np.float32)
+    depart = 0
+    for bloc in blocs:
+        totaux[:, depart:depart + bloc.shape[1]] = bloc
+        depart += bloc.shape[1]
+
+    if montant_annuel_actuel is not None:
+        # Année 0 identique pour toutes les trajectoires : recalage sur le niveau courant
+        totaux[2] *= montant_annuel_actuel / totaux[2, 0, 0]
+
+    bandes = pd.DataFrame({'année': np.arange(annee_debut, annee_debut + horizon + 1)})
+    for indice, indicateur in enumerate(BAND_INDICATORS):
+        quantiles = np.percentile(totaux[indice], PERCENTILES, axis=0)
+        for rang, percentile in enumerate(PERCENTILES):
+            bandes[f'{indicateur}_p{percentile}'] = quantiles[rang]
+
+    informations = {
+        'n_paths': n_paths,
+        'chunks': len(tailles),
+        'multicoeur': executor is not None,
+        'duree_s': time.perf_counter() - debut
+    }
+    return bandes, informations
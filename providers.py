@@ -0,0 +1,473 @@
+# providers.py
+"""Sources de données distantes : une caisse régionale par territoire, interrogées en asyncio.
+
+Chaque caisse (CGSS Réunion, CGSS Guadeloupe, CPS Polynésie, CAFAT Calédonie...)
+expose l'historique, l'instantané courant et les tranches d'âge d'un territoire au
+format de api.py. Les territoires configurés sont chargés par ces sources à la place
+des générateurs synthétiques, derrière la même interface que load_territory_frames :
+le stockage partagé et le dashboard ne voient pas la différence.
+
+- toutes les sources sont interrogées en même temps, sur des connexions HTTP/1.1
+  persistantes mises en commun par hôte (bibliothèque standard uniquement) ;
+- délai et nombre de tentatives propres à chaque source ;
+- cache stale-while-revalidate : une donnée périmée est servie immédiatement et
+  rafraîchie en arrière-plan, avec des requêtes conditionnelles (ETag).
+
+Fichier de configuration (variable RETRAITES_SOURCES) :
+
+    {
+      "fraicheur_s": 300,
+      "perime_max_s": 3600,
+      "sources": {
+        "REUNION": {"nom": "CGSS Réunion", "url": "http://127.0.0.1:8601", "timeout_s": 5, "tentatives": 3},
+        "GUADELOUPE": {"nom": "CGSS Guadeloupe", "url": "http://127.0.0.1:8601"}
+      }
+    }
+
+Serveur de bouchon local (latence et échecs simulés) et chargement de toutes les sources :
+
+    python providers.py stub --port 8601 --latence 0.2 --echecs 0.2
+    python providers.py fetch sources.json
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+import streamlit as st
+from streamlit import logger as st_logger
+
+from retraites_engine import (
+    DEFAULT_SEED,
+    HISTORICAL_DTYPES,
+    SOURCES_FILE,
+    TerritoryDataStore,
+    TerritoryWarmUp,
+    build_aggregates,
+    get_categories_retraites,
+    load_territory_frames,
+    validate_historical_frame
+)
+
+# Valeurs par défaut de chaque source
+DEFAULT_SOURCE = {'timeout_s': 5.0, 'tentatives': 3, 'connexions': 4}
+DEFAULT_FRESHNESS_SECONDS = 300
+DEFAULT_MAX_STALE_SECONDS = 3600
+# Attente avant la tentative n : RETRY_BACKOFF_SECONDS * 2 ** (n - 1)
+RETRY_BACKOFF_SECONDS = 0.2
+
+# Colonnes attendues (et types) de l'instantané courant et des tranches d'âge distants,
+# comme produits par build_current_frame et generate_age_data
+CURRENT_DTYPES = {
+    'territoire': 'object',
+    'categorie': 'object',
+    'nom_complet': 'object',
+    'categorie_principale': 'object',
+    'montant_mensuel': 'float64',
+    'variation_pct': 'float64',
+    'variation_abs': 'float64',
+    'nombre_beneficiaires': 'float32',
+    'montant_moyen': 'float64',
+    'poids_total': 'float64',
+    'montant_annee_precedente': 'float64',
+    'projection_annee_courante': 'float64'
+}
+AGE_DTYPES = {
+    'tranche_age': 'object',
+    'nombre_beneficiaires': 'float64',
+    'montant_moyen': 'float64',
+    'croissance': 'float64',
+    'mortalite': 'float64',
+    'revalorisation': 'float64'
+}
+
+logger = st_logger.get_logger(__name__)
+
+
+class ProviderError(Exception):
+    """Source injoignable ou réponse inutilisable"""
+
+
+def remote_frame(donnees, dtypes):
+    """Trame construite depuis les lignes JSON d'une source, aux colonnes et types attendus
+
+    Une colonne absente ou mal nommée, une valeur non numérique ou manquante lève
+    ValueError : la réponse est rejetée ici plutôt qu'au premier affichage.
+    """
+    frame = pd.DataFrame(donnees)
+    manquantes = [colonne for colonne in dtypes if colonne not in frame.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes: {', '.join(manquantes)}")
+    frame = frame[list(dtypes)].astype(dtypes)
+    if frame.empty or frame.isna().any().any():
+        raise ValueError("Aucune ligne ou valeurs manquantes")
+    return frame
+
+
+def load_sources(path):
+    """Lit le fichier de configuration des sources (codes territoire en majuscules)"""
+    with open(path, encoding='utf-8') as fichier:
+        configuration = json.load(fichier)
+    sources = {}
+    for territory_code, source in configuration.get('sources', {}).items():
+        if 'url' not in source:
+            raise ValueError(f"Source sans url pour {territory_code}")
+        sources[territory_code.upper()] = {**DEFAULT_SOURCE, 'nom': territory_code, **source}
+    return {
+        'fraicheur_s': configuration.get('fraicheur_s', DEFAULT_FRESHNESS_SECONDS),
+        'perime_max_s': configuration.get('perime_max_s', DEFAULT_MAX_STALE_SECONDS),
+        'sources': sources
+    }
+
+
+class ConnectionPool:
+    """Connexions HTTP/1.1 persistantes vers un hôte, réutilisées d'une requête à l'autre"""
+
+    def __init__(self, host, port, max_connections=DEFAULT_SOURCE['connexions']):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.ouvertes = 0
+        self._libres = []
+        self._semaphore = None
+
+    async def request(self, path, headers=None):
+        """GET ; renvoie (statut, en-têtes en minuscules, corps décompressé)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        async with self._semaphore:
+            while self._libres:
+                # Une connexion inactive a pu être fermée par le serveur : nouvel essai sur une autre
+                reader, writer = self._libres.pop()
+                try:
+                    return await self._exchange(reader, writer, path, headers)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    continue
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self.ouvertes += 1
+            return await self._exchange(reader, writer, path, headers)
+
+    async def _exchange(self, reader, writer, path, headers):
+        try:
+            lignes = [f'GET {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Accept-Encoding: gzip',
+                      'Connection: keep-alive', *(f'{nom}: {valeur}' for nom, valeur in (headers or {}).items())]
+            writer.write(('\r\n'.join(lignes) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+
+            statut_ligne = await reader.readline()
+            if not statut_ligne:
+                raise ConnectionResetError("Connexion fermée par le serveur")
+            morceaux = statut_ligne.split()
+            if len(morceaux) < 2 or not morceaux[0].startswith(b'HTTP/') or not morceaux[1].isdigit():
+                # Réponse qui n'est pas du HTTP : erreur de la source, comme un délai dépassé
+                raise ProviderError(f"Ligne de statut invalide: {statut_ligne[:80]!r}")
+            statut = int(morceaux[1])
+            entetes = {}
+            while (ligne := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                nom, _, valeur = ligne.decode('latin-1').partition(':')
+                entetes[nom.strip().lower()] = valeur.strip()
+
+            persistante = entetes.get('connection', '').lower() != 'close'
+            if statut == 304 or statut < 200:
+                corps = b''
+            elif 'content-length' in entetes:
+                corps = await reader.readexactly(int(entetes['content-length']))
+            elif entetes.get('transfer-encoding', '').lower() == 'chunked':
+                corps = await self._read_chunked(reader)
+            else:
+                corps, persistante = await reader.read(), False
+        except BaseException:
+            # Requête interrompue (délai, annulation, erreur) : la connexion n'est pas réutilisable
+            writer.close()
+            raise
+
+        if persistante:
+            self._libres.append((reader, writer))
+        else:
+            writer.close()
+        if entetes.get('content-encoding') == 'gzip':
+            corps = gzip.decompress(corps)
+        return statut, entetes, corps
+
+    @staticmethod
+    async def _read_chunked(reader):
+        morceaux = []
+        while (taille := int((await reader.readline()).split(b';')[0], 16)) > 0:
+            morceaux.append(await reader.readexactly(taille))
+            await reader.readline()
+        await reader.readline()
+        return b''.join(morceaux)
+
+    def close(self):
+        while self._libres:
+            self._libres.pop()[1].close()
+
+
+class HttpTerritoryProvider:
+    """Source HTTP d'une caisse régionale (format de api.py), pour un ou plusieurs territoires"""
+
+    def __init__(self, url, nom=None, timeout_s=DEFAULT_SOURCE['timeout_s'],
+                 tentatives=DEFAULT_SOURCE['tentatives'], connexions=DEFAULT_SOURCE['connexions']):
+        adresse = urlsplit(url)
+        self.nom = nom or adresse.netloc
+        self.timeout_s = timeout_s
+        self.tentatives = tentatives
+        self.prefixe = adresse.path.rstrip('/')
+        self.pool = ConnectionPool(adresse.hostname, adresse.port or 80, connexions)
+        # Dernière réponse de chaque chemin et son ETag : une réponse 304 la réutilise
+        self._validations = {}
+
+    async def _get_json(self, chemin):
+        chemin = self.prefixe + chemin
+        precedente = self._validations.get(chemin)
+        entetes = {'If-None-Match': precedente[0]} if precedente else None
+        statut, reponse, corps = await self.pool.request(chemin, entetes)
+        if statut == 304 and precedente:
+            return precedente[1]
+        if statut != 200:
+            raise ProviderError(f"{self.nom}: HTTP {statut} sur {chemin}")
+        donnees = json.loads(corps)
+        if 'etag' in reponse:
+            self._validations[chemin] = (reponse['etag'], donnees)
+        return donnees
+
+    async def fetch(self, territory_code, seed=DEFAULT_SEED):
+        """Trames d'un territoire, au format de load_territory_frames"""
+        base = f'/territories/{territory_code}'
+        historique, courant, ages = await asyncio.gather(
+            self._get_json(f'{base}/history?seed={seed}'),
+            self._get_json(f'{base}/current?seed={seed}'),
+            self._get_json(f'{base}/age?seed={seed}')
+        )
+        categories = get_categories_retraites(territory_code)
+        # Catégories dans l'ordre des définitions locales, comme les historiques générés ou
+        # importés (ordre des groupby et des légendes) ; une catégorie inconnue est rejetée
+        dtypes = {
+            **HISTORICAL_DTYPES,
+            'categorie': pd.CategoricalDtype(list(categories)),
+            'categorie_principale': pd.CategoricalDtype(list(dict.fromkeys(
+                info['categorie'] for info in categories.values())))
+        }
+        trames = {}
+        for cle, nom, reponse, types in [('historical_data', "historique", historique, dtypes),
+                                         ('current_data', "instantané courant", courant, CURRENT_DTYPES),
+                                         ('age_data', "tranches d'âge", ages, AGE_DTYPES)]:
+            try:
+                trames[cle] = remote_frame(reponse['donnees'], types)
+                if cle == 'historical_data':
+                    validate_historical_frame(trames[cle])
+            except (KeyError, ValueError, TypeError) as exc:
+                # Réponse inutilisable : la source suivante (ou le cache) prend le relais
+                raise ProviderError(f"{self.nom}: {nom} de {territory_code} invalide: {exc}") from exc
+        return {
+            'categories': categories,
+            **trames,
+            'aggregates': build_aggregates(trames['historical_data']),
+            'donnees_reelles': True
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+class ProviderSet:
+    """Territoires configurés et leurs sources, avec cache stale-while-revalidate
+
+    Une donnée plus récente que fraicheur_s est servie telle quelle ; jusqu'à
+    perime_max_s elle est servie aussitôt et rafraîchie en arrière-plan ; au-delà
+    (ou en l'absence de donnée), l'appel attend la source. Une seule requête par
+    territoire est en cours à la fois, quel que soit le nombre d'appelants.
+    """
+
+    def __init__(self, sources, fraicheur_s=DEFAULT_FRESHNESS_SECONDS, perime_max_s=DEFAULT_MAX_STALE_SECONDS):
+        self.fraicheur_s = fraicheur_s
+        self.perime_max_s = perime_max_s
+        # Une source par URL : les territoires d'une même caisse partagent ses connexions
+        providers = {}
+        self.providers = {}
+        for territory_code, source in sources.items():
+            if source['url'] not in providers:
+                providers[source['url']] = HttpTerritoryProvider(
+                    source['url'], source.get('nom'), source['timeout_s'], source['tentatives'], source['connexions'])
+            self.providers[territory_code] = providers[source['url']]
+        self._cache = {}
+        self._en_cours = {}
+
+    def __contains__(self, territory_code):
+        return territory_code in self.providers
+
+    async def get(self, territory_code, seed=DEFAULT_SEED):
+        key = (territory_code, seed)
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[1]
+            if age < self.fraicheur_s:
+                return entry[0]
+            if age < self.perime_max_s:
+                self._revalidate(key)
+                return entry[0]
+        # shield : un appelant qui abandonne (délai) n'annule pas la requête partagée
+        return await asyncio.shield(self._revalidate(key))
+
+    async def get_all(self, territory_codes, seed=DEFAULT_SEED):
+        """Tous les territoires en même temps ; renvoie {code: trames ou exception}"""
+        codes = [code for code in territory_codes if code in self]
+        resultats = await asyncio.gather(*(self.get(code, seed) for code in codes), return_exceptions=True)
+        return dict(zip(codes, resultats))
+
+    def _revalidate(self, key):
+        """Tâche de chargement du territoire, partagée par tous les appelants"""
+        task = self._en_cours.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(*key))
+            self._en_cours[key] = task
+            task.add_done_callback(lambda fin: self._done(key, fin))
+        return task
+
+    def _done(self, key, task):
+        self._en_cours.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # L'ancienne donnée reste servie jusqu'à perime_max_s
+            logger.warning("Rafraîchissement de %s en échec: %s", key[0], task.exception())
+        else:
+            self._cache[key] = (task.result(), time.monotonic())
+
+    async def _fetch(self, territory_code, seed):
+        provider = self.providers[territory_code]
+        erreur = None
+        for tentative in range(provider.tentatives):
+            if tentative:
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (tentative - 1))
+            try:
+                return await asyncio.wait_for(provider.fetch(territory_code, seed), provider.timeout_s)
+            except (asyncio.TimeoutError, OSError, ValueError, ProviderError) as exc:
+                erreur = exc
+                logger.info("%s, tentative %d/%d: %r", provider.nom, tentative + 1, provider.tentatives, exc)
+        raise ProviderError(f"{provider.nom}: {territory_code} indisponible après "
+                            f"{provider.tentatives} tentatives ({erreur!r})")
+
+    def close(self):
+        for provider in set(self.providers.values()):
+            provider.close()
+
+
+class ProviderRuntime:
+    """Boucle asyncio dédiée (un fil) qui sert les appels synchrones du stockage partagé"""
+
+    def __init__(self, configuration):
+        self.fraicheur_s = configuration['fraicheur_s']
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='retraites-providers', daemon=True)
+        self._thread.start()
+        # Les primitives asyncio du jeu de sources sont créées dans sa propre boucle
+        self.providers = self._run(self._create(configuration))
+
+    @staticmethod
+    async def _create(configuration):
+        return ProviderSet(configuration['sources'], configuration['fraicheur_s'], configuration['perime_max_s'])
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def load(self, territory_code, seed=DEFAULT_SEED):
+        """Même interface que load_territory_frames (générateurs pour les territoires sans source)"""
+        if territory_code not in self.providers:
+            return load_territory_frames(territory_code, seed)
+        return self._run(self.providers.get(territory_code, seed))
+
+    def load_all(self, territory_codes, seed=DEFAULT_SEED):
+        """Territoires avec source chargés en même temps : {code: trames ou exception}"""
+        return self._run(self.providers.get_all(territory_codes, seed))
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self.providers.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class ProviderWarmUp(TerritoryWarmUp):
+    """Préchargement : sources distantes en asyncio, territoires synthétiques dans le pool de processus"""
+
+    def __init__(self, store, runtime, seed=DEFAULT_SEED, territory_codes=None, **kwargs):
+        self.runtime = runtime
+        super().__init__(store, seed, territory_codes, **kwargs)
+
+    def _load(self, territory_codes):
+        distants = [code for code in territory_codes if code in self.runtime.providers]
+        debut = time.perf_counter()
+        for territory_code, frames in self.runtime.load_all(distants, self.seed).items():
+            if isinstance(frames, Exception):
+                self.errors[territory_code] = repr(frames)
+                logger.error("Préchargement de %s en échec: %r", territory_code, frames)
+                continue
+            self.store.put(territory_code, self.seed, frames)
+            self.timings[territory_code] = time.perf_counter() - debut
+        super()._load([code for code in territory_codes if code not in distants])
+
+
+@st.cache_resource
+def get_provider_runtime(path=SOURCES_FILE):
+    """Sources distantes du processus, chargées une fois depuis le fichier de configuration"""
+    return ProviderRuntime(load_sources(path))
+
+
+def run_stub(port, latence_s=0.0, echecs=0.0):
+    """Bouchon local d'une caisse régionale : l'API du dashboard avec latence et erreurs simulées"""
+    from api import DataApi, create_server
+
+    class StubApi(DataApi):
+        def handle(self, *args, **kwargs):
+            time.sleep(latence_s)
+            if random.random() < echecs:
+                return 503, {'Content-Type': 'application/json'}, b'{"erreur": "indisponible"}'
+            return super().handle(*args, **kwargs)
+
+    # Stockage propre au bouchon : il sert toujours les données synthétiques
+    server = create_server(port, api=StubApi(store=TerritoryDataStore()))
+    print(f"Bouchon sur http://127.0.0.1:{server.server_address[1]} "
+          f"(latence {latence_s*1000:.0f} ms, échecs {echecs:.0%})")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sources de données distantes des territoires")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+    stub = commandes.add_parser('stub', help="Bouchon local d'une caisse régionale")
+    stub.add_argument('--port', type=int, default=8601)
+    stub.add_argument('--latence', type=float, default=0.0, help="Latence ajoutée à chaque requête (s)")
+    stub.add_argument('--echecs', type=float, default=0.0, help="Part des requêtes en erreur 503")
+    fetch = commandes.add_parser('fetch', help="Charge tous les territoires configurés en même temps")
+    fetch.add_argument('sources', help="Fichier JSON des sources")
+    fetch.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    # Hors `streamlit run`, chaque appel en cache produirait un avertissement
+    st_logger.set_log_level('error')
+    if args.commande == 'stub':
+        run_stub(args.port, args.latence, args.echecs)
+        return 0
+
+    configuration = load_sources(args.sources)
+    runtime = ProviderRuntime(configuration)
+    for passage in ('froid', 'chaud'):
+        debut = time.perf_counter()
+        resultats = runtime.load_all(list(configuration['sources']), args.seed)
+        print(f"Chargement {passage}: {len(resultats)} territoires en {(time.perf_counter() - debut)*1000:.0f} ms")
+    for territory_code, frames in resultats.items():
+        etat = repr(frames) if isinstance(frames, Exception) else f"{len(frames['historical_data'])} lignes"
+        print(f"  {territory_code:<20}{etat}")
+    pools = {id(p.pool): p.pool for p in runtime.providers.providers.values()}
+    print(f"Connexions ouvertes: {sum(pool.ouvertes for pool in pools.values())}")
+    runtime.close()
+    return 1 if any(isinstance(frames, Exception) for frames in resultats.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
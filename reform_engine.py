@@ -0,0 +1,190 @@
+# reform_engine.py
+"""Moteur d'impact des réformes des retraites sur une population de carrières.
+
+Une réforme modifie les règles de calcul (âge légal, trimestres requis, coefficient
+de décote, âge du taux plein). La population (synthétique ou importée) est regroupée
+en cohortes (territoire, âge de départ, trimestres validés) : pension et coût d'une
+cohorte ne dépendent que de ces clés et de sa masse salariale. Le résultat de
+référence est calculé une fois ; une réforme ne recalcule que les cohortes dont le
+taux ou l'âge effectif de départ peut changer.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pension_simulator import DEFAULT_CHUNKSIZE, REFERENCE_RULES, compute_rates, validate_careers
+from retraites_engine import DEFAULT_SEED, get_categories_retraites, get_rng, get_territories_definitions
+
+COHORT_KEYS = ['territoire', 'age_depart', 'trimestres_valides']
+
+# Âge moyen de fin de versement : la durée de service d'une pension est ESPERANCE_VIE - âge de départ
+ESPERANCE_VIE = 85
+
+# Part des retraités représentée dans la population synthétique (chaque carrière a un poids)
+TAUX_ECHANTILLONNAGE = 0.1
+
+# Réformes prédéfinies : changements par rapport aux règles de référence
+REFORM_PRESETS = {
+    'Réforme 2014 (Touraine)': {
+        'année': 2014, 'description': 'Allongement de la durée de cotisation',
+        'regles': {'trimestres_requis': 172}
+    },
+    'Réforme 2023': {
+        'année': 2023, 'description': "Report de l'âge légal de départ",
+        'regles': {'age_legal': 64, 'trimestres_requis': 172}
+    },
+    'Prochaine réforme': {
+        'année': 2027, 'description': 'Projet en discussion',
+        'regles': {'age_legal': 65, 'trimestres_requis': 172}
+    }
+}
+
+
+def generate_synthetic_careers(territory_code, seed=DEFAULT_SEED, taux_echantillonnage=TAUX_ECHANTILLONNAGE):
+    """Population synthétique de carrières d'un territoire, reproductible par graine"""
+    territory = get_territories_definitions()[territory_code]
+    categories = get_categories_retraites(territory_code)
+    n_carrieres = max(100, int(territory['nombre_retraites'] * taux_echantillonnage))
+    rng = get_rng(territory_code, seed, 'carrieres')
+
+    effectifs = np.array([info['nombre_beneficiaires'] for info in categories.values()], dtype=float)
+    ages = np.arange(60, 68)
+    return pd.DataFrame({
+        'territoire': territory_code,
+        'categorie': rng.choice(list(categories), n_carrieres, p=effectifs / effectifs.sum()),
+        # Salaire de référence tel que la pension moyenne au taux plein soit celle du territoire
+        'salaire_moyen': territory['montant_moyen_retraite'] / 0.5 * rng.lognormal(-0.06, 0.35, n_carrieres),
+        'trimestres_valides': np.clip(rng.normal(160, 14, n_carrieres), 60, 200).round().astype(np.int64),
+        'age_depart': rng.choice(ages, n_carrieres, p=[0.08, 0.12, 0.35, 0.15, 0.1, 0.06, 0.04, 0.1]),
+        'poids': territory['nombre_retraites'] / n_carrieres
+    })
+
+
+def career_cohorts(careers):
+    """Regroupe des carrières en cohortes : effectif et masse salariale pondérés"""
+    poids = careers['poids'] if 'poids' in careers.columns else pd.Series(1.0, index=careers.index)
+    return pd.DataFrame({
+        **{cle: careers[cle] for cle in COHORT_KEYS},
+        'effectif': poids,
+        'masse_salariale': careers['salaire_moyen'] * poids
+    }).groupby(COHORT_KEYS, as_index=False, observed=True).sum()
+
+
+def load_career_cohorts(source, territoire_defaut, chunksize=DEFAULT_CHUNKSIZE):
+    """Cohortes d'une table de carrières CSV lue par blocs (colonne territoire optionnelle)"""
+    cohortes, lignes_rejetees = [], 0
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype={'categorie': str, 'territoire': str}):
+        careers, rejetees = validate_careers(chunk)
+        lignes_rejetees += rejetees
+        territoires = chunk.loc[careers.index, 'territoire'] if 'territoire' in chunk.columns else territoire_defaut
+        careers['territoire'] = pd.Series(territoires, index=careers.index).fillna(territoire_defaut).str.upper()
+        if 'poids' in chunk.columns:
+            careers['poids'] = pd.to_numeric(chunk.loc[careers.index, 'poids'], errors='coerce').fillna(1.0)
+        cohortes.append(career_cohorts(careers))
+    # Les cohortes de chaque bloc sont fusionnées : la mémoire dépend du nombre de cohortes
+    cohorts = pd.concat(cohortes).groupby(COHORT_KEYS, as_index=False).sum()
+    return cohorts, lignes_rejetees
+
+
+class ReformEngine:
+    """Coût des pensions par territoire sous des règles de référence ou réformées"""
+
+    def __init__(self, cohorts, max_cached=64):
+        self.cohorts = cohorts.reset_index(drop=True)
+        self.territoires, self._territoire_index = np.unique(self.cohorts['territoire'], return_inverse=True)
+        self._ages = self.cohorts['age_depart'].to_numpy(dtype=float)
+        self._trimestres = self.cohorts['trimestres_valides'].to_numpy(dtype=float)
+        self._masse = self.cohorts['masse_salariale'].to_numpy(dtype=float)
+        self._effectifs = self.cohorts['effectif'].to_numpy(dtype=float)
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Résultat de référence calculé une seule fois, par cohorte et par territoire
+        self._reference = self._evaluate(np.ones(len(self.cohorts), dtype=bool), REFERENCE_RULES)
+        self._reference_totaux = {nom: self._par_territoire(valeurs) for nom, valeurs in self._reference.items()}
+
+    @classmethod
+    def from_careers(cls, careers, **kwargs):
+        return cls(career_cohorts(careers), **kwargs)
+
+    def _par_territoire(self, valeurs, masque=None):
+        index = self._territoire_index if masque is None else self._territoire_index[masque]
+        return np.bincount(index, weights=valeurs, minlength=len(self.territoires))
+
+    def _evaluate(self, masque, regles):
+        """Pension mensuelle totale et coût viager des cohortes sélectionnées"""
+        age_effectif = np.maximum(self._ages[masque], regles['age_legal'])
+        taux = compute_rates(self._trimestres[masque], age_effectif, regles=regles)
+        pension_mensuelle = self._masse[masque] * taux
+        return {
+            'pension_mensuelle': pension_mensuelle,
+            'cout_viager': pension_mensuelle * 12 * np.maximum(0, ESPERANCE_VIE - age_effectif)
+        }
+
+    def affected_cohorts(self, regles):
+        """Cohortes dont l'âge effectif de départ ou le taux peut changer sous ces règles"""
+        reference = REFERENCE_RULES
+        masque = np.zeros(len(self.cohorts), dtype=bool)
+        if regles['age_legal'] != reference['age_legal']:
+            masque |= self._ages < max(regles['age_legal'], reference['age_legal'])
+        if any(regles[cle] != reference[cle] for cle in ('trimestres_requis', 'coefficient_decote', 'age_taux_plein')):
+            # Seules les cohortes en décote sous l'une des deux règles changent de taux
+            age_effectif = np.maximum(self._ages, min(regles['age_legal'], reference['age_legal']))
+            trimestres_requis = max(regles['trimestres_requis'], reference['trimestres_requis'])
+            age_taux_plein = max(regles['age_taux_plein'], reference['age_taux_plein'])
+            masque |= (self._trimestres < trimestres_requis) & (age_effectif < age_taux_plein)
+        return masque
+
+    def simulate(self, **changements):
+        """Coûts de référence et réformés par territoire ; renvoie (tableau, informations)"""
+        regles = {**REFERENCE_RULES, **changements}
+        cle = tuple(sorted(regles.items()))
+        with self._lock:
+            if cle in self._cache:
+                self._cache.move_to_end(cle)
+                tableau, informations = self._cache[cle]
+                return tableau, {**informations, 'cache': True}
+
+        debut = time.perf_counter()
+        masque = self.affected_cohorts(regles)
+        reforme = self._evaluate(masque, regles)
+        totaux = {
+            nom: self._reference_totaux[nom] + self._par_territoire(reforme[nom] - self._reference[nom][masque], masque)
+            for nom in reforme
+        }
+
+        tableau = pd.DataFrame({
+            'territoire': self.territoires,
+            'effectif': self._par_territoire(self._effectifs),
+            'cout_annuel_reference': self._reference_totaux['pension_mensuelle'] * 12,
+            'cout_annuel_reforme': totaux['pension_mensuelle'] * 12,
+            'cout_viager_reference': self._reference_totaux['cout_viager'],
+            'cout_viager_reforme': totaux['cout_viager']
+        })
+        tableau['ecart_viager_pct'] = (tableau['cout_viager_reforme'] / tableau['cout_viager_reference'] - 1) * 100
+        informations = {
+            'cohortes_recalculees': int(masque.sum()),
+            'cohortes_total': len(self.cohorts),
+            'duree_s': time.perf_counter() - debut,
+            'cache': False
+        }
+
+        with self._lock:
+            self._cache[cle] = (tableau, informations)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return tableau, informations
+
+
+@st.cache_resource
+def get_reform_engine(seed=DEFAULT_SEED):
+    """Moteur de réformes sur la population synthétique de tous les territoires (un par graine)"""
+    careers = pd.concat([generate_synthetic_careers(territory_code, seed)
+                         for territory_code, info in get_territories_definitions().items()
+                         if info['retraites_actif']], ignore_index=True)
+    return ReformEngine.from_careers(careers)
@@ -0,0 +1,1144 @@
+# retraites_engine.py
+"""Moteur de données des retraites DROM-COM, partagé par le dashboard et les outils hors Streamlit.
+
+Définitions des territoires et catégories, générateurs reproductibles, agrégats,
+mises à jour en direct et stockage partagé par processus. Le module n'affiche rien :
+il peut être importé par un script, un worker de pool ou une API.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import warnings
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit import logger as st_logger
+
+import instrumentation
+from parquet_store import ParquetTerritoryStore
+warnings.filterwarnings('ignore')
+
+# Graine du scénario de référence : même graine => mêmes données sur tous les workers
+DEFAULT_SEED = 2025
+
+# Intervalle (secondes) de l'actualisation automatique des données en direct
+LIVE_REFRESH_SECONDS = float(os.environ.get('RETRAITES_LIVE_INTERVAL', 10))
+
+# Préchargement des territoires au démarrage (RETRAITES_WARMUP=0 pour le désactiver) ;
+# RETRAITES_WARMUP_WORKERS fixe le nombre de processus (par défaut : un par cœur)
+WARMUP_ENABLED = os.environ.get('RETRAITES_WARMUP', '1') != '0'
+WARMUP_WORKERS = int(os.environ.get('RETRAITES_WARMUP_WORKERS', 0)) or None
+
+# Processus dédiés aux simulations Monte Carlo (1 : calcul dans le processus Streamlit)
+MONTE_CARLO_WORKERS = int(os.environ.get('RETRAITES_MC_WORKERS', 1))
+
+# Fichier d'état écrit à la fin du préchargement, pour un contrôle de santé externe
+READY_FILE = os.environ.get('RETRAITES_READY_FILE')
+
+# Sources distantes des caisses régionales (fichier JSON, voir providers.py) ; les
+# territoires sans source gardent les générateurs synthétiques
+SOURCES_FILE = os.environ.get('RETRAITES_SOURCES')
+
+logger = st_logger.get_logger(__name__)
+
+# Flux aléatoires indépendants utilisés par les générateurs
+RANDOM_STREAMS = {
+    'historique': 0,
+    'courant': 1,
+    'live': 2,
+    'metriques': 3,
+    'carrieres': 4
+}
+
+def get_rng(territory_code, seed=DEFAULT_SEED, flux='historique', *compteurs):
+    """Crée un générateur reproductible, indépendant par territoire, graine et flux"""
+    # crc32 est stable d'un processus à l'autre, contrairement à hash()
+    territory_key = zlib.crc32(territory_code.encode('utf-8'))
+    return np.random.default_rng([int(seed), territory_key, RANDOM_STREAMS[flux], *compteurs])
+
+# Fonctions globales avec cache pour éviter les problèmes de hashage
+@instrumentation.cache_data(ttl=3600)
+def get_territories_definitions():
+    """Définit les territoires DROM-COM"""
+    return {
+        'REUNION': {
+            'nom_complet': 'La Réunion',
+            'type': 'DROM',
+            'population': 860000,
+            'superficie': 2511,
+            'pib': 19.8,
+            'drapeau': 'reunion-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 180000,
+            'montant_moyen_retraite': 1250
+        },
+        'GUADELOUPE': {
+            'nom_complet': 'Guadeloupe',
+            'type': 'DROM',
+            'population': 384000,
+            'superficie': 1628,
+            'pib': 9.1,
+            'drapeau': 'guadeloupe-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 85000,
+            'montant_moyen_retraite': 1180
+        },
+        'MARTINIQUE': {
+            'nom_complet': 'Martinique',
+            'type': 'DROM',
+            'population': 376000,
+            'superficie': 1128,
+            'pib': 8.9,
+            'drapeau': 'martinique-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 82000,
+            'montant_moyen_retraite': 1200
+        },
+        'GUYANE': {
+            'nom_complet': 'Guyane',
+            'type': 'DROM',
+            'population': 290000,
+            'superficie': 83534,
+            'pib': 4.8,
+            'drapeau': 'guyane-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 45000,
+            'montant_moyen_retraite': 1150
+        },
+        'MAYOTTE': {
+            'nom_complet': 'Mayotte',
+            'type': 'DROM',
+            'population': 270000,
+            'superficie': 374,
+            'pib': 2.4,
+            'drapeau': 'mayotte-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 28000,
+            'montant_moyen_retraite': 950
+        },
+        'STPIERRE': {
+            'nom_complet': 'Saint-Pierre-et-Miquelon',
+            'type': 'COM',
+            'population': 6000,
+            'superficie': 242,
+            'pib': 0.2,
+            'drapeau': 'spierre-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 1500,
+            'montant_moyen_retraite': 1350
+        },
+        'STBARTH': {
+            'nom_complet': 'Saint-Barthélemy',
+            'type': 'COM',
+            'population': 10000,
+            'superficie': 21,
+            'pib': 0.6,
+            'drapeau': 'stbarth-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 2200,
+            'montant_moyen_retraite': 1650
+        },
+        'STMARTIN': {
+            'nom_complet': 'Saint-Martin',
+            'type': 'COM',
+            'population': 32000,
+            'superficie': 54,
+            'pib': 0.9,
+            'drapeau': 'stmartin-flag',
+            'monnaie': 'EUR',
+            'retraites_actif': True,
+            'nombre_retraites': 6500,
+            'montant_moyen_retraite': 1400
+        },
+        'WALLIS': {
+            'nom_complet': 'Wallis-et-Futuna',
+            'type': 'COM',
+            'population': 11500,
+            'superficie': 142,
+            'pib': 0.2,
+            'drapeau': 'wallis-flag',
+            'monnaie': 'XPF',
+            'retraites_actif': True,
+            'nombre_retraites': 1800,
+            'montant_moyen_retraite': 950
+        },
+        'POLYNESIE': {
+            'nom_complet': 'Polynésie française',
+            'type': 'COM',
+            'population': 280000,
+            'superficie': 4167,
+            'pib': 7.2,
+            'drapeau': 'polynesie-flag',
+            'monnaie': 'XPF',
+            'retraites_actif': True,
+            'nombre_retraites': 52000,
+            'montant_moyen_retraite': 1100
+        },
+        'CALEDONIE': {
+            'nom_complet': 'Nouvelle-Calédonie',
+            'type': 'COM',
+            'population': 271000,
+            'superficie': 18575,
+            'pib': 9.7,
+            'drapeau': 'caledonie-flag',
+            'monnaie': 'XPF',
+            'retraites_actif': True,
+            'nombre_retraites': 48000,
+            'montant_moyen_retraite': 1250
+        }
+    }
+
+@instrumentation.cache_data(ttl=3600)
+def get_categories_retraites(territory_code):
+    """Définit les catégories de retraites pour un territoire donné"""
+    # Facteurs d'ajustement selon le territoire
+    territory_factor = {
+        'REUNION': 1.0,
+        'GUADELOUPE': 0.95,
+        'MARTINIQUE': 0.9,
+        'GUYANE': 0.7,
+        'MAYOTTE': 0.5,
+        'STPIERRE': 1.1,
+        'STBARTH': 1.3,
+        'STMARTIN': 1.2,
+        'WALLIS': 0.8,
+        'POLYNESIE': 0.85,
+        'CALEDONIE': 0.9
+    }
+    
+    factor = territory_factor.get(territory_code, 1.0)
+    
+    # Catégories de base avec ajustements selon le territoire
+    categories_base = {
+        'RETRAITE_GENERALE': {
+            'nom_complet': 'Retraite générale CNAV',
+            'categorie': 'Régime général',
+            'sous_categorie': 'Retraite de base',
+            'montant_moyen': 1250 * factor,
+            'nombre_beneficiaires': 120000 * factor,
+            'couleur': '#28a745',
+            'poids_total': 45.2 * factor,
+            'evolution_annuelle': 2.3,
+            'description': 'Retraite du régime général de la sécurité sociale'
+        },
+        'RETRAITE_COMPLEMENTAIRE': {
+            'nom_complet': 'Retraite complémentaire AGIRC-ARRCO',
+            'categorie': 'Régime complémentaire',
+            'sous_categorie': 'Points de retraite',
+            'montant_moyen': 650 * factor,
+            'nombre_beneficiaires': 95000 * factor,
+            'couleur': '#20c997',
+            'poids_total': 25.8 * factor,
+            'evolution_annuelle': 2.8,
+            'description': 'Retraite complémentaire des salariés du secteur privé'
+        },
+        'RETRAITE_FONCTIONNAIRE': {
+            'nom_complet': 'Retraite fonction publique',
+            'categorie': 'Régime spécial',
+            'sous_categorie': 'Fonctionnaires',
+            'montant_moyen': 2200 * factor,
+            'nombre_beneficiaires': 35000 * factor,
+            'couleur': '#fd7e14',
+            'poids_total': 18.5 * factor,
+            'evolution_annuelle': 1.9,
+            'description': 'Retraite des fonctionnaires de l\'État, territoriaux et hospitaliers'
+        },
+        'RETRAITE_AGRICOLE': {
+            'nom_complet': 'Retraite agricole MSA',
+            'categorie': 'Régime spécial',
+            'sous_categorie': 'Agriculteurs',
+            'montant_moyen': 850 * factor,
+            'nombre_beneficiaires': 15000 * factor,
+            'couleur': '#6f42c1',
+            'poids_total': 5.3 * factor,
+            'evolution_annuelle': 1.5,
+            'description': 'Retraite du régime agricole'
+        },
+        'RETRAITE_ARTISANALE': {
+            'nom_complet': 'Retraite artisans SSI',
+            'categorie': 'Régime spécial',
+            'sous_categorie': 'Artisans',
+            'montant_moyen': 950 * factor,
+            'nombre_beneficiaires': 12000 * factor,
+            'couleur': '#dc3545',
+            'poids_total': 4.2 * factor,
+            'evolution_annuelle': 1.8,
+            'description': 'Retraite des artisans et commerçants'
+        },
+        'RETRAITE_INVALIDITE': {
+            'nom_complet': 'Pension d\'invalidité',
+            'categorie': 'Pensions spécifiques',
+            'sous_categorie': 'Invalidité',
+            'montant_moyen': 800 * factor,
+            'nombre_beneficiaires': 8000 * factor,
+            'couleur': '#ffc107',
+            'poids_total': 2.7 * factor,
+            'evolution_annuelle': 0.8,
+            'description': 'Pension d\'invalidité pour incapacité de travail'
+        },
+        'RETRAITE_VEUVAGE': {
+            'nom_complet': 'Pension de veuvage',
+            'categorie': 'Pensions spécifiques',
+            'sous_categorie': 'Veuvage',
+            'montant_moyen': 600 * factor,
+            'nombre_beneficiaires': 18000 * factor,
+            'couleur': '#6610f2',
+            'poids_total': 3.8 * factor,
+            'evolution_annuelle': -0.5,
+            'description': 'Pension versée au conjoint survivant'
+        },
+        'RETRAITE_ORPHELIN': {
+            'nom_complet': 'Pension d\'orphelin',
+            'categorie': 'Pensions spécifiques',
+            'sous_categorie': 'Orphelin',
+            'montant_moyen': 300 * factor,
+            'nombre_beneficiaires': 5000 * factor,
+            'couleur': '#e83e8c',
+            'poids_total': 0.8 * factor,
+            'evolution_annuelle': -1.2,
+            'description': 'Pension versée aux enfants de parents décédés'
+        },
+        'RETRAITE_MINIMUM_VIEILLESSE': {
+            'nom_complet': 'Minimum vieillesse (ASPA)',
+            'categorie': 'Solidarité',
+            'sous_categorie': 'Minimum vieillesse',
+            'montant_moyen': 750 * factor,
+            'nombre_beneficiaires': 22000 * factor,
+            'couleur': '#0066CC',
+            'poids_total': 5.5 * factor,
+            'evolution_annuelle': 3.2,
+            'description': 'Allocation de solidarité aux personnes âgées'
+        },
+        'RETRAITE_COMPLEMENTAIRE_VOLONTAIRE': {
+            'nom_complet': 'Retraite complémentaire volontaire',
+            'categorie': 'Épargne retraite',
+            'sous_categorie': 'PER, Madelin...',
+            'montant_moyen': 450 * factor,
+            'nombre_beneficiaires': 15000 * factor,
+            'couleur': '#17a2b8',
+            'poids_total': 2.2 * factor,
+            'evolution_annuelle': 4.5,
+            'description': 'Dispositifs d\'épargne retraite volontaire'
+        }
+    }
+    
+    # Ajustements spécifiques selon le territoire
+    if territory_code == 'POLYNESIE':
+        categories_base['RETRAITE_POLYNESIE'] = {
+            'nom_complet': 'Régime de retraite polynésien',
+            'categorie': 'Régime local',
+            'sous_categorie': 'Retraite locale',
+            'montant_moyen': 950 * factor,
+            'nombre_beneficiaires': 25000 * factor,
+            'couleur': '#0077be',
+            'poids_total': 12.0 * factor,
+            'evolution_annuelle': 2.5,
+            'description': 'Régime de retraite spécifique à la Polynésie française'
+        }
+    
+    elif territory_code == 'CALEDONIE':
+        categories_base['RETRAITE_CALEDONIE'] = {
+            'nom_complet': 'Régime de retraite calédonien',
+            'categorie': 'Régime local',
+            'sous_categorie': 'Retraite locale',
+            'montant_moyen': 1100 * factor,
+            'nombre_beneficiaires': 22000 * factor,
+            'couleur': '#8B4513',
+            'poids_total': 10.0 * factor,
+            'evolution_annuelle': 2.2,
+            'description': 'Régime de retraite spécifique à la Nouvelle-Calédonie'
+        }
+    
+    return categories_base
+
+# Schéma compact de l'historique : codes en catégories, float32 quand la précision suffit
+# (les montants totaux restent en float64 pour les sommes et cumuls). Une trame par
+# territoire, donc pas de colonne 'territoire' répétée sur chaque ligne.
+HISTORICAL_DTYPES = {
+    'date': 'datetime64[ns]',
+    'categorie': 'category',
+    'montant_total_pensions': 'float64',
+    'nombre_beneficiaires': 'float32',
+    'montant_moyen': 'float32',
+    'categorie_principale': 'category',
+    'evolution_mensuelle': 'float32'
+}
+
+@instrumentation.timed()
+def build_historical_frame(territory_code, categories, seed=DEFAULT_SEED, date_debut='2015-01-01', origine=None):
+    """Construit les données historiques en une seule passe vectorisée (mois × catégories)
+    
+    origine est le premier mois du flux aléatoire (date_debut par défaut) : avec
+    origine antérieure à date_debut, seuls les mois à partir de date_debut sont tirés,
+    avec les mêmes valeurs que dans l'historique complet commençant à origine.
+    """
+    dates = pd.date_range(date_debut, datetime.now(), freq='ME')
+    rng = get_rng(territory_code, seed, 'historique')
+    
+    codes = list(categories.keys())
+    n_mois, n_categories = len(dates), len(codes)
+    if origine is not None:
+        debut, origine = pd.Timestamp(date_debut), pd.Timestamp(origine)
+        mois_sautes = (debut.year - origine.year) * 12 + debut.month - origine.month
+        rng.bit_generator.advance(mois_sautes * (2 + 3 * n_categories))
+    montants_moyens = np.array([info['montant_moyen'] for info in categories.values()], dtype=float)
+    nombres = np.array([info['nombre_beneficiaires'] for info in categories.values()], dtype=float)
+    categories_principales = [info['categorie'] for info in categories.values()]
+    principales_uniques = list(dict.fromkeys(categories_principales))
+    codes_principales = np.array([principales_uniques.index(c) for c in categories_principales])
+    
+    # Tirages rangés mois par mois : les valeurs d'un mois ne dépendent pas de la longueur de l'historique
+    tirages = rng.random((n_mois, 2 + 3 * n_categories))
+    
+    # Impact des réformes des retraites : bornes du tirage selon l'année
+    annees = dates.year.to_numpy()
+    borne_basse = np.where(annees == 2020, 0.95, 1.0)
+    borne_haute = np.where(annees == 2019, 1.1, 1.05)
+    reforme_impact = borne_basse + (borne_haute - borne_basse) * tirages[:, 0]
+    
+    # Variation saisonnière (généralement faible pour les retraites)
+    seasonal_impact = 0.98 + 0.04 * tirages[:, 1]
+    
+    # Grille (mois × catégories) : une ligne par mois, une colonne par catégorie
+    bruit_pension = 0.98 + 0.04 * tirages[:, 2:2 + n_categories]
+    bruit_beneficiaires = 0.99 + 0.02 * tirages[:, 2 + n_categories:2 + 2 * n_categories]
+    evolution_mensuelle = -0.5 + tirages[:, 2 + 2 * n_categories:]
+    
+    facteur_mensuel = (reforme_impact * seasonal_impact)[:, np.newaxis]
+    pensions = (montants_moyens * nombres) * facteur_mensuel * bruit_pension
+    beneficiaires = nombres * bruit_beneficiaires
+    
+    return pd.DataFrame({
+        'date': np.repeat(dates.values, n_categories),
+        'categorie': pd.Categorical.from_codes(np.tile(np.arange(n_categories), n_mois), categories=codes),
+        'montant_total_pensions': pensions.ravel(),
+        'nombre_beneficiaires': beneficiaires.ravel().astype(np.float32),
+        'montant_moyen': (pensions / beneficiaires).ravel().astype(np.float32),
+        'categorie_principale': pd.Categorical.from_codes(np.tile(codes_principales, n_mois),
+                                                          categories=principales_uniques),
+        'evolution_mensuelle': evolution_mensuelle.ravel().astype(np.float32)
+    })
+
+@instrumentation.timed()
+def build_current_frame(territory_code, categories, historical_data, seed=DEFAULT_SEED):
+    """Construit les données courantes à partir du dernier mois historique"""
+    rng = get_rng(territory_code, seed, 'courant')
+    current_data = []
+    
+    for categorie_code, info in categories.items():
+        # Dernières données historiques (un export réel peut ne pas couvrir toutes les catégories)
+        historique_categorie = historical_data[historical_data['categorie'] == categorie_code]
+        if historique_categorie.empty:
+            continue
+        last_data = historique_categorie.iloc[-1]
+        
+        # Variation mensuelle simulée
+        change_pct = rng.uniform(-0.03, 0.03)
+        change_abs = last_data['montant_total_pensions'] * change_pct
+        
+        current_data.append({
+            'territoire': territory_code,
+            'categorie': categorie_code,
+            'nom_complet': info['nom_complet'],
+            'categorie_principale': info['categorie'],
+            'montant_mensuel': last_data['montant_total_pensions'] + change_abs,
+            'variation_pct': change_pct * 100,
+            'variation_abs': change_abs,
+            'nombre_beneficiaires': last_data['nombre_beneficiaires'] * rng.uniform(0.99, 1.01),
+            'montant_moyen': info['montant_moyen'] * rng.uniform(0.98, 1.02),
+            'poids_total': info['poids_total'],
+            'montant_annee_precedente': last_data['montant_total_pensions'] * rng.uniform(0.95, 1.05),
+            'projection_annee_courante': last_data['montant_total_pensions'] * rng.uniform(1.02, 1.04)
+        })
+    
+    return pd.DataFrame(current_data)
+
+# Début de l'historique par défaut (seul historique persisté sur disque)
+HISTORY_START = '2015-01-01'
+
+# Persistance Parquet/Arrow : un redémarrage ou une expiration du cache relit le disque
+parquet_store = ParquetTerritoryStore()
+
+# Scénario sous lequel sont rangées les données réelles ingérées (prioritaires sur la simulation)
+REAL_DATA_SCENARIO = 'reel'
+
+def has_real_data(territory_code):
+    """Indique si un export réel a été ingéré pour ce territoire"""
+    return parquet_store.has_history(territory_code, REAL_DATA_SCENARIO)
+
+def validate_historical_frame(frame):
+    """Vérifie qu'une trame respecte le schéma produit par build_historical_frame"""
+    colonnes = list(frame.columns)
+    if colonnes != list(HISTORICAL_DTYPES):
+        raise ValueError(f"Colonnes inattendues: {colonnes} (attendu: {list(HISTORICAL_DTYPES)})")
+    types = {colonne: str(dtype) for colonne, dtype in frame.dtypes.items()}
+    if types != HISTORICAL_DTYPES:
+        ecarts = {c: types[c] for c in HISTORICAL_DTYPES if types[c] != HISTORICAL_DTYPES[c]}
+        raise ValueError(f"Types inattendus: {ecarts}")
+    if frame['date'].isna().any() or frame['categorie'].isna().any():
+        raise ValueError("Dates ou catégories manquantes")
+    if (frame['montant_total_pensions'] < 0).any() or (frame['nombre_beneficiaires'] <= 0).any():
+        raise ValueError("Montants négatifs ou nombre de bénéficiaires nul")
+    return frame
+
+def last_closed_month():
+    """Dernière fin de mois écoulée, c'est-à-dire la dernière date attendue dans l'historique"""
+    return pd.date_range(end=datetime.now(), periods=1, freq='ME')[0].normalize()
+
+def build_missing_months(territory_code, seed=DEFAULT_SEED, derniere_date=None):
+    """Lignes des mois clos postérieurs à derniere_date (trame vide si l'historique est à jour)"""
+    categories = get_categories_retraites(territory_code)
+    date_debut = pd.Timestamp(derniere_date) + pd.Timedelta(days=1)
+    return build_historical_frame(territory_code, categories, seed, date_debut, origine=HISTORY_START)
+
+def append_missing_months(territory_code, seed=DEFAULT_SEED):
+    """Complète l'historique persisté avec les seuls mois manquants ; renvoie l'historique à jour"""
+    derniere_date = parquet_store.last_history_date(territory_code, seed)
+    if derniere_date is None:
+        return None
+    historical_data = parquet_store.read_history(territory_code, seed)
+    nouveaux = build_missing_months(territory_code, seed, derniere_date)
+    if nouveaux.empty:
+        return historical_data
+    # Seules les années des nouveaux mois sont réécrites ; en cas d'échec d'écriture,
+    # l'historique complété reste servi depuis la mémoire
+    parquet_store.append_history(territory_code, seed, nouveaux)
+    return pd.concat([historical_data, nouveaux], ignore_index=True)
+
+def _persisted_scenario(territory_code, seed):
+    """Scénario sous lequel l'historique servi au dashboard est rangé sur disque"""
+    return REAL_DATA_SCENARIO if has_real_data(territory_code) else seed
+
+def persisted_history_end(territory_code, seed=DEFAULT_SEED):
+    """Dernière date de l'historique persisté, s'il peut être lu tel quel depuis le disque
+
+    None si l'historique n'est pas persisté, s'il lui manque des mois clos (le stockage
+    partagé le complète) ou si les données viennent de sources distantes.
+    """
+    if SOURCES_FILE:
+        return None
+    scenario = _persisted_scenario(territory_code, seed)
+    fin = parquet_store.last_history_date(territory_code, scenario)
+    if fin is None or (scenario != REAL_DATA_SCENARIO and fin < last_closed_month()):
+        return None
+    return fin
+
+def persisted_history_version(territory_code, seed=DEFAULT_SEED):
+    """Version de l'historique persisté : scénario lu et identité des partitions sur disque"""
+    scenario = _persisted_scenario(territory_code, seed)
+    return scenario, parquet_store.history_signature(territory_code, scenario)
+
+def read_persisted_history(territory_code, seed=DEFAULT_SEED, columns=None, date_debut=None, date_fin=None):
+    """Lit sur disque les seules colonnes et années demandées (voir persisted_history_end)"""
+    return parquet_store.read_history(territory_code, _persisted_scenario(territory_code, seed),
+                                      columns, date_debut, date_fin)
+
+# Les fonctions en cache ne prennent que des arguments légers (code territoire, graine) :
+# Streamlit n'a plus à hacher le dictionnaire des catégories ni l'historique complet
+@instrumentation.cache_data(ttl=1800)
+def generate_historical_data(territory_code, seed=DEFAULT_SEED, date_debut=HISTORY_START):
+    """Génère les données historiques d'un territoire (ou les relit depuis le disque)"""
+    persiste = date_debut == HISTORY_START
+    if persiste and has_real_data(territory_code):
+        return parquet_store.read_history(territory_code, REAL_DATA_SCENARIO)
+    if persiste and parquet_store.has_history(territory_code, seed):
+        # Changement de mois : seuls les mois manquants sont générés et ajoutés au disque
+        return append_missing_months(territory_code, seed)
+    
+    categories = get_categories_retraites(territory_code)
+    historical_data = build_historical_frame(territory_code, categories, seed, date_debut)
+    if persiste:
+        parquet_store.write_history(territory_code, seed, historical_data)
+    return historical_data
+
+@instrumentation.cache_data(ttl=300)
+def generate_current_data(territory_code, seed=DEFAULT_SEED):
+    """Génère les données courantes d'un territoire (ou les relit depuis le disque)"""
+    historical_data = generate_historical_data(territory_code, seed)
+    categories = get_categories_retraites(territory_code)
+    if has_real_data(territory_code):
+        # Un nouvel export peut modifier le dernier mois : l'instantané n'est pas persisté
+        return build_current_frame(territory_code, categories, historical_data, seed)
+    
+    as_of = historical_data['date'].iloc[-1]
+    current_data = parquet_store.read_current(territory_code, seed, as_of)
+    if current_data is None:
+        current_data = build_current_frame(territory_code, categories, historical_data, seed)
+        parquet_store.write_current(territory_code, seed, as_of, current_data)
+    return current_data
+
+@instrumentation.cache_data(ttl=600)
+def generate_age_data(territory_code):
+    """Génère les données par tranche d'âge optimisées
+    
+    Chaque tranche porte aussi ses paramètres de projection annuels : croissance
+    (entrées dans la tranche, en part de l'effectif), mortalité et revalorisation.
+    """
+    age_ranges = [
+        {'tranche_age': '55-59 ans', 'nombre_beneficiaires': 5000, 'montant_moyen': 800,
+         'croissance': 0.060, 'mortalite': 0.005, 'revalorisation': 0.020},
+        {'tranche_age': '60-64 ans', 'nombre_beneficiaires': 15000, 'montant_moyen': 950,
+         'croissance': 0.045, 'mortalite': 0.008, 'revalorisation': 0.020},
+        {'tranche_age': '65-69 ans', 'nombre_beneficiaires': 35000, 'montant_moyen': 1200,
+         'croissance': 0.035, 'mortalite': 0.012, 'revalorisation': 0.020},
+        {'tranche_age': '70-74 ans', 'nombre_beneficiaires': 40000, 'montant_moyen': 1250,
+         'croissance': 0.040, 'mortalite': 0.020, 'revalorisation': 0.020},
+        {'tranche_age': '75-79 ans', 'nombre_beneficiaires': 30000, 'montant_moyen': 1300,
+         'croissance': 0.055, 'mortalite': 0.035, 'revalorisation': 0.020},
+        {'tranche_age': '80-84 ans', 'nombre_beneficiaires': 20000, 'montant_moyen': 1350,
+         'croissance': 0.080, 'mortalite': 0.060, 'revalorisation': 0.020},
+        {'tranche_age': '85-89 ans', 'nombre_beneficiaires': 12000, 'montant_moyen': 1400,
+         'croissance': 0.130, 'mortalite': 0.110, 'revalorisation': 0.020},
+        {'tranche_age': '90+ ans', 'nombre_beneficiaires': 8000, 'montant_moyen': 1450,
+         'croissance': 0.220, 'mortalite': 0.200, 'revalorisation': 0.020}
+    ]
+    
+    # Ajustement selon le territoire
+    territory_factor = {
+        'REUNION': 1.0, 'GUADELOUPE': 0.95, 'MARTINIQUE': 0.9, 'GUYANE': 0.7,
+        'MAYOTTE': 0.5, 'STPIERRE': 0.3, 'STBARTH': 0.4, 'STMARTIN': 0.45,
+        'WALLIS': 0.25, 'POLYNESIE': 0.8, 'CALEDONIE': 0.85
+    }
+    
+    factor = territory_factor.get(territory_code, 1.0)
+    for age_range in age_ranges:
+        age_range['nombre_beneficiaires'] *= factor
+        age_range['montant_moyen'] *= factor
+    
+    return pd.DataFrame(age_ranges)
+
+@instrumentation.cache_data(ttl=3600)
+def stack_territory_categories(territories):
+    """Table empilée (territoire × catégorie) des montants mensuels de référence"""
+    lignes = [
+        (territory_code, categorie_code, categorie_info['montant_moyen'] * categorie_info['nombre_beneficiaires'])
+        for territory_code, territory_info in territories.items() if territory_info['retraites_actif']
+        for categorie_code, categorie_info in get_categories_retraites(territory_code).items()
+    ]
+    return pd.DataFrame(lignes, columns=['territoire', 'categorie', 'montant_reference'])
+
+def compare_units(units, stacked, live_montants=None):
+    """Tableau de comparaison de toutes les unités (territoires ou communes) en une passe vectorisée
+    
+    units : une ligne par unité, indexée par son code (population, superficie, pib,
+    nombre_retraites, montant_moyen_retraite...) ; stacked : une ligne par couple
+    (territoire, categorie) avec son montant_reference ; live_montants : montants
+    mensuels en direct indexés par (territoire, categorie), prioritaires sur la référence.
+    """
+    montants = stacked['montant_reference'].to_numpy(dtype=float)
+    if live_montants is not None and len(live_montants):
+        couples = pd.MultiIndex.from_arrays([stacked['territoire'], stacked['categorie']])
+        en_direct = live_montants.reindex(couples).to_numpy(dtype=float)
+        montants = np.where(np.isnan(en_direct), montants, en_direct)
+    
+    position = units.index.get_indexer(stacked['territoire'])
+    connue = position >= 0
+    totaux = np.bincount(position[connue], weights=montants[connue], minlength=len(units))
+    
+    comparison = units.rename_axis('territoire').reset_index()
+    comparison['montant_total_pensions'] = totaux
+    comparison['pension_par_habitant'] = totaux / comparison['population'].to_numpy(dtype=float)
+    return comparison
+
+COMPARISON_COLUMNS = [
+    'territoire', 'nom_complet', 'type', 'population', 'superficie', 'pib', 'montant_total_pensions',
+    'nombre_retraites', 'montant_moyen_retraite', 'pension_par_habitant', 'retraites_actif'
+]
+
+@instrumentation.timed()
+def generate_comparison_data(territories, live_data=None):
+    """Génère les données de comparaison entre territoires
+    
+    live_data associe à un code territoire ses données courantes en direct : les montants
+    de ces territoires remplacent les montants de référence des définitions.
+    """
+    units = pd.DataFrame.from_dict(territories, orient='index')
+    units = units[units['retraites_actif'].astype(bool)]
+    
+    live_montants = None
+    if live_data:
+        courantes = pd.concat([frame[['territoire', 'categorie', 'montant_mensuel']] for frame in live_data.values()])
+        live_montants = courantes.set_index(['territoire', 'categorie'])['montant_mensuel']
+    
+    comparison = compare_units(units, stack_territory_categories(territories), live_montants)
+    return comparison[COMPARISON_COLUMNS]
+
+def _aggregate_months(historical_rows):
+    """Totaux par mois et par mois × catégorie principale d'un ensemble de lignes historiques"""
+    mois = historical_rows['date'].dt.to_period('M').dt.to_timestamp()
+    totaux_mensuels = historical_rows.groupby('date')['montant_total_pensions'].sum().reset_index()
+    totaux_mensuels['date_group'] = totaux_mensuels['date'].dt.to_period('M').dt.to_timestamp()
+    totaux_categories = historical_rows.groupby(
+        [mois.rename('date'), 'categorie_principale'], observed=True
+    )['montant_total_pensions'].sum().reset_index()
+    return totaux_mensuels, totaux_categories
+
+def _heatmap_from_monthly(totaux_mensuels):
+    """Pivot année × mois des montants mensuels"""
+    return pd.DataFrame({
+        'annee': totaux_mensuels['date_group'].dt.year,
+        'mois': totaux_mensuels['date_group'].dt.month,
+        'montant_total_pensions': totaux_mensuels['montant_total_pensions']
+    }).pivot(index='annee', columns='mois', values='montant_total_pensions')
+
+@instrumentation.timed()
+def build_aggregates(historical_data):
+    """Précalcule les agrégats historiques lus par les onglets (une seule fois par territoire)"""
+    totaux_mensuels, totaux_categories = _aggregate_months(historical_data)
+    totaux_mensuels['montant_mensuel_M'] = totaux_mensuels['montant_total_pensions'] / 1e6
+    totaux_mensuels['cumulative_pensions'] = totaux_mensuels['montant_total_pensions'].cumsum()
+    return {
+        'totaux_mensuels': totaux_mensuels,
+        'totaux_categories': totaux_categories,
+        'heatmap': _heatmap_from_monthly(totaux_mensuels)
+    }
+
+def _aggregate_new_months(new_rows):
+    """Mêmes totaux que _aggregate_months, calculés en numpy pour quelques mois
+
+    Sur un mois de données, les groupby pandas coûtent presque autant que sur tout
+    l'historique (coût fixe) : une mise à jour incrémentale ne peut pas s'en servir.
+    """
+    dates = new_rows['date'].to_numpy()
+    montants = new_rows['montant_total_pensions'].to_numpy()
+    jours, indices_jours = np.unique(dates, return_inverse=True)
+    totaux_mensuels = pd.DataFrame({
+        'date': jours,
+        'montant_total_pensions': np.bincount(indices_jours, weights=montants),
+        'date_group': jours.astype('datetime64[M]').astype('datetime64[ns]')
+    })
+    
+    # Clé (mois, catégorie principale) ordonnée comme le groupby : par mois puis par catégorie
+    principales = new_rows['categorie_principale']
+    n_principales = len(principales.cat.categories)
+    mois, indices_mois = np.unique(dates.astype('datetime64[M]'), return_inverse=True)
+    cles, indices_cles = np.unique(indices_mois * n_principales + principales.cat.codes.to_numpy(),
+                                   return_inverse=True)
+    totaux_categories = pd.DataFrame({
+        'date': mois[cles // n_principales].astype('datetime64[ns]'),
+        'categorie_principale': pd.Categorical.from_codes(cles % n_principales, dtype=principales.dtype),
+        'montant_total_pensions': np.bincount(indices_cles, weights=montants)
+    })
+    return totaux_mensuels, totaux_categories
+
+@instrumentation.timed()
+def update_aggregates(aggregates, new_rows):
+    """Ajoute aux agrégats les lignes de nouveaux mois sans réagréger tout l'historique"""
+    nouveaux_mensuels, nouveaux_categories = _aggregate_new_months(new_rows)
+    nouveaux_mensuels['montant_mensuel_M'] = nouveaux_mensuels['montant_total_pensions'] / 1e6
+    
+    anciens_mensuels = aggregates['totaux_mensuels']
+    cumul_precedent = anciens_mensuels['cumulative_pensions'].iloc[-1] if len(anciens_mensuels) else 0.0
+    nouveaux_mensuels['cumulative_pensions'] = cumul_precedent + nouveaux_mensuels['montant_total_pensions'].cumsum()
+    
+    # Seules les cellules des nouveaux mois sont écrites dans une copie du pivot (une ligne
+    # est ajoutée au changement d'année)
+    heatmap = aggregates['heatmap']
+    annees = nouveaux_mensuels['date_group'].dt.year.to_numpy()
+    mois = nouveaux_mensuels['date_group'].dt.month.to_numpy()
+    heatmap = heatmap.reindex(
+        index=heatmap.index.union(pd.Index(np.unique(annees), dtype=heatmap.index.dtype, name=heatmap.index.name)),
+        columns=heatmap.columns.union(pd.Index(np.unique(mois), dtype=heatmap.columns.dtype, name=heatmap.columns.name))
+    )
+    valeurs = heatmap.to_numpy(copy=True)
+    valeurs[heatmap.index.get_indexer(annees), heatmap.columns.get_indexer(mois)] = \
+        nouveaux_mensuels['montant_total_pensions'].to_numpy()
+    heatmap = pd.DataFrame(valeurs, index=heatmap.index, columns=heatmap.columns)
+    
+    return {
+        'totaux_mensuels': pd.concat([anciens_mensuels, nouveaux_mensuels], ignore_index=True),
+        'totaux_categories': pd.concat([aggregates['totaux_categories'], nouveaux_categories], ignore_index=True),
+        'heatmap': heatmap
+    }
+
+# Probabilité qu'une catégorie change à chaque mise à jour en direct
+LIVE_CHANGE_PROBABILITY = 0.3
+
+@instrumentation.timed()
+def apply_live_ticks(current_data, territory_code, seed=DEFAULT_SEED, premier_tick=0, n_ticks=1):
+    """Applique n mises à jour en direct à toutes les catégories en une seule opération"""
+    n_categories = len(current_data)
+    rng = get_rng(territory_code, seed, 'live')
+    # Chaque mise à jour consomme 3 tirages par catégorie : on saute directement à la première
+    # demandée, si bien que n mises à jour groupées donnent le même résultat que n appels successifs
+    rng.bit_generator.advance(premier_tick * 3 * n_categories)
+    tirages = rng.random((n_ticks, 3, n_categories))
+    
+    masque = tirages[:, 0] < LIVE_CHANGE_PROBABILITY
+    variations = np.where(masque, -0.01 + 0.02 * tirages[:, 1], 0.0)
+    facteurs_beneficiaires = np.where(masque, 0.99 + 0.02 * tirages[:, 2], 1.0)
+    
+    # Dernière variation appliquée à chaque catégorie (inchangée si aucune mise à jour ne l'a touchée)
+    dernier_tick = n_ticks - 1 - np.argmax(masque[::-1], axis=0)
+    derniere_variation = variations[dernier_tick, np.arange(n_categories)]
+    
+    updated = current_data.copy()
+    updated['montant_mensuel'] = current_data['montant_mensuel'].to_numpy() * np.prod(1 + variations, axis=0)
+    updated['variation_pct'] = np.where(masque.any(axis=0), derniere_variation * 100,
+                                        current_data['variation_pct'].to_numpy())
+    updated['nombre_beneficiaires'] = (current_data['nombre_beneficiaires'].to_numpy()
+                                       * np.prod(facteurs_beneficiaires, axis=0))
+    return updated
+
+def dataframe_memory_bytes(*frames):
+    """Mémoire occupée par des DataFrames (octets, chaînes comprises)"""
+    return int(sum(frame.memory_usage(deep=True).sum() for frame in frames if frame is not None))
+
+def memory_report(frame):
+    """Rapport mémoire par colonne : type, octets totaux et octets par ligne"""
+    usage = frame.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype': frame.dtypes.astype(str),
+        'octets': usage,
+        'octets_par_ligne': usage / max(len(frame), 1)
+    })
+    report.loc['TOTAL'] = ['', usage.sum(), usage.sum() / max(len(frame), 1)]
+    return report
+
+@instrumentation.timed()
+def load_territory_frames(territory_code, seed=DEFAULT_SEED):
+    """Génère (ou relit depuis le disque) les données de base d'un territoire"""
+    historical_data = generate_historical_data(territory_code, seed)
+    return {
+        'categories': get_categories_retraites(territory_code),
+        'historical_data': historical_data,
+        'aggregates': build_aggregates(historical_data),
+        'current_data': generate_current_data(territory_code, seed),
+        'age_data': generate_age_data(territory_code)
+    }
+
+class TerritoryDataStore:
+    """Stockage partagé par toutes les sessions du processus (données de base en lecture seule)"""
+    
+    def __init__(self, max_entries=33, ttl_seconds=1800, loader=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # loader(territory_code, seed) renvoie les trames de load_territory_frames
+        self.loader = loader or load_territory_frames
+        self._entries = OrderedDict()
+        # Verrou global court (lecture/écriture des entrées) ; un verrou par territoire
+        # sérialise les chargements sans bloquer les territoires déjà en mémoire
+        self._lock = threading.Lock()
+        self._key_locks = {}
+    
+    def _is_fresh(self, entry):
+        return (datetime.now() - entry['created']).total_seconds() < self.ttl_seconds
+    
+    def _is_current(self, entry):
+        """Entrée utilisable telle quelle : non expirée et sans mois clos manquant"""
+        return self._is_fresh(entry) and (entry['donnees_reelles'] or entry['history_end'] >= last_closed_month())
+    
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self._is_fresh(entry)
+    
+    def invalidate(self, territory_code=None):
+        """Oublie les données d'un territoire (ou de tous) : elles seront relues au prochain accès"""
+        with self._lock:
+            for key in [k for k in self._entries if territory_code is None or k[0] == territory_code]:
+                del self._entries[key]
+    
+    def get(self, territory_code, seed):
+        """Renvoie les données de base d'un territoire, générées une seule fois par processus"""
+        key = (territory_code, seed)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_current(entry):
+                self._entries.move_to_end(key)
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        # Génération, lecture disque ou source distante hors du verrou global : seuls
+        # les appelants du même territoire attendent, et un seul chargement a lieu
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and self._is_current(entry):
+                return entry  # chargé par un autre appelant pendant l'attente
+            if entry is None or not self._is_fresh(entry):
+                entry = self._new_entry(territory_code, self.loader(territory_code, seed))
+            else:
+                entry = self._append_new_months(entry, territory_code, seed)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._evict()
+        return entry
+    
+    def _evict(self):
+        """Éviction des scénarios les moins récemment utilisés (verrou global tenu)"""
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self._key_locks.pop(key, None)
+    
+    def put(self, territory_code, seed, frames):
+        """Place dans le stockage des données chargées ailleurs (préchargement par un worker)"""
+        key = (territory_code, seed)
+        nouvelle = self._new_entry(territory_code, frames)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                return  # déjà chargé par une session : son état en direct est conservé
+            self._entries[key] = nouvelle
+            self._evict()
+    
+    @staticmethod
+    def _new_entry(territory_code, frames):
+        return {
+            **frames,
+            # Données d'une source distante ou importées : pas de mois simulés ajoutés
+            'donnees_reelles': frames.get('donnees_reelles', False) or has_real_data(territory_code),
+            'history_end': frames['historical_data']['date'].iloc[-1],
+            # État en direct partagé, avancé par le LiveTicker
+            'live_data': frames['current_data'],
+            'live_ticks': 0,
+            'last_update': datetime.now(),
+            'created': datetime.now()
+        }
+    
+    def _append_new_months(self, entry, territory_code, seed):
+        """Passage au mois suivant : coût proportionnel aux nouveaux mois, pas à tout l'historique"""
+        nouveaux = build_missing_months(territory_code, seed, entry['history_end'])
+        if nouveaux.empty:
+            return entry
+        parquet_store.append_history(territory_code, seed, nouveaux)
+        
+        # Le dernier mois de chaque catégorie figure dans les nouvelles lignes : l'instantané
+        # courant est identique à celui calculé sur l'historique complet
+        history_end = nouveaux['date'].iloc[-1]
+        current_data = build_current_frame(territory_code, entry['categories'], nouveaux, seed)
+        parquet_store.write_current(territory_code, seed, history_end, current_data)
+        
+        # Nouvelle entrée (les lecteurs en cours gardent l'ancienne, cohérente)
+        return {
+            **entry,
+            'historical_data': pd.concat([entry['historical_data'], nouveaux], ignore_index=True),
+            'aggregates': update_aggregates(entry['aggregates'], nouveaux),
+            'current_data': current_data,
+            'history_end': history_end,
+            # Le nouvel instantané sert de base aux mises à jour en direct suivantes
+            'live_data': current_data,
+            'last_update': datetime.now()
+        }
+    
+    def advance_live(self, n_ticks=1):
+        """Avance l'état en direct partagé de tous les territoires chargés
+
+        Les données réelles (export ingéré ou source distante) ne reçoivent pas de
+        mises à jour simulées : elles ne changent qu'au rechargement depuis leur source.
+        """
+        with self._lock:
+            keys = list(self._entries.keys())
+        for key in keys:
+            territory_code, seed = key
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None or entry['donnees_reelles']:
+                continue
+            live_data = apply_live_ticks(entry['live_data'], territory_code, seed, entry['live_ticks'], n_ticks)
+            with self._lock:
+                # Remplacement (et non modification) de l'entrée : les lecteurs gardent un état cohérent
+                if self._entries.get(key) is entry:
+                    self._entries[key] = {
+                        **entry,
+                        'live_data': live_data,
+                        'live_ticks': entry['live_ticks'] + n_ticks,
+                        'last_update': datetime.now()
+                    }
+    
+    def live_data(self, seed):
+        """Données en direct des territoires chargés pour une graine (code territoire -> données)"""
+        with self._lock:
+            return {
+                territory_code: entry['live_data']
+                for (territory_code, entry_seed), entry in self._entries.items()
+                if entry_seed == seed and self._is_fresh(entry)
+            }
+    
+    def memory_bytes(self):
+        """Mémoire totale des DataFrames partagés"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return sum(
+            dataframe_memory_bytes(entry['historical_data'], entry['current_data'], entry['age_data'],
+                                   None if entry['live_data'] is entry['current_data'] else entry['live_data'])
+            for entry in entries
+        )
+
+class LiveTicker:
+    """Fil d'arrière-plan qui avance les données en direct du stockage partagé à intervalle régulier"""
+    
+    def __init__(self, store, interval=LIVE_REFRESH_SECONDS):
+        self.store = store
+        self.interval = interval
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='retraites-live-ticker', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        origine = time.monotonic()
+        while not self._stop.wait(self.interval):
+            # Rattrapage en un seul lot si le fil a pris du retard
+            attendus = int((time.monotonic() - origine) / self.interval)
+            if attendus > self.ticks:
+                self.store.advance_live(attendus - self.ticks)
+                self.ticks = attendus
+    
+    def stop(self):
+        self._stop.set()
+
+@st.cache_resource
+def get_territory_store():
+    """Instance unique du stockage partagé pour le processus Streamlit"""
+    if SOURCES_FILE:
+        # Import différé : providers.py s'appuie lui-même sur ce module
+        from providers import get_provider_runtime
+        runtime = get_provider_runtime()
+        return TerritoryDataStore(ttl_seconds=runtime.fraicheur_s, loader=runtime.load)
+    return TerritoryDataStore()
+
+@st.cache_resource
+def get_live_ticker(interval=LIVE_REFRESH_SECONDS):
+    """Démarre une seule fois par processus l'actualisation en arrière-plan"""
+    return LiveTicker(get_territory_store(), interval)
+
+def _warm_up_worker(territory_code, seed):
+    """Exécuté dans un processus du pool : charge un territoire et mesure la durée"""
+    # Hors `streamlit run`, chaque appel en cache produirait un avertissement
+    st_logger.set_log_level('error')
+    debut = time.perf_counter()
+    frames = load_territory_frames(territory_code, seed)
+    return frames, time.perf_counter() - debut
+
+class TerritoryWarmUp:
+    """Préchargement parallèle (pool de processus) de tous les territoires dans le stockage partagé"""
+    
+    def __init__(self, store, seed=DEFAULT_SEED, territory_codes=None, max_workers=WARMUP_WORKERS):
+        self.store = store
+        self.seed = seed
+        self.territory_codes = list(territory_codes or get_territories_definitions())
+        self.max_workers = max_workers
+        self.timings = {}
+        self.errors = {}
+        self.duration = None
+        # finished : préchargement terminé ; ready : terminé et tous les territoires chargés
+        self.finished = threading.Event()
+        self.ready = threading.Event()
+        if READY_FILE and os.path.exists(READY_FILE):
+            os.remove(READY_FILE)
+        self._debut = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='retraites-warm-up', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        try:
+            self._load(self.territory_codes)
+        finally:
+            self.duration = time.perf_counter() - self._debut
+            logger.info("Préchargement terminé: %d territoires en %.2f s", len(self.timings), self.duration)
+            if not self.errors and len(self.timings) == len(self.territory_codes):
+                self.ready.set()
+                self._write_ready_file()
+            else:
+                # Pas de fichier d'état : le contrôle de santé ne déclare pas prêt un serveur incomplet
+                logger.error("Préchargement incomplet, territoires en échec: %s", ', '.join(sorted(self.errors)))
+            self.finished.set()
+    
+    def _load(self, territory_codes):
+        """Charge les territoires dans un pool de processus (dans ce fil à défaut)"""
+        try:
+            # spawn : les workers importent ce module sans hériter des fils du serveur
+            with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {pool.submit(_warm_up_worker, code, self.seed): code for code in territory_codes}
+                for future in as_completed(futures):
+                    self._record(futures[future], future)
+        except (OSError, BrokenProcessPool) as exc:
+            # Processus indisponibles (bac à sable, limites) ou arrêtés en cours de route
+            logger.warning("Préchargement parallèle impossible (%r), chargement dans ce fil", exc)
+        # Territoires que le pool n'a pas chargés (pool indisponible ou worker mort) : dans ce fil
+        for code in territory_codes:
+            if code in self.timings or code in self.errors:
+                continue
+            debut = time.perf_counter()
+            try:
+                frames = load_territory_frames(code, self.seed)
+            except Exception as exc:  # un territoire en échec n'empêche pas les autres
+                self.errors[code] = repr(exc)
+                logger.error("Préchargement de %s en échec: %r", code, exc)
+                continue
+            self.store.put(code, self.seed, frames)
+            self.timings[code] = time.perf_counter() - debut
+    
+    def _record(self, territory_code, future):
+        try:
+            frames, duree = future.result()
+        except BrokenProcessPool:
+            # Worker tué (mémoire, signal) : le territoire sera chargé dans ce fil
+            return
+        except Exception as exc:  # un territoire en échec n'empêche pas les autres
+            self.errors[territory_code] = repr(exc)
+            logger.error("Préchargement de %s en échec: %r", territory_code, exc)
+            return
+        self.store.put(territory_code, self.seed, frames)
+        self.timings[territory_code] = duree
+        logger.info("Préchargement de %s: %.0f ms", territory_code, duree * 1000)
+    
+    def is_ready(self):
+        return self.ready.is_set()
+    
+    def status(self):
+        """État du préchargement, lisible par un contrôle de santé"""
+        return {
+            'pret': self.is_ready(),
+            'termine': self.finished.is_set(),
+            'territoires_charges': len(self.timings),
+            'territoires_total': len(self.territory_codes),
+            'duree_s': self.duration,
+            'temps_par_territoire_s': dict(self.timings),
+            'erreurs': dict(self.errors)
+        }
+    
+    def _write_ready_file(self):
+        if not READY_FILE:
+            return
+        tmp_path = READY_FILE + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as fichier:
+                json.dump(self.status(), fichier, indent=2)
+            os.replace(tmp_path, READY_FILE)
+        except OSError as exc:
+            logger.error("Écriture du fichier d'état %s impossible: %s", READY_FILE, exc)
+
+@st.cache_resource
+def get_warm_up(seed=DEFAULT_SEED):
+    """Lance une seule fois par processus le préchargement des territoires (None si désactivé)"""
+    if not WARMUP_ENABLED:
+        return None
+    if SOURCES_FILE:
+        from providers import ProviderWarmUp, get_provider_runtime
+        return ProviderWarmUp(get_territory_store(), get_provider_runtime(), seed)
+    return TerritoryWarmUp(get_territory_store(), seed)
+
+@st.cache_resource
+def get_simulation_pool():
+    """Pool de processus partagé pour les simulations Monte Carlo (None en mono-cœur)"""
+    if MONTE_CARLO_WORKERS <= 1:
+        return None
+    return ProcessPoolExecutor(MONTE_CARLO_WORKERS, mp_context=multiprocessing.get_context('spawn'))
@@ -0,0 +1,24 @@
+# conftest.py
+"""Configuration commune des tests.
+
+Les modules du dépôt sont importables depuis la racine ; l'historique persisté est
+écrit dans un dossier temporaire (jamais dans data_store/) ; ni préchargement en
+arrière-plan ni sources distantes, quel que soit l'environnement du poste.
+"""
+import os
+import sys
+import tempfile
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RACINE)
+
+# Avant tout import du moteur : ces variables sont lues à l'import
+os.environ['RETRAITES_DATA_DIR'] = tempfile.mkdtemp(prefix='retraites_tests_')
+os.environ['RETRAITES_WARMUP'] = '0'
+os.environ.pop('RETRAITES_SOURCES', None)
+os.environ.pop('RETRAITES_READY_FILE', None)
+
+from streamlit import logger as st_logger  # noqa: E402
+
+# Hors `streamlit run`, chaque appel en cache produirait un avertissement
+st_logger.set_log_level('error')
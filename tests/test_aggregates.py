@@ -0,0 +1,37 @@
+# test_aggregates.py
+"""Agrégats historiques : la mise à jour incrémentale vaut une reconstruction complète"""
+import pandas as pd
+import pytest
+
+from retraites_engine import build_aggregates, build_historical_frame, get_categories_retraites, update_aggregates
+
+TERRITOIRE = 'GUADELOUPE'
+
+
+@pytest.fixture(scope='module', params=['2015-01-01', '2015-03-01'])
+def historique(request):
+    return build_historical_frame(TERRITOIRE, get_categories_retraites(TERRITOIRE), 3, request.param)
+
+
+def assert_aggregates_equal(obtenus, attendus):
+    assert obtenus.keys() == attendus.keys()
+    for nom in attendus:
+        pd.testing.assert_frame_equal(obtenus[nom], attendus[nom], check_exact=False, rtol=1e-12)
+
+
+def test_colonnes_de_build_aggregates(historique):
+    agregats = build_aggregates(historique)
+    mensuels = agregats['totaux_mensuels']
+    assert len(mensuels) == historique['date'].nunique()
+    assert mensuels['montant_total_pensions'].sum() == pytest.approx(historique['montant_total_pensions'].sum())
+    assert mensuels['cumulative_pensions'].iloc[-1] == pytest.approx(mensuels['montant_total_pensions'].sum())
+    assert agregats['heatmap'].stack().sum() == pytest.approx(mensuels['montant_total_pensions'].sum())
+
+
+@pytest.mark.parametrize('n_mois', [1, 3, 14])
+def test_mise_a_jour_identique_a_la_reconstruction(historique, n_mois):
+    """Ajout des n derniers mois (dont un changement d'année pour 14) aux agrégats des précédents"""
+    coupure = sorted(historique['date'].unique())[-n_mois]
+    anciens = historique[historique['date'] < coupure]
+    nouveaux = historique[historique['date'] >= coupure]
+    assert_aggregates_equal(update_aggregates(build_aggregates(anciens), nouveaux), build_aggregates(historique))
@@ -0,0 +1,119 @@
+# test_api.py
+"""API JSON : routage, sélection, erreurs, ETag et compression"""
+import gzip
+import json
+import threading
+import urllib.request
+
+import pytest
+
+from api import DataApi, create_server
+from retraites_engine import DEFAULT_SEED, TerritoryDataStore
+
+TERRITOIRE = 'MAYOTTE'
+
+
+class FailingStore(TerritoryDataStore):
+    def get(self, territory_code, seed):
+        raise OSError("disque indisponible")
+
+
+@pytest.fixture(scope='module')
+def api():
+    return DataApi(store=TerritoryDataStore())
+
+
+def get_json(api, path, query=''):
+    statut, entetes, corps = api.handle(path, query)
+    return statut, entetes, json.loads(corps)
+
+
+def test_territoires(api):
+    statut, _, corps = get_json(api, '/territories')
+    assert statut == 200 and TERRITOIRE in corps['territoires']
+
+
+@pytest.mark.parametrize('path', ['/inconnu', '/territories/ATLANTIDE/history', '/territories/MAYOTTE/autre'])
+def test_ressource_inconnue(api, path):
+    statut, entetes, corps = get_json(api, path)
+    assert statut == 404 and 'erreur' in corps
+    assert entetes['Content-Type'].startswith('application/json')
+
+
+def test_historique_colonnes_et_periode(api):
+    statut, _, corps = get_json(api, f'/territories/{TERRITOIRE}/history',
+                                'columns=date,montant_total_pensions&start=2023-01&end=2023-03')
+    assert statut == 200
+    assert corps['meta']['colonnes'] == ['date', 'montant_total_pensions']
+    dates = sorted({ligne['date'][:10] for ligne in corps['donnees']})
+    assert dates == ['2023-01-31', '2023-02-28', '2023-03-31']
+
+
+def test_fin_annee_entiere(api):
+    _, _, corps = get_json(api, f'/territories/{TERRITOIRE}/history', 'columns=date&start=2023&end=2023')
+    dates = sorted({ligne['date'][:7] for ligne in corps['donnees']})
+    assert dates[0] == '2023-01' and dates[-1] == '2023-12' and len(dates) == 12
+
+
+def test_date_avec_fuseau(api):
+    statut, _, corps = get_json(api, f'/territories/{TERRITOIRE}/history',
+                                'columns=date&start=2024-01-01T00:00:00%2B02:00&end=2024-01-31')
+    assert statut == 200
+    assert {ligne['date'][:10] for ligne in corps['donnees']} == {'2024-01-31'}
+
+
+@pytest.mark.parametrize('query', ['columns=inconnue', 'start=hier', 'seed=abc'])
+def test_requete_invalide(api, query):
+    statut, _, corps = get_json(api, f'/territories/{TERRITOIRE}/history', query)
+    assert statut == 400 and 'erreur' in corps
+
+
+def test_etag_et_304(api):
+    statut, entetes, corps = api.handle(f'/territories/{TERRITOIRE}/age')
+    assert statut == 200 and entetes['ETag']
+    statut, entetes_304, corps_304 = api.handle(f'/territories/{TERRITOIRE}/age', if_none_match=entetes['ETag'])
+    assert (statut, corps_304) == (304, b'') and entetes_304['ETag'] == entetes['ETag']
+    # Autres paramètres : autre ETag
+    _, autres, _ = api.handle(f'/territories/{TERRITOIRE}/age', 'columns=tranche_age')
+    assert autres['ETag'] != entetes['ETag']
+
+
+def test_gzip(api):
+    _, _, brut = api.handle(f'/territories/{TERRITOIRE}/history')
+    statut, entetes, compresse = api.handle(f'/territories/{TERRITOIRE}/history', accept_gzip=True)
+    assert statut == 200 and entetes['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compresse) == brut
+
+
+def corps_territoires(store):
+    return get_json(DataApi(store=store), '/territories')[2]['territoires']
+
+
+def test_comparaison_sans_chargement_par_defaut():
+    store = TerritoryDataStore()
+    statut, _, corps = get_json(DataApi(store=store), '/comparison', 'columns=territoire,montant_total_pensions')
+    assert statut == 200 and corps['meta']['live'] is False and corps['meta']['lignes'] > 0
+    assert not any((code, DEFAULT_SEED) in store for code in corps_territoires(store))
+
+
+def test_erreur_du_stockage_en_json():
+    statut, entetes, corps = get_json(DataApi(store=FailingStore()), f'/territories/{TERRITOIRE}/current')
+    assert statut == 500 and 'disque indisponible' in corps['erreur']
+
+
+def test_serveur_http(api):
+    server = create_server(0, api=api)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/territories/{TERRITOIRE}/current?columns=categorie'
+        with urllib.request.urlopen(url) as reponse:
+            corps = json.loads(reponse.read())
+            etag = reponse.headers['ETag']
+        assert corps['meta']['colonnes'] == ['categorie']
+        requete = urllib.request.Request(url, headers={'If-None-Match': etag})
+        with pytest.raises(urllib.error.HTTPError) as erreur:
+            urllib.request.urlopen(requete)
+        assert erreur.value.code == 304
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,86 @@
+# test_benchmarks.py
+"""Suite de benchmarks : mesures, comparaison à la référence et code de sortie"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+import run_suite  # noqa: E402
+from run_suite import compare, mesurer, synthetic_categories  # noqa: E402
+
+
+def mesure(min_ms, median_ms=None, repetitions=10):
+    return {'min_ms': min_ms, 'median_ms': median_ms or min_ms, 'repetitions': repetitions}
+
+
+def test_mesurer():
+    appels = []
+    resultat = mesurer(lambda: appels.append(1), repetitions=5, echauffement=2)
+    assert len(appels) == 7 and resultat['repetitions'] == 5
+    assert 0 <= resultat['min_ms'] <= resultat['median_ms']
+
+
+def test_categories_synthetiques():
+    categories = synthetic_categories('REUNION', 50)
+    assert len(categories) == 50 and len(set(categories)) == 50
+
+
+@pytest.mark.parametrize('actuel, attendu', [
+    (mesure(100), []),                       # identique
+    (mesure(125), []),                       # sous le seuil de 30 %
+    (mesure(150), [('f', 100, 150, 50)]),    # régression
+    (mesure(150, 110), []),                  # minimum isolé : la médiane n'a pas régressé
+    (mesure(150, 150, repetitions=1), []),   # mesure unique, indicative
+])
+def test_seuil_relatif(actuel, attendu):
+    assert compare({'f': actuel}, {'f': mesure(100)}, seuil_pct=30, marge_ms=5) == attendu
+
+
+def test_marge_absolue():
+    """+100 % sur 2 ms reste sous la marge de 5 ms : bruit des mesures courtes"""
+    assert compare({'f': mesure(4)}, {'f': mesure(2)}, seuil_pct=30, marge_ms=5) == []
+    assert compare({'f': mesure(14)}, {'f': mesure(7)}, seuil_pct=30, marge_ms=5) == [('f', 7, 14, 100)]
+
+
+def test_bruit_de_la_reference():
+    """Une référence dispersée (médiane 20 % au-dessus du minimum) tolère 20 % de plus"""
+    reference = {'f': mesure(100, 120)}
+    assert compare({'f': mesure(145, 160)}, reference, seuil_pct=30, marge_ms=5) == []
+    assert compare({'f': mesure(155, 160)}, reference, seuil_pct=30, marge_ms=5) != []
+
+
+def test_calibration():
+    """Sur une machine deux fois plus lente, des temps doublés ne sont pas des régressions"""
+    assert compare({'f': mesure(200)}, {'f': mesure(100)}, 30, 5, facteur=2.0) == []
+    assert compare({'f': mesure(300)}, {'f': mesure(100)}, 30, 5, facteur=2.0) == [('f', 200, 300, 50)]
+
+
+def test_mesure_sans_reference():
+    assert compare({'nouvelle': mesure(100)}, {}, 30, 5) == []
+
+
+def test_run_complet(tmp_path, monkeypatch):
+    """Référence, puis mesure comparée : code de sortie 0 sans régression, 1 sinon"""
+    durees = {'rapide': mesure(10), 'lente': mesure(50)}
+    monkeypatch.setattr(run_suite, 'GROUPS', {'factice': lambda: {nom: dict(m) for nom, m in durees.items()}})
+    monkeypatch.setattr(run_suite, 'calibrer', lambda: 1.0)
+    sortie, reference = tmp_path / 'latest.json', tmp_path / 'baseline.json'
+
+    def lancer(*options):
+        monkeypatch.setattr(sys, 'argv', ['run_suite.py', '--output', str(sortie), '--baseline', str(reference),
+                                          *options])
+        return run_suite.main()
+
+    assert lancer() == 0 and not reference.exists()  # sans référence : mesures écrites seulement
+    assert lancer('--update-baseline') == 0
+    rapport = json.loads(reference.read_text(encoding='utf-8'))
+    assert rapport['resultats'] == durees and rapport['meta']['calibration_ms'] == 1.0
+
+    assert lancer() == 0
+    durees['lente'] = mesure(100)
+    assert lancer() == 1
+    assert lancer('--filtre', 'rapide') == 0
+    assert list(json.loads(sortie.read_text(encoding='utf-8'))['resultats']) == ['rapide']
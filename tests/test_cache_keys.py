@@ -0,0 +1,67 @@
+# test_cache_keys.py
+"""Clés de cache légères : code territoire et graine, jamais les catégories ni l'historique"""
+import inspect
+
+import pandas as pd
+import pytest
+
+import retraites_engine
+from retraites_engine import (
+    build_current_frame,
+    generate_age_data,
+    generate_current_data,
+    generate_historical_data,
+    get_categories_retraites
+)
+
+TERRITOIRE = 'STBARTH'
+# Début non persisté : l'historique est toujours construit, jamais relu sur disque
+DEBUT = '2019-01-01'
+
+
+@pytest.fixture
+def constructions(monkeypatch):
+    """Appels à build_historical_frame, caches vidés avant et après le test"""
+    appels = []
+    construire = retraites_engine.build_historical_frame
+
+    def compter(territory_code, categories, seed, date_debut, *args, **kwargs):
+        appels.append((territory_code, seed, date_debut))
+        return construire(territory_code, categories, seed, date_debut, *args, **kwargs)
+
+    monkeypatch.setattr(retraites_engine, 'build_historical_frame', compter)
+    generate_historical_data.clear()
+    generate_current_data.clear()
+    yield appels
+    generate_historical_data.clear()
+    generate_current_data.clear()
+
+
+@pytest.mark.parametrize('fonction', [generate_historical_data, generate_current_data, generate_age_data])
+def test_arguments_scalaires(fonction):
+    """Seuls des scalaires sont hachés par st.cache_data : le coût de la clé ne suit pas l'historique"""
+    parametres = inspect.signature(fonction).parameters
+    assert list(parametres)[0] == 'territory_code'
+    assert all(p.default is p.empty or isinstance(p.default, (str, int)) for p in parametres.values())
+
+
+def test_historique_servi_par_le_cache(constructions):
+    premier = generate_historical_data(TERRITOIRE, 31, DEBUT)
+    pd.testing.assert_frame_equal(generate_historical_data(TERRITOIRE, 31, DEBUT), premier)
+    assert constructions == [(TERRITOIRE, 31, DEBUT)]
+
+    # Autre graine ou autre début : autre entrée du cache
+    generate_historical_data(TERRITOIRE, 32, DEBUT)
+    generate_historical_data(TERRITOIRE, 31, '2020-01-01')
+    assert len(constructions) == 3
+
+
+def test_donnees_courantes_cherchent_l_historique_elles_memes(constructions):
+    """generate_current_data(code, graine) retrouve l'historique par sa propre clé de cache"""
+    courant = generate_current_data(TERRITOIRE, 33)
+    historique = generate_historical_data(TERRITOIRE, 33)
+    assert constructions == [(TERRITOIRE, 33, retraites_engine.HISTORY_START)]
+    attendu = build_current_frame(TERRITOIRE, get_categories_retraites(TERRITOIRE), historique, 33)
+    pd.testing.assert_frame_equal(courant, attendu)
+    pd.testing.assert_frame_equal(generate_current_data(TERRITOIRE, 33), courant)
+    assert len(constructions) == 1
@@ -0,0 +1,50 @@
+# test_comparison.py
+"""Comparaison des territoires : le calcul vectorisé reprend les sommes de référence"""
+import pytest
+
+from retraites_engine import (
+    COMPARISON_COLUMNS,
+    build_current_frame,
+    build_historical_frame,
+    generate_comparison_data,
+    get_categories_retraites,
+    get_territories_definitions
+)
+
+
+@pytest.fixture(scope='module')
+def territoires():
+    return get_territories_definitions()
+
+
+def reference_totals(territoires):
+    """Calcul d'origine, territoire par territoire"""
+    return {
+        code: sum(info['montant_moyen'] * info['nombre_beneficiaires']
+                  for info in get_categories_retraites(code).values())
+        for code, territoire in territoires.items() if territoire['retraites_actif']
+    }
+
+
+def test_sommes_de_reference(territoires):
+    comparison = generate_comparison_data(territoires)
+    attendus = reference_totals(territoires)
+    assert list(comparison.columns) == COMPARISON_COLUMNS
+    assert list(comparison['territoire']) == list(attendus)
+    for _, ligne in comparison.iterrows():
+        total = attendus[ligne['territoire']]
+        assert ligne['montant_total_pensions'] == pytest.approx(total)
+        assert ligne['pension_par_habitant'] == pytest.approx(total / territoires[ligne['territoire']]['population'])
+
+
+def test_montants_en_direct_prioritaires(territoires):
+    """Les territoires en direct prennent la somme de leurs montants courants, les autres la référence"""
+    code = 'REUNION'
+    categories = get_categories_retraites(code)
+    courant = build_current_frame(code, categories, build_historical_frame(code, categories, 5, '2024-01-01'), 5)
+    comparison = generate_comparison_data(territoires, {code: courant}).set_index('territoire')
+    attendus = reference_totals(territoires)
+    assert comparison.loc[code, 'montant_total_pensions'] == pytest.approx(courant['montant_mensuel'].sum())
+    for autre, total in attendus.items():
+        if autre != code:
+            assert comparison.loc[autre, 'montant_total_pensions'] == pytest.approx(total)
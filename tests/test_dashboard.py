@@ -0,0 +1,150 @@
+# test_dashboard.py
+"""Page complète sous AppTest (exécution sans navigateur du script Streamlit)"""
+import os
+import re
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Dashboard.py')
+
+
+@pytest.fixture
+def app():
+    app = AppTest.from_file(DASHBOARD, default_timeout=120)
+    app.run()
+    assert not app.exception
+    return app
+
+
+def test_actualisation_automatique(app):
+    """Actualisation activée : les métriques, rendues dans un fragment, restent affichées"""
+    metriques = [metrique.label for metrique in app.metric]
+    app.toggle(key='auto_refresh').set_value(True).run()
+    assert not app.exception
+    assert [metrique.label for metrique in app.metric] == metriques
+
+
+def test_bouton_de_mise_a_jour(app):
+    avant = app.session_state['territories_data']['REUNION']['live_ticks']
+    bouton = next(b for b in app.sidebar.button if b.label == "🔄 Mettre à jour les données")
+    bouton.click().run()
+    assert not app.exception
+    assert app.session_state['territories_data']['REUNION']['live_ticks'] == avant + 1
+    assert any("mises à jour" in message.value for message in app.success)
+
+
+def test_seule_la_section_active_est_calculee(app):
+    """Navigation paresseuse (par défaut) : une section calculée, celle qui est affichée"""
+    sections = app.radio(key='active_section').options
+    assert list(app.session_state['section_timings']) == [sections[0]]
+
+    app.radio(key='active_section').set_value(sections[2]).run()
+    assert not app.exception
+    # Le temps mesuré de la section précédente est conservé, seule la nouvelle est recalculée
+    assert set(app.session_state['section_timings']) == {sections[0], sections[2]}
+    temps = next(e for e in app.sidebar.expander if e.label == "⏱️ Temps de rendu par section")
+    assert any(m.value.startswith(f"{sections[1]}: non calculée") for m in temps.markdown)
+
+
+def test_onglets_calculent_toutes_les_sections(app):
+    app.toggle(key='lazy_sections').set_value(False).run()
+    assert not app.exception
+    sections = ["Vue d'ensemble", "Catégories en direct", "Analyse par catégorie", "Évolution et projections",
+                "Comparaison territoires"]
+    assert set(sections) <= {onglet.label for onglet in app.tabs}
+    assert set(app.session_state['section_timings']) == set(sections)
+
+
+def compteurs(app):
+    """(réutilisées, construites) affichés dans le panneau des temps de rendu"""
+    temps = next(e for e in app.sidebar.expander if e.label == "⏱️ Temps de rendu par section")
+    texte = next(m.value for m in temps.markdown if m.value.startswith("Cache figures"))
+    return tuple(int(n) for n in re.findall(r'(\d+) (?:réutilisées|construites)', texte))
+
+
+def test_reexecution_sans_reconstruction(app):
+    """Une réexécution sans changement de données ni de sélection reconstruit zéro figure"""
+    reutilisees, construites = compteurs(app)
+    app.run()
+    assert not app.exception
+    apres = compteurs(app)
+    assert apres[1] == construites and apres[0] > reutilisees
+
+
+def test_donnees_en_direct_modifiees_reconstruites(app):
+    """Une mise à jour en direct change la version des données : les figures concernées sont reconstruites"""
+    # Scénario propre au test : le cache de figures est partagé par toutes les sessions du processus
+    app.number_input(key='seed').set_value(4242).run()
+    _, construites = compteurs(app)
+    bouton = next(b for b in app.sidebar.button if b.label == "🔄 Mettre à jour les données")
+    bouton.click().run()
+    assert not app.exception
+    assert compteurs(app)[1] > construites
+
+
+def grille_des_pensions(app):
+    return next(d.value for d in app.dataframe if 'montant_mensuel_M' in d.value.columns)
+
+
+def choisir(app, libelle, valeur):
+    next(s for s in app.selectbox if s.label == libelle).set_value(valeur).run()
+    assert not app.exception
+
+
+def test_tableau_des_pensions_en_une_grille(app):
+    """Une seule grille filtrée et triée côté serveur, à la place d'une rangée de widgets par catégorie"""
+    app.radio(key='active_section').set_value("Catégories en direct").run()
+    assert not app.exception
+    grille = grille_des_pensions(app)
+    assert grille['montant_mensuel_M'].is_monotonic_decreasing
+    n_categories = len(grille)
+
+    choisir(app, "Performance:", "En croissance")
+    assert (grille_des_pensions(app)['variation_pct'] > 0).all()
+    choisir(app, "Trier par:", "Variation %")
+    assert grille_des_pensions(app)['variation_pct'].is_monotonic_decreasing
+
+    choisir(app, "Performance:", "Toutes")
+    assert len(grille_des_pensions(app)) == n_categories
+
+
+def test_classements_des_territoires(app):
+    app.radio(key='active_section').set_value("Comparaison territoires").run()
+    assert not app.exception
+    classements = [d.value for d in app.dataframe if 'rang' in d.value.columns]
+    assert len(classements) == 4
+    for classement in classements:
+        assert list(classement['rang']) == list(range(1, len(classement) + 1))
+        assert classement.iloc[:, 2].is_monotonic_decreasing
+
+
+def grille_paginee():
+    import pandas as pd
+    import streamlit as st
+    from Dashboard import RetraitesDashboard
+
+    tableau = pd.DataFrame({'ligne': range(250), 'variation': [(-1) ** i for i in range(250)]})
+    filtre = st.selectbox("Lignes:", ['Toutes', 'Paires'])
+    if filtre == 'Paires':
+        tableau = tableau[tableau['ligne'] % 2 == 0]
+    RetraitesDashboard().display_grid(tableau, key='grille', colorer=['variation'])
+
+
+def test_pagination_cote_serveur():
+    app = AppTest.from_function(grille_paginee, default_timeout=60)
+    app.run()
+    assert not app.exception
+    # Seule la page affichée est envoyée au navigateur
+    assert list(app.dataframe[0].value['ligne']) == list(range(100))
+    page = app.number_input(key='grille_page')
+    assert page.max == 3
+    page.set_value(3).run()
+    assert list(app.dataframe[0].value['ligne']) == list(range(200, 250))
+    assert "page 3/3" in app.caption[-1].value
+
+    # Après filtrage, la page mémorisée n'existe plus : retour à la première
+    app.selectbox[0].set_value('Paires').run()
+    assert not app.exception
+    assert list(app.dataframe[0].value['ligne']) == list(range(0, 200, 2))
+    assert app.number_input(key='grille_page').value == 1
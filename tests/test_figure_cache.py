@@ -0,0 +1,57 @@
+# test_figure_cache.py
+"""Cache des figures : réutilisation, nouvelle version des données, éviction LRU et borne en octets"""
+import plotly.graph_objects as go
+
+from Dashboard import FigureCache
+
+
+class Construction:
+    """Fabrique de figures qui compte ses appels"""
+
+    def __init__(self):
+        self.appels = 0
+
+    def __call__(self, valeurs=(1, 2, 3)):
+        self.appels += 1
+        return go.Figure(go.Scatter(y=list(valeurs)))
+
+
+def test_figure_reutilisee():
+    cache, construire = FigureCache(), Construction()
+    figure = cache.get_or_build(('evolution', 'REUNION', 1), construire)
+    assert cache.get_or_build(('evolution', 'REUNION', 1), construire) is figure
+    assert construire.appels == 1 and (cache.hits, cache.misses) == (1, 1)
+    assert cache.total_bytes == len(figure.to_json())
+
+
+def test_nouvelle_version_des_donnees_reconstruite():
+    """La version des données fait partie de la clé : des données modifiées invalident la figure"""
+    cache, construire = FigureCache(), Construction()
+    ancienne = cache.get_or_build(('evolution', 'REUNION', 1), construire)
+    nouvelle = cache.get_or_build(('evolution', 'REUNION', 2), lambda: construire((4, 5, 6)))
+    assert nouvelle is not ancienne and construire.appels == 2
+    assert list(nouvelle.data[0].y) == [4, 5, 6]
+
+
+def test_eviction_lru():
+    cache, construire = FigureCache(max_entries=2), Construction()
+    cache.get_or_build('a', construire)
+    cache.get_or_build('b', construire)
+    cache.get_or_build('a', construire)  # 'a' devient la plus récente
+    cache.get_or_build('c', construire)  # évince 'b'
+    assert construire.appels == 3
+    cache.get_or_build('a', construire)
+    assert construire.appels == 3
+    cache.get_or_build('b', construire)
+    assert construire.appels == 4
+
+
+def test_borne_en_octets():
+    cache = FigureCache(max_bytes=100)
+    for cle in 'abc':
+        cache.get_or_build(cle, Construction(), size_of=lambda _: 40)
+    assert cache.total_bytes == 80 and list(cache._entries) == ['b', 'c']
+    # Une entrée plus grosse que la borne est renvoyée mais pas conservée
+    figure = cache.get_or_build('d', Construction(), size_of=lambda _: 500)
+    assert figure is not None and cache.total_bytes == 0 and not cache._entries
+
@@ -0,0 +1,48 @@
+# test_historical_frame.py
+"""Générateur vectorisé de l'historique : reproductibilité et tirages par mois"""
+import pandas as pd
+import pytest
+
+from retraites_engine import (
+    HISTORICAL_DTYPES,
+    build_historical_frame,
+    get_categories_retraites,
+    validate_historical_frame
+)
+
+TERRITOIRE = 'REUNION'
+
+
+@pytest.fixture(scope='module')
+def categories():
+    return get_categories_retraites(TERRITOIRE)
+
+
+@pytest.fixture(scope='module')
+def historique(categories):
+    return build_historical_frame(TERRITOIRE, categories, seed=7, date_debut='2015-01-01')
+
+
+def test_schema(historique, categories):
+    validate_historical_frame(historique)
+    assert {colonne: str(dtype) for colonne, dtype in historique.dtypes.items()} == HISTORICAL_DTYPES
+    assert len(historique) == historique['date'].nunique() * len(categories)
+
+
+def test_meme_graine_memes_donnees(historique, categories):
+    pd.testing.assert_frame_equal(historique, build_historical_frame(TERRITOIRE, categories, 7, '2015-01-01'))
+
+
+def test_graines_et_territoires_independants(historique, categories):
+    autre_graine = build_historical_frame(TERRITOIRE, categories, 8, '2015-01-01')
+    assert not historique['montant_total_pensions'].equals(autre_graine['montant_total_pensions'])
+    autre_territoire = build_historical_frame('GUYANE', categories, 7, '2015-01-01')
+    assert not historique['montant_total_pensions'].equals(autre_territoire['montant_total_pensions'])
+
+
+@pytest.mark.parametrize('date_debut', ['2015-02-01', '2019-12-01', '2024-06-01'])
+def test_fin_avec_origine_identique_a_l_historique_complet(historique, categories, date_debut):
+    """Les derniers mois tirés seuls (origine antérieure) valent ceux de l'historique complet"""
+    fin = build_historical_frame(TERRITOIRE, categories, 7, date_debut, origine='2015-01-01')
+    attendu = historique[historique['date'] >= pd.Timestamp(date_debut)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(fin.reset_index(drop=True), attendu)
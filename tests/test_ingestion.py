@@ -0,0 +1,104 @@
+# test_ingestion.py
+"""Ingestion d'exports réels : agrégation mensuelle, lignes rejetées, fusion, fichiers invalides"""
+import io
+
+import pandas as pd
+import pytest
+
+import ingestion
+from ingestion import IngestionError, ingest_pension_file
+from parquet_store import ParquetTerritoryStore
+from retraites_engine import HISTORICAL_DTYPES, REAL_DATA_SCENARIO
+
+pytestmark = pytest.mark.skipif(not ParquetTerritoryStore.is_available(), reason="pyarrow non installé")
+
+EXPORT = """date,territoire,categorie,montant,nombre_beneficiaires
+2024-01-05,guadeloupe,retraite_generale,1000,2
+2024-01-20,GUADELOUPE,RETRAITE_GENERALE,500,1
+2024-01-10,GUADELOUPE,RETRAITE_AGRICOLE,300,1
+2024-02-03,GUADELOUPE,RETRAITE_GENERALE,1800,3
+2024-02-03,GUADELOUPE,CATEGORIE_INCONNUE,100,1
+2024-02-03,ATLANTIDE,RETRAITE_GENERALE,100,1
+pas-une-date,GUADELOUPE,RETRAITE_GENERALE,100,1
+2024-02-04,GUADELOUPE,RETRAITE_GENERALE,-5,1
+"""
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ParquetTerritoryStore(str(tmp_path))
+    monkeypatch.setattr(ingestion, 'parquet_store', store)
+    return store
+
+
+def ingerer(texte, **kwargs):
+    fichier = io.StringIO(texte)
+    fichier.name = 'export.csv'
+    return ingest_pension_file(fichier, **kwargs)
+
+
+def test_export_valide(store):
+    rapport = ingerer(EXPORT, chunksize=3)
+    assert rapport['territoires'] == ['GUADELOUPE']
+    assert rapport['lignes_lues'] == 8 and rapport['lignes_mensuelles'] == 3
+
+    historique = store.read_history('GUADELOUPE', REAL_DATA_SCENARIO)
+    assert list(historique.columns) == list(HISTORICAL_DTYPES)
+    generale = historique[historique['categorie'] == 'RETRAITE_GENERALE'].set_index('date')
+    assert generale['montant_total_pensions'].tolist() == [1500.0, 1800.0]
+    assert generale['nombre_beneficiaires'].tolist() == [3.0, 3.0]
+    assert generale['montant_moyen'].tolist() == [500.0, 600.0]
+    assert generale['evolution_mensuelle'].tolist() == pytest.approx([0.0, 20.0])
+    assert list(generale.index) == [pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-29')]
+
+
+def test_lignes_rejetees_comptees(store):
+    """Catégorie ou territoire inconnu, date illisible, montant négatif : 4 lignes écartées"""
+    assert ingerer(EXPORT)['lignes_rejetees'] == 4
+
+
+def test_fusion_avec_l_historique_existant(store):
+    ingerer(EXPORT)
+    # Nouvel export : février est remplacé, mars est ajouté, janvier est conservé
+    ingerer("date,territoire,categorie,montant\n"
+            "2024-02-10,GUADELOUPE,RETRAITE_GENERALE,900\n"
+            "2024-03-10,GUADELOUPE,RETRAITE_GENERALE,950\n")
+    historique = store.read_history('GUADELOUPE', REAL_DATA_SCENARIO)
+    generale = historique[historique['categorie'] == 'RETRAITE_GENERALE']
+    assert generale['montant_total_pensions'].tolist() == [1500.0, 900.0, 950.0]
+    assert historique['date'].is_monotonic_increasing
+    assert not historique.duplicated(subset=['date', 'categorie']).any()
+    assert len(historique[historique['categorie'] == 'RETRAITE_AGRICOLE']) == 1
+
+
+@pytest.mark.parametrize('contenu', [
+    "date,territoire,montant\n2024-01-05,GUADELOUPE,10\n",                  # colonne manquante
+    "",                                                                        # fichier vide
+    'date,territoire,categorie,montant\n"2024-01-05,GUADELOUPE,X,10\n',       # guillemet non fermé
+    "date,territoire,categorie,montant\n2024-01-05,ATLANTIDE,X,10\n",         # aucune ligne valide
+])
+def test_fichier_invalide(store, contenu):
+    with pytest.raises(IngestionError):
+        ingerer(contenu)
+    assert not store.has_history('GUADELOUPE', REAL_DATA_SCENARIO)
+
+
+def test_encodage_invalide(store):
+    fichier = io.BytesIO("date,territoire,categorie,montant\n2024-01-05,GUADELOUPE,é,10\n".encode('utf-16'))
+    fichier.name = 'export.csv'
+    with pytest.raises(IngestionError):
+        ingest_pension_file(fichier)
+
+
+def test_format_non_pris_en_charge(store):
+    fichier = io.BytesIO(b'{}')
+    fichier.name = 'export.json'
+    with pytest.raises(IngestionError):
+        ingest_pension_file(fichier)
+
+
+def test_echec_d_ecriture(store, monkeypatch):
+    monkeypatch.setattr(store, 'write_history', lambda *args: False)
+    with pytest.raises(IngestionError) as erreur:
+        ingerer(EXPORT)
+    assert erreur.value.territoires == []
@@ -0,0 +1,133 @@
+# test_instrumentation.py
+"""Instrumentation : durées, succès/défauts du cache, export Prometheus"""
+import re
+import socket
+import urllib.request
+
+import pytest
+
+import instrumentation
+from instrumentation import METRICS, Metrics, prometheus_text
+
+
+@pytest.fixture
+def active(monkeypatch):
+    """Instrumentation activée (les décorateurs lisent ENABLED à la décoration)"""
+    monkeypatch.setattr(instrumentation, 'ENABLED', True)
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def test_desactivee_fonction_d_origine(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'ENABLED', False)
+
+    def carre(x):
+        return x * x
+    assert instrumentation.timed()(carre) is carre
+
+
+def test_timed_cumule_les_appels(active):
+    @instrumentation.timed('calcul')
+    def calcul(x):
+        return x + 1
+
+    assert [calcul(x) for x in range(3)] == [1, 2, 3]
+    appels, total, maximum = METRICS.snapshot()[0]['calcul']
+    assert appels == 3 and 0 <= maximum <= total
+
+
+def test_timed_compte_un_appel_en_erreur(active):
+    @instrumentation.timed()
+    def echec():
+        raise RuntimeError
+    with pytest.raises(RuntimeError):
+        echec()
+    assert METRICS.snapshot()[0]['echec'][0] == 1
+
+
+def test_cache_data_succes_et_defauts(active):
+    calculs = []
+
+    @instrumentation.cache_data()
+    def double_instrumente(x):
+        calculs.append(x)
+        return 2 * x
+
+    @instrumentation.cache_data()
+    def parent_instrumente(x):
+        # Appel imbriqué : son défaut ne doit pas marquer le parent
+        return double_instrumente(x) + 1
+
+    double_instrumente.clear()
+    parent_instrumente.clear()
+    assert [double_instrumente(x) for x in (1, 1, 2, 1)] == [2, 2, 4, 2]
+    assert calculs == [1, 2]
+    assert METRICS.snapshot()[1]['double_instrumente'] == (2, 2)
+
+    assert parent_instrumente(5) == 11 and parent_instrumente(5) == 11
+    assert METRICS.snapshot()[1]['parent_instrumente'] == (1, 1)
+    assert METRICS.snapshot()[1]['double_instrumente'] == (2, 3)
+
+    double_instrumente.clear()
+    double_instrumente(1)
+    assert METRICS.snapshot()[1]['double_instrumente'] == (2, 4)
+
+
+def test_format_prometheus():
+    metrics = Metrics(max_sessions=2)
+    metrics.record('section "A"', 0.5)
+    metrics.record('section "A"', 1.5)
+    metrics.record_cache('generate_historical_data', succes=True)
+    metrics.record_cache('generate_historical_data', succes=False)
+    metrics.record_cache('generate_historical_data', succes=True)
+    for session in ('s1', 's2', 's3'):
+        metrics.record_session_memory(session, 1000)
+    texte = prometheus_text(metrics)
+
+    assert texte.endswith('\n')
+    lignes = texte.splitlines()
+    # Chaque métrique est précédée de ses lignes HELP et TYPE
+    types = {ligne.split()[2]: ligne.split()[3] for ligne in lignes if ligne.startswith('# TYPE')}
+    assert types == {
+        'retraites_duration_seconds': 'summary',
+        'retraites_duration_max_seconds': 'gauge',
+        'retraites_cache_hits_total': 'counter',
+        'retraites_cache_misses_total': 'counter',
+        'retraites_session_memory_bytes': 'gauge'
+    }
+    echantillon = re.compile(r'^[a-z_]+\{[a-z]+="(?:[^"\\]|\\.)*"\} -?[0-9.]+$')
+    assert all(echantillon.match(ligne) for ligne in lignes if not ligne.startswith('#'))
+
+    assert 'retraites_duration_seconds_sum{name="section \\"A\\""} 2.000000' in lignes
+    assert 'retraites_duration_seconds_count{name="section \\"A\\""} 2' in lignes
+    assert 'retraites_duration_max_seconds{name="section \\"A\\""} 1.500000' in lignes
+    assert 'retraites_cache_hits_total{function="generate_historical_data"} 2' in lignes
+    assert 'retraites_cache_misses_total{function="generate_historical_data"} 1' in lignes
+    # Seules les sessions les plus récentes sont conservées
+    sessions = [ligne for ligne in lignes if ligne.startswith('retraites_session_memory_bytes{')]
+    assert sessions == ['retraites_session_memory_bytes{session="s2"} 1000',
+                        'retraites_session_memory_bytes{session="s3"} 1000']
+
+
+def test_serveur_d_export(active):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    instrumentation.record('api/history', 0.25)
+    server = instrumentation.get_metrics_server(port)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as reponse:
+            assert reponse.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert 'retraites_duration_seconds_count{name="api/history"} 1' in reponse.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
+        instrumentation.get_metrics_server.clear()
+
+
+def test_serveur_d_export_desactive(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'ENABLED', False)
+    instrumentation.get_metrics_server.clear()
+    assert instrumentation.get_metrics_server(9999) is None
+    instrumentation.get_metrics_server.clear()
@@ -0,0 +1,78 @@
+# test_live_ticker.py
+"""Actualisation en arrière-plan : avance du stockage partagé, rattrapage en un lot, arrêt"""
+import time
+
+import pandas as pd
+
+from retraites_engine import LiveTicker, TerritoryDataStore, apply_live_ticks
+
+INTERVALLE = 0.02
+
+
+class RecordingStore:
+    """Stockage factice : note la taille de chaque lot de mises à jour"""
+
+    def __init__(self, pause_s=0.0):
+        self.lots = []
+        self.pause_s = pause_s
+
+    def advance_live(self, n_ticks=1):
+        self.lots.append(n_ticks)
+        if len(self.lots) == 1:
+            time.sleep(self.pause_s)  # premier lot lent : le fil prend du retard
+
+
+def attendre(condition, delai_s=5):
+    fin = time.monotonic() + delai_s
+    while not condition() and time.monotonic() < fin:
+        time.sleep(INTERVALLE / 2)
+    return condition()
+
+
+def test_avance_a_intervalle_regulier():
+    store = RecordingStore()
+    ticker = LiveTicker(store, interval=INTERVALLE)
+    try:
+        assert attendre(lambda: sum(store.lots) >= 3)
+    finally:
+        ticker.stop()
+    ticker._thread.join(1)
+    assert not ticker._thread.is_alive()
+    assert sum(store.lots) == ticker.ticks
+
+
+def test_retard_rattrape_en_un_lot():
+    store = RecordingStore(pause_s=10 * INTERVALLE)
+    ticker = LiveTicker(store, interval=INTERVALLE)
+    try:
+        assert attendre(lambda: len(store.lots) >= 2)
+    finally:
+        ticker.stop()
+    # Les intervalles manqués pendant le premier lot sont appliqués ensemble
+    assert store.lots[0] == 1 and store.lots[1] >= 5
+
+
+def test_arret_sans_nouvelle_mise_a_jour():
+    store = RecordingStore()
+    ticker = LiveTicker(store, interval=INTERVALLE)
+    ticker.stop()
+    ticker._thread.join(1)
+    lots = list(store.lots)
+    time.sleep(5 * INTERVALLE)
+    assert store.lots == lots
+
+
+def test_etat_partage_avance_pour_toutes_les_sessions():
+    """Le fil avance l'état en direct du stockage partagé, lu tel quel par chaque session"""
+    store = TerritoryDataStore()
+    depart = store.get('STMARTIN', 6)
+    ticker = LiveTicker(store, interval=INTERVALLE)
+    try:
+        assert attendre(lambda: store.get('STMARTIN', 6)['live_ticks'] >= 2)
+    finally:
+        ticker.stop()
+        ticker._thread.join(1)
+    entry = store.get('STMARTIN', 6)
+    attendu = apply_live_ticks(depart['current_data'], 'STMARTIN', 6, 0, entry['live_ticks'])
+    pd.testing.assert_frame_equal(entry['live_data'], attendu)
+    assert depart['live_ticks'] == 0  # l'entrée lue avant n'a pas été modifiée en place
@@ -0,0 +1,38 @@
+# test_live_ticks.py
+"""Mises à jour en direct : un lot de n mises à jour vaut n mises à jour successives"""
+import pandas as pd
+import pytest
+
+from retraites_engine import apply_live_ticks, build_current_frame, build_historical_frame, get_categories_retraites
+
+TERRITOIRE = 'MARTINIQUE'
+SEED = 11
+
+
+@pytest.fixture(scope='module')
+def courant():
+    categories = get_categories_retraites(TERRITOIRE)
+    historique = build_historical_frame(TERRITOIRE, categories, SEED, '2023-01-01')
+    return build_current_frame(TERRITOIRE, categories, historique, SEED)
+
+
+@pytest.mark.parametrize('n_ticks', [1, 5, 40])
+def test_lot_identique_aux_appels_successifs(courant, n_ticks):
+    successifs = courant
+    for tick in range(n_ticks):
+        successifs = apply_live_ticks(successifs, TERRITOIRE, SEED, tick, 1)
+    lot = apply_live_ticks(courant, TERRITOIRE, SEED, 0, n_ticks)
+    pd.testing.assert_frame_equal(lot, successifs, check_exact=False, rtol=1e-12)
+
+
+def test_reprise_apres_un_premier_lot(courant):
+    """Deux lots consécutifs (3 puis 4) valent un lot de 7"""
+    deux_lots = apply_live_ticks(apply_live_ticks(courant, TERRITOIRE, SEED, 0, 3), TERRITOIRE, SEED, 3, 4)
+    pd.testing.assert_frame_equal(deux_lots, apply_live_ticks(courant, TERRITOIRE, SEED, 0, 7),
+                                  check_exact=False, rtol=1e-12)
+
+
+def test_donnees_d_origine_non_modifiees(courant):
+    copie = courant.copy()
+    apply_live_ticks(courant, TERRITOIRE, SEED, 0, 10)
+    pd.testing.assert_frame_equal(courant, copie)
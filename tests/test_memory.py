@@ -0,0 +1,63 @@
+# test_memory.py
+"""Schéma compact de l'historique : octets par ligne et rapport mémoire"""
+import numpy as np
+import pytest
+
+from retraites_engine import (
+    TerritoryDataStore,
+    build_historical_frame,
+    dataframe_memory_bytes,
+    get_categories_retraites,
+    memory_report
+)
+
+TERRITOIRE = 'POLYNESIE'
+
+
+@pytest.fixture(scope='module')
+def historique():
+    return build_historical_frame(TERRITOIRE, get_categories_retraites(TERRITOIRE), 3, '2015-01-01')
+
+
+def ancien_schema(historique):
+    """Chaînes répétées sur chaque ligne, float64 partout et colonne territoire"""
+    ancien = historique.astype({'categorie': object, 'categorie_principale': object, 'nombre_beneficiaires': 'float64',
+                                'montant_moyen': 'float64', 'evolution_mensuelle': 'float64'})
+    ancien.insert(1, 'territoire', TERRITOIRE)
+    return ancien
+
+
+def test_octets_par_ligne(historique):
+    # date et montant total sur 8 octets, trois float32, deux codes de catégorie sur 1 octet,
+    # plus les dictionnaires des catégories (stockés une fois par trame)
+    minimum = 8 + 8 + 3 * 4 + 2 * 1
+    assert minimum <= memory_report(historique).loc['TOTAL', 'octets_par_ligne'] < minimum + 2
+    assert 'territoire' not in historique.columns
+    assert dataframe_memory_bytes(ancien_schema(historique)) > 5 * dataframe_memory_bytes(historique)
+
+
+def test_precision_float32_suffisante(historique):
+    """montant_moyen en float32 : écart relatif au calcul en float64 sous 1e-6"""
+    exact = historique['montant_total_pensions'] / historique['nombre_beneficiaires'].astype('float64')
+    ecart = np.abs(historique['montant_moyen'].astype('float64') - exact) / exact
+    assert ecart.max() < 1e-6
+
+
+def test_rapport_memoire(historique):
+    rapport = memory_report(historique)
+    assert list(rapport.index) == [*historique.columns, 'TOTAL']
+    assert rapport.loc['categorie', 'dtype'] == 'category'
+    assert rapport.loc['nombre_beneficiaires', 'dtype'] == 'float32'
+    assert rapport.loc['TOTAL', 'octets'] == rapport['octets'].iloc[:-1].sum()
+    assert rapport.loc['TOTAL', 'octets'] == historique.memory_usage(deep=True, index=False).sum()
+
+
+def test_memoire_du_stockage_partage():
+    store = TerritoryDataStore()
+    entry = store.get('CALEDONIE', 5)
+    attendu = dataframe_memory_bytes(entry['historical_data'], entry['current_data'], entry['age_data'])
+    assert store.memory_bytes() == attendu
+    store.advance_live(1)
+    # L'état en direct, distinct de l'instantané après une mise à jour, est compté en plus
+    entry = store.get('CALEDONIE', 5)
+    assert store.memory_bytes() == attendu + dataframe_memory_bytes(entry['live_data'])
@@ -0,0 +1,139 @@
+# test_parquet_store.py
+"""Stockage Parquet/Arrow : fichiers temporaires ignorés, remplacement atomique, lectures élaguées"""
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from api import DataApi
+from parquet_store import ParquetTerritoryStore
+from retraites_engine import (
+    REAL_DATA_SCENARIO,
+    TerritoryDataStore,
+    build_historical_frame,
+    generate_historical_data,
+    get_categories_retraites,
+    parquet_store
+)
+
+pytestmark = pytest.mark.skipif(not ParquetTerritoryStore.is_available(), reason="pyarrow non installé")
+
+TERRITOIRE = 'MARTINIQUE'
+
+
+@pytest.fixture(scope='module')
+def historique():
+    return build_historical_frame(TERRITOIRE, get_categories_retraites(TERRITOIRE), 2, '2020-01-01')
+
+
+@pytest.fixture
+def store(tmp_path, historique):
+    store = ParquetTerritoryStore(str(tmp_path))
+    assert store.write_history(TERRITOIRE, 2, historique)
+    return store
+
+
+def test_aller_retour(store, historique):
+    pd.testing.assert_frame_equal(store.read_history(TERRITOIRE, 2), historique)
+    assert store.last_history_date(TERRITOIRE, 2) == historique['date'].iloc[-1]
+
+
+def test_fichier_temporaire_ignore(store, historique):
+    """Un fichier temporaire laissé par une écriture interrompue n'est pas lu comme donnée"""
+    annee_dir = os.path.join(store._history_dir(TERRITOIRE, 2), 'annee=2021')
+    with open(os.path.join(annee_dir, '.part-0.parquet.1234.tmp'), 'wb') as fichier:
+        fichier.write(b'ecriture interrompue')
+    assert len(store.read_history(TERRITOIRE, 2)) == len(historique)
+
+
+def test_reecriture_complete_sans_residu(store, historique):
+    recent = historique[historique['date'] >= '2023-01-01'].reset_index(drop=True)
+    assert store.write_history(TERRITOIRE, 2, recent)
+    pd.testing.assert_frame_equal(store.read_history(TERRITOIRE, 2), recent)
+    scenario_dir = os.path.dirname(store._history_dir(TERRITOIRE, 2))
+    assert os.listdir(scenario_dir) == [f'territoire={TERRITOIRE}']
+
+
+def test_ajout_ne_reecrit_que_les_annees_concernees(store, historique):
+    anciens = historique[historique['date'] < historique['date'].iloc[-1]]
+    nouveaux = historique[historique['date'] == historique['date'].iloc[-1]]
+    store.write_history(TERRITOIRE, 2, anciens)
+    territoire_dir = store._history_dir(TERRITOIRE, 2)
+    avant = {nom: os.stat(os.path.join(territoire_dir, nom, 'part-0.parquet')).st_mtime_ns
+             for nom in os.listdir(territoire_dir)}
+    assert store.append_history(TERRITOIRE, 2, nouveaux)
+    annee_modifiee = f"annee={nouveaux['date'].iloc[0].year}"
+    for nom, mtime in avant.items():
+        if nom != annee_modifiee:
+            assert os.stat(os.path.join(territoire_dir, nom, 'part-0.parquet')).st_mtime_ns == mtime
+    pd.testing.assert_frame_equal(store.read_history(TERRITOIRE, 2), historique)
+
+
+def test_lecture_elaguee(store, historique):
+    lu = store.read_history(TERRITOIRE, 2, columns=['date', 'montant_total_pensions'],
+                            date_debut='2021-03-01', date_fin='2021-05-31')
+    attendu = historique.loc[historique['date'].between('2021-03-01', '2021-05-31'),
+                             ['date', 'montant_total_pensions']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(lu, attendu)
+
+
+def test_api_lit_l_historique_sur_disque_sans_charger_le_territoire():
+    generate_historical_data('STPIERRE', 9)  # historique persisté dans RETRAITES_DATA_DIR
+    store = TerritoryDataStore()
+    statut, _, corps = DataApi(store=store).handle('/territories/STPIERRE/history',
+                                                   'seed=9&columns=date,categorie&start=2024-01&end=2024-02')
+    corps = json.loads(corps)
+    assert statut == 200 and corps['meta']['colonnes'] == ['date', 'categorie']
+    assert {ligne['date'][:7] for ligne in corps['donnees']} == {'2024-01', '2024-02'}
+    assert ('STPIERRE', 9) not in store
+
+
+def test_ajout_repete_sans_doublon(store, historique):
+    """Le même passage de mois traité deux fois (autre processus, autre session) ne duplique rien"""
+    anciens = historique[historique['date'] < '2024-11-01']
+    nouveaux = historique[historique['date'] >= '2024-11-01']
+    store.write_history(TERRITOIRE, 2, anciens)
+    assert store.append_history(TERRITOIRE, 2, nouveaux)
+    assert store.append_history(TERRITOIRE, 2, nouveaux)
+    lu = store.read_history(TERRITOIRE, 2)
+    assert len(lu) == len(historique)
+    assert not lu.duplicated(subset=['date', 'categorie']).any()
+    pd.testing.assert_frame_equal(lu, historique)
+
+
+def test_ajouts_concurrents_sans_doublon(store, historique):
+    """Des écrivains concurrents sur un même territoire sont sérialisés"""
+    anciens = historique[historique['date'] < '2024-01-01']
+    nouveaux = historique[historique['date'] >= '2024-01-01']
+    store.write_history(TERRITOIRE, 2, anciens)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert all(pool.map(lambda _: store.append_history(TERRITOIRE, 2, nouveaux), range(8)))
+    pd.testing.assert_frame_equal(store.read_history(TERRITOIRE, 2), historique)
+    annee_dir = os.path.join(store._history_dir(TERRITOIRE, 2), 'annee=2024')
+    assert os.listdir(annee_dir) == ['part-0.parquet']
+
+
+def test_etag_change_quand_le_disque_change():
+    """Un mois réécrit ou un export réel ingéré, à dernière date inchangée, n'est pas servi en 304"""
+    historique = generate_historical_data('WALLIS', 12)
+    api = DataApi(store=TerritoryDataStore())
+    chemin, query = '/territories/WALLIS/history', 'seed=12&columns=date,categorie,montant_total_pensions'
+    _, entetes, _ = api.handle(chemin, query)
+
+    dernier_mois = historique[historique['date'] == historique['date'].iloc[-1]].copy()
+    dernier_mois['montant_total_pensions'] *= 2
+    assert parquet_store.append_history('WALLIS', 12, dernier_mois)
+    statut, reecrit, corps = api.handle(chemin, query, if_none_match=entetes['ETag'])
+    assert statut == 200 and reecrit['ETag'] != entetes['ETag']
+    montants = {ligne['montant_total_pensions'] for ligne in json.loads(corps)['donnees']}
+    assert set(dernier_mois['montant_total_pensions']) <= montants
+
+    assert parquet_store.write_history('WALLIS', REAL_DATA_SCENARIO, historique)
+    try:
+        statut, reel, _ = api.handle(chemin, query, if_none_match=reecrit['ETag'])
+        assert statut == 200 and reel['ETag'] != reecrit['ETag']
+    finally:
+        shutil.rmtree(parquet_store._history_dir('WALLIS', REAL_DATA_SCENARIO))
@@ -0,0 +1,70 @@
+# test_pension_simulator.py
+"""Simulateur par lot : même résultat que la formule individuelle du dashboard"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pension_simulator import SimulationError, simulate_pension_file, simulate_pensions
+
+
+def pension_individuelle(salaire_moyen, trimestres_valides, type_calcul):
+    """Formule d'origine du simulateur du dashboard, une carrière à la fois"""
+    if type_calcul == "Taux plein":
+        taux = 0.5
+    elif type_calcul == "Taux réduit":
+        taux = 0.4
+    else:  # Décote
+        taux = max(0.375, 0.5 - (0.625 * max(0, 162 - trimestres_valides) / 162))
+    return salaire_moyen * taux
+
+
+@pytest.fixture(scope='module')
+def carrieres():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    return pd.DataFrame({
+        'salaire_moyen': rng.uniform(1_000, 5_000, n),
+        'trimestres_valides': rng.integers(60, 200, n),
+        'age_depart': rng.integers(60, 70, n),
+        'categorie': rng.choice(['RETRAITE_GENERALE', 'RETRAITE_AGRICOLE'], n),
+        'type_calcul': rng.choice(['Taux plein', 'Taux réduit', 'Décote'], n)
+    })
+
+
+def test_identique_a_la_formule_individuelle(carrieres):
+    resultat = simulate_pensions(carrieres)
+    attendu = [pension_individuelle(ligne.salaire_moyen, ligne.trimestres_valides, ligne.type_calcul)
+               for ligne in carrieres.itertuples()]
+    np.testing.assert_allclose(resultat['pension_mensuelle'], attendu, rtol=1e-12)
+    np.testing.assert_allclose(resultat['pension_annuelle'], resultat['pension_mensuelle'] * 12)
+
+
+def test_sans_type_de_calcul_decote_puis_taux_plein(carrieres):
+    """Sans type imposé : décote avant l'âge du taux plein, taux plein à partir de 67 ans"""
+    resultat = simulate_pensions(carrieres.drop(columns='type_calcul'))
+    attendu = [pension_individuelle(ligne.salaire_moyen, ligne.trimestres_valides,
+                                    'Taux plein' if ligne.age_depart >= 67 else 'Décote')
+               for ligne in carrieres.itertuples()]
+    np.testing.assert_allclose(resultat['pension_mensuelle'], attendu, rtol=1e-12)
+
+
+def test_colonnes_manquantes():
+    with pytest.raises(SimulationError):
+        simulate_pensions(pd.DataFrame({'salaire_moyen': [2_000.0]}))
+
+
+def test_fichier_par_blocs_identique_au_calcul_en_memoire(carrieres):
+    source = io.StringIO(carrieres.to_csv(index=False) + 'abc,100,62,RETRAITE_GENERALE,\n')
+    destination = io.BytesIO()
+    rapport = simulate_pension_file(source, destination, chunksize=300)
+    assert (rapport['lignes_lues'], rapport['lignes_rejetees'], rapport['lignes_ecrites']) == (2_001, 1, 2_000)
+
+    ecrit = pd.read_csv(io.BytesIO(destination.getvalue()))
+    np.testing.assert_allclose(ecrit['pension_mensuelle'], simulate_pensions(carrieres)['pension_mensuelle'],
+                               atol=0.005)
+    synthese = rapport['synthese'].set_index('categorie')
+    assert synthese['effectif'].sum() == 2_000
+    assert synthese['pension_mensuelle_totale'].sum() == pytest.approx(
+        simulate_pensions(carrieres)['pension_mensuelle'].sum())
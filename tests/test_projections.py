@@ -0,0 +1,77 @@
+# test_projections.py
+"""Projections démographiques : formule vectorisée, scénarios et bandes Monte Carlo"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from projections import (
+    PERCENTILES,
+    project_demography,
+    projection_frame,
+    scenario_parameters,
+    simulate_projection_bands
+)
+from retraites_engine import generate_age_data
+
+HORIZON = 10
+
+
+@pytest.fixture(scope='module')
+def age_data():
+    return generate_age_data('REUNION')
+
+
+def test_projection_identique_au_calcul_annee_par_annee(age_data):
+    projection = project_demography(age_data, horizon=HORIZON)
+    effectifs = age_data['nombre_beneficiaires'].to_numpy(dtype=float)
+    pensions = age_data['montant_moyen'].to_numpy(dtype=float)
+    for annee in range(HORIZON + 1):
+        np.testing.assert_allclose(projection['population'][0, annee], effectifs, rtol=1e-12)
+        np.testing.assert_allclose(projection['montants_annuels'][0, annee], effectifs * pensions * 12, rtol=1e-12)
+        effectifs = effectifs * (1 + age_data['croissance'].to_numpy()) * (1 - age_data['mortalite'].to_numpy())
+        pensions = pensions * (1 + age_data['revalorisation'].to_numpy())
+
+
+def test_scenarios_independants(age_data):
+    """Chaque scénario d'un lot vaut la projection de ce scénario seul"""
+    revalorisations = np.array([[0.0], [0.01], [0.03]])
+    lot = project_demography(age_data, scenario_parameters(age_data, 3, revalorisation=revalorisations), HORIZON)
+    for indice, revalorisation in enumerate(revalorisations[:, 0]):
+        seul = project_demography(age_data, scenario_parameters(age_data, revalorisation=revalorisation), HORIZON)
+        np.testing.assert_allclose(lot['montants_annuels'][indice], seul['montants_annuels'][0], rtol=1e-12)
+
+
+def test_recalage_sur_le_montant_courant(age_data):
+    frame = projection_frame(age_data, horizon=HORIZON, montant_annuel_actuel=1e9, annee_debut=2030)
+    assert frame['montant_total_pensions'].iloc[0] == pytest.approx(1e9)
+    assert list(frame['année']) == list(range(2030, 2030 + HORIZON + 1))
+
+
+def bandes(age_data, **kwargs):
+    return simulate_projection_bands(age_data, n_paths=3_000, horizon=HORIZON, annee_debut=2030, **kwargs)[0]
+
+
+def test_bandes_ordonnees_et_centrees(age_data):
+    resultat = bandes(age_data, seed=1, territory_code='REUNION')
+    for indicateur in ['population_65_plus', 'montant_total_pensions']:
+        p5, p50, p95 = (resultat[f'{indicateur}_p{p}'] for p in PERCENTILES)
+        assert (p5 <= p50).all() and (p50 <= p95).all()
+    # Année 0 : données actuelles, sans incertitude
+    deterministe = projection_frame(age_data, horizon=HORIZON)
+    assert resultat['population_65_plus_p50'].iloc[0] == pytest.approx(deterministe['population_65_plus'].iloc[0])
+
+
+def test_bandes_independantes_de_l_execution(age_data):
+    """Même résultat en séquentiel et avec des blocs répartis sur un pool (ordre quelconque)"""
+    sequentiel = bandes(age_data, seed=1, territory_code='REUNION', chunk_size=500)
+    with ThreadPoolExecutor(3) as pool:
+        reparti = bandes(age_data, seed=1, territory_code='REUNION', chunk_size=500, executor=pool)
+    pd.testing.assert_frame_equal(sequentiel, reparti)
+
+
+def test_bandes_propres_au_territoire(age_data):
+    reunion = bandes(age_data, seed=1, territory_code='REUNION')
+    guyane = bandes(age_data, seed=1, territory_code='GUYANE')
+    assert not reunion['montant_total_pensions_p95'].equals(guyane['montant_total_pensions_p95'])
@@ -0,0 +1,186 @@
+# test_providers.py
+"""Sources distantes : connexions persistantes, erreurs de protocole et cache stale-while-revalidate"""
+import asyncio
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+from api import DataApi, create_server
+from providers import (
+    DEFAULT_SOURCE,
+    ConnectionPool,
+    HttpTerritoryProvider,
+    ProviderError,
+    ProviderRuntime,
+    ProviderSet
+)
+from retraites_engine import TerritoryDataStore, load_territory_frames
+
+
+async def start_stub(reponse):
+    """Serveur HTTP minimal : renvoie `reponse` à chaque requête, compte les connexions"""
+    connexions = []
+
+    async def handler(reader, writer):
+        connexions.append(writer)
+        try:
+            while True:
+                await reader.readuntil(b'\r\n\r\n')
+                writer.write(reponse)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1], connexions
+
+
+def test_connexion_reutilisee():
+    async def scenario():
+        server, port, connexions = await start_stub(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+        pool = ConnectionPool('127.0.0.1', port, max_connections=2)
+        reponses = [await pool.request('/a') for _ in range(5)]
+        pool.close()
+        server.close()
+        return reponses, pool.ouvertes, len(connexions)
+
+    reponses, ouvertes, connexions = asyncio.run(scenario())
+    assert all(statut == 200 and corps == b'ok' for statut, _, corps in reponses)
+    assert ouvertes == connexions == 1
+
+
+def test_ligne_de_statut_invalide():
+    async def scenario():
+        server, port, connexions = await start_stub(b'pas du HTTP\r\n\r\n')
+        sources = {'REUNION': {**DEFAULT_SOURCE, 'url': f'http://127.0.0.1:{port}', 'tentatives': 2}}
+        providers = ProviderSet(sources)
+        try:
+            with pytest.raises(ProviderError, match='2 tentatives'):
+                await providers.get('REUNION')
+        finally:
+            providers.close()
+            server.close()
+    asyncio.run(scenario())
+
+
+class FakeProvider:
+    """Source factice : chaque appel renvoie un nouveau numéro de version"""
+    nom = 'factice'
+    timeout_s = 1.0
+    tentatives = 1
+
+    def __init__(self, duree=0.0):
+        self.appels = 0
+        self.duree = duree
+
+    async def fetch(self, territory_code, seed):
+        self.appels += 1
+        await asyncio.sleep(self.duree)
+        return {'version': self.appels}
+
+
+def provider_set(fraicheur_s, perime_max_s, duree=0.0):
+    providers = ProviderSet({}, fraicheur_s, perime_max_s)
+    providers.providers['REUNION'] = FakeProvider(duree)
+    return providers
+
+
+def test_swr_frais_puis_perime():
+    async def scenario():
+        providers = provider_set(fraicheur_s=0.05, perime_max_s=10)
+        source = providers.providers['REUNION']
+        assert (await providers.get('REUNION'))['version'] == 1
+        assert (await providers.get('REUNION'))['version'] == 1 and source.appels == 1
+        await asyncio.sleep(0.06)
+        # Périmé mais utilisable : ancienne valeur servie aussitôt, rafraîchissement en arrière-plan
+        assert (await providers.get('REUNION'))['version'] == 1
+        await asyncio.sleep(0.01)
+        assert source.appels == 2
+        assert (await providers.get('REUNION'))['version'] == 2
+    asyncio.run(scenario())
+
+
+def test_swr_trop_ancien_attend_la_source():
+    async def scenario():
+        providers = provider_set(fraicheur_s=0.0, perime_max_s=0.02)
+        await providers.get('REUNION')
+        await asyncio.sleep(0.03)
+        assert (await providers.get('REUNION'))['version'] == 2
+    asyncio.run(scenario())
+
+
+def test_appels_concurrents_une_seule_requete():
+    async def scenario():
+        providers = provider_set(fraicheur_s=60, perime_max_s=60, duree=0.05)
+        resultats = await asyncio.gather(*(providers.get('REUNION') for _ in range(5)))
+        return resultats, providers.providers['REUNION'].appels
+
+    resultats, appels = asyncio.run(scenario())
+    assert appels == 1 and all(resultat is resultats[0] for resultat in resultats)
+
+
+def test_chargement_depuis_l_api_du_dashboard():
+    """Aller-retour complet : la caisse régionale est l'API de ce dépôt"""
+    server = create_server(0, api=DataApi(store=TerritoryDataStore()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    runtime = ProviderRuntime({'sources': {'GUYANE': {**DEFAULT_SOURCE, 'url': url}},
+                               'fraicheur_s': 60, 'perime_max_s': 600})
+    try:
+        frames = runtime.load('GUYANE', 3)
+        attendu = load_territory_frames('GUYANE', 3)
+        for cle in ('historical_data', 'current_data', 'age_data'):
+            pd.testing.assert_frame_equal(frames[cle], attendu[cle])
+        assert frames['donnees_reelles']
+
+        # Données réelles : pas de mises à jour simulées dans le stockage partagé
+        store = TerritoryDataStore(loader=runtime.load)
+        store.get('GUYANE', 3)
+        store.advance_live(3)
+        assert store.get('GUYANE', 3)['live_ticks'] == 0
+    finally:
+        runtime.close()
+        server.shutdown()
+        server.server_close()
+
+
+def provider_api_modifiee(modifier):
+    """Source dont les réponses sont celles de l'API locale, modifiées par modifier(chemin, lignes)"""
+    api = DataApi(store=TerritoryDataStore())
+    provider = HttpTerritoryProvider('http://127.0.0.1:1', 'caisse test')
+
+    async def get_json(chemin):
+        chemin, _, query = chemin.partition('?')
+        corps = json.loads(api.handle(chemin, query)[2])
+        modifier(chemin, corps['donnees'])
+        return corps
+    provider._get_json = get_json
+    return provider
+
+
+@pytest.mark.parametrize('ressource, modification', [
+    ('current', lambda ligne: ligne.pop('montant_mensuel')),
+    ('current', lambda ligne: ligne.update(variation_pct='n/a')),
+    ('age', lambda ligne: ligne.update(Tranche_Age=ligne.pop('tranche_age'))),
+    ('age', lambda ligne: ligne.update(croissance=None)),
+    ('history', lambda ligne: ligne.pop('evolution_mensuelle')),
+])
+def test_reponse_mal_formee_rejetee(ressource, modification):
+    """Colonne absente, mal nommée ou non numérique : ProviderError, pas une KeyError au rendu"""
+    def modifier(chemin, lignes):
+        if chemin.endswith('/' + ressource):
+            for ligne in lignes:
+                modification(ligne)
+
+    provider = provider_api_modifiee(modifier)
+    with pytest.raises(ProviderError, match='invalide'):
+        asyncio.run(provider.fetch('MAYOTTE', 4))
+
+
+def test_reponse_conforme_acceptee():
+    frames = asyncio.run(provider_api_modifiee(lambda chemin, lignes: None).fetch('MAYOTTE', 4))
+    attendu = load_territory_frames('MAYOTTE', 4)
+    pd.testing.assert_frame_equal(frames['current_data'], attendu['current_data'])
+    pd.testing.assert_frame_equal(frames['age_data'], attendu['age_data'])
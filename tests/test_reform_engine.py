@@ -0,0 +1,53 @@
+# test_reform_engine.py
+"""Moteur de réformes : le recalcul des seules cohortes touchées vaut un recalcul complet"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pension_simulator import REFERENCE_RULES, compute_rates
+from reform_engine import ESPERANCE_VIE, REFORM_PRESETS, ReformEngine, generate_synthetic_careers
+
+
+@pytest.fixture(scope='module')
+def engine():
+    careers = pd.concat([generate_synthetic_careers(code, seed=4) for code in ['REUNION', 'MAYOTTE']],
+                        ignore_index=True)
+    return ReformEngine.from_careers(careers)
+
+
+def couts_complets(cohorts, regles):
+    """Coûts par territoire en recalculant toutes les cohortes"""
+    age_effectif = np.maximum(cohorts['age_depart'].to_numpy(dtype=float), regles['age_legal'])
+    taux = compute_rates(cohorts['trimestres_valides'], age_effectif, regles=regles)
+    pension = cohorts['masse_salariale'].to_numpy() * taux
+    couts = pd.DataFrame({'territoire': cohorts['territoire'], 'cout_annuel': pension * 12,
+                          'cout_viager': pension * 12 * np.maximum(0, ESPERANCE_VIE - age_effectif)})
+    return couts.groupby('territoire').sum()
+
+
+REGLES = [{'age_legal': 64}, {'trimestres_requis': 172}, {'coefficient_decote': 0.5, 'age_taux_plein': 66},
+          *(preset['regles'] for preset in REFORM_PRESETS.values())]
+
+
+@pytest.mark.parametrize('changements', REGLES)
+def test_identique_au_recalcul_complet(engine, changements):
+    tableau, informations = engine.simulate(**changements)
+    tableau = tableau.set_index('territoire')
+    reference = couts_complets(engine.cohorts, REFERENCE_RULES)
+    reforme = couts_complets(engine.cohorts, {**REFERENCE_RULES, **changements})
+    np.testing.assert_allclose(tableau['cout_annuel_reference'], reference['cout_annuel'], rtol=1e-9)
+    np.testing.assert_allclose(tableau['cout_annuel_reforme'], reforme['cout_annuel'], rtol=1e-9)
+    np.testing.assert_allclose(tableau['cout_viager_reforme'], reforme['cout_viager'], rtol=1e-9)
+    assert informations['cohortes_recalculees'] <= informations['cohortes_total']
+
+
+def test_regles_de_reference_sans_ecart(engine):
+    tableau, informations = engine.simulate()
+    assert informations['cohortes_recalculees'] == 0
+    np.testing.assert_allclose(tableau['ecart_viager_pct'], 0, atol=1e-9)
+
+
+def test_resultat_en_cache(engine):
+    premier, _ = engine.simulate(age_legal=63)
+    second, informations = engine.simulate(age_legal=63)
+    assert informations['cache'] and second is premier
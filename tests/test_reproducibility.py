@@ -0,0 +1,80 @@
+# test_reproducibility.py
+"""Génération reproductible : mêmes données pour une même graine, dans tout processus"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from retraites_engine import (
+    RANDOM_STREAMS,
+    apply_live_ticks,
+    build_current_frame,
+    build_historical_frame,
+    get_categories_retraites,
+    get_rng
+)
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TERRITOIRE = 'GUADELOUPE'
+
+# Empreinte des trames générées pour une graine, calculée dans ce processus ou dans un autre
+EMPREINTE = """
+import pandas as pd
+from retraites_engine import apply_live_ticks, build_current_frame, build_historical_frame, get_categories_retraites
+
+def empreinte(territory_code, seed):
+    categories = get_categories_retraites(territory_code)
+    historique = build_historical_frame(territory_code, categories, seed, '2020-01-01')
+    courant = build_current_frame(territory_code, categories, historique, seed)
+    direct = apply_live_ticks(courant, territory_code, seed, 0, 5)
+    return [int(pd.util.hash_pandas_object(frame, index=False).sum()) for frame in (historique, courant, direct)]
+"""
+
+
+def empreinte(territory_code, seed):
+    espace = {}
+    exec(EMPREINTE, espace)
+    return espace['empreinte'](territory_code, seed)
+
+
+def test_get_rng_reproductible():
+    assert np.array_equal(get_rng(TERRITOIRE, 3, 'live', 4).random(8), get_rng(TERRITOIRE, 3, 'live', 4).random(8))
+
+
+@pytest.mark.parametrize('autre', [
+    ('MARTINIQUE', 3, 'live', 4),   # autre territoire
+    (TERRITOIRE, 4, 'live', 4),     # autre graine
+    (TERRITOIRE, 3, 'courant', 4),  # autre flux
+    (TERRITOIRE, 3, 'live', 5),     # autre compteur (mise à jour suivante)
+])
+def test_flux_independants(autre):
+    assert not np.array_equal(get_rng(TERRITOIRE, 3, 'live', 4).random(8), get_rng(*autre).random(8))
+
+
+def test_flux_declares():
+    assert len(set(RANDOM_STREAMS.values())) == len(RANDOM_STREAMS)
+    with pytest.raises(KeyError):
+        get_rng(TERRITOIRE, 3, 'inconnu')
+
+
+def test_donnees_courantes_et_en_direct_reproductibles():
+    categories = get_categories_retraites(TERRITOIRE)
+    historique = build_historical_frame(TERRITOIRE, categories, 5, '2020-01-01')
+    courant = build_current_frame(TERRITOIRE, categories, historique, 5)
+    pd.testing.assert_frame_equal(courant, build_current_frame(TERRITOIRE, categories, historique, 5))
+    autre_graine = build_current_frame(TERRITOIRE, categories, historique, 6)
+    assert not courant['montant_mensuel'].equals(autre_graine['montant_mensuel'])
+    pd.testing.assert_frame_equal(apply_live_ticks(courant, TERRITOIRE, 5, 2, 3),
+                                  apply_live_ticks(courant, TERRITOIRE, 5, 2, 3))
+
+
+def test_meme_resultat_dans_un_autre_processus():
+    """Deux workers derrière le répartiteur servent les mêmes chiffres (pas de hash() salé)"""
+    script = EMPREINTE + f"\nprint(empreinte({TERRITOIRE!r}, 11))\n"
+    env = {**os.environ, 'PYTHONPATH': RACINE, 'PYTHONHASHSEED': '12345'}
+    sortie = subprocess.run([sys.executable, '-c', script], cwd=RACINE, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert sortie.strip().splitlines()[-1] == str(empreinte(TERRITOIRE, 11))
@@ -0,0 +1,76 @@
+# test_territory_store.py
+"""Stockage partagé des territoires : un seul chargement, verrou par territoire, LRU"""
+import threading
+import time
+
+import pandas as pd
+
+from retraites_engine import TerritoryDataStore, last_closed_month
+
+
+class SlowLoader:
+    """Chargeur factice : compte les appels, dure `duree` secondes"""
+
+    def __init__(self, duree=0.0):
+        self.duree = duree
+        self.appels = []
+        self._lock = threading.Lock()
+
+    def __call__(self, territory_code, seed):
+        with self._lock:
+            self.appels.append((territory_code, seed))
+        time.sleep(self.duree)
+        return {
+            'categories': {},
+            'historical_data': pd.DataFrame({'date': [last_closed_month()]}),
+            'current_data': pd.DataFrame({'categorie': ['A'], 'montant_mensuel': [1.0]}),
+            'donnees_reelles': False
+        }
+
+
+def test_chargement_unique_et_partage():
+    loader = SlowLoader()
+    store = TerritoryDataStore(loader=loader)
+    premiere = store.get('REUNION', 1)
+    assert store.get('REUNION', 1) is premiere
+    assert ('REUNION', 1) in store
+    store.get('REUNION', 2)
+    assert loader.appels == [('REUNION', 1), ('REUNION', 2)]
+
+
+def test_appels_concurrents_un_seul_chargement():
+    loader = SlowLoader(duree=0.2)
+    store = TerritoryDataStore(loader=loader)
+    resultats = []
+    fils = [threading.Thread(target=lambda: resultats.append(store.get('GUYANE', 1))) for _ in range(4)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+    assert loader.appels == [('GUYANE', 1)]
+    assert all(resultat is resultats[0] for resultat in resultats)
+
+
+def test_chargement_en_cours_ne_bloque_pas_les_autres_territoires():
+    loader = SlowLoader()
+    store = TerritoryDataStore(loader=loader)
+    store.get('REUNION', 1)
+    loader.duree = 0.5
+    fil = threading.Thread(target=store.get, args=('MAYOTTE', 1))
+    fil.start()
+    time.sleep(0.05)
+    debut = time.perf_counter()
+    store.get('REUNION', 1)
+    assert time.perf_counter() - debut < 0.1
+    fil.join()
+
+
+def test_eviction_lru():
+    store = TerritoryDataStore(max_entries=2, loader=SlowLoader())
+    store.get('REUNION', 1)
+    store.get('GUYANE', 1)
+    store.get('REUNION', 1)
+    store.get('MAYOTTE', 1)
+    assert ('REUNION', 1) in store and ('MAYOTTE', 1) in store
+    assert ('GUYANE', 1) not in store
+
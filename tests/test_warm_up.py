@@ -0,0 +1,71 @@
+# test_warm_up.py
+"""Préchargement : reprise dans le fil après un pool cassé, « prêt » seulement si complet"""
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pytest
+
+import retraites_engine
+from retraites_engine import TerritoryDataStore, TerritoryWarmUp, last_closed_month
+
+TERRITOIRES = ['REUNION', 'GUYANE', 'MAYOTTE']
+
+
+class BrokenPool:
+    """Pool dont chaque worker meurt : toutes les tâches échouent en BrokenProcessPool"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fonction, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker arrêté"))
+        return future
+
+
+def frames(territory_code, seed):
+    if territory_code == 'MAYOTTE' and seed == 666:
+        raise RuntimeError("source corrompue")
+    return {
+        'categories': {},
+        'historical_data': pd.DataFrame({'date': [last_closed_month()]}),
+        'current_data': pd.DataFrame({'categorie': ['A'], 'montant_mensuel': [1.0]})
+    }
+
+
+@pytest.fixture
+def ready_file(tmp_path, monkeypatch):
+    chemin = tmp_path / 'ready.json'
+    monkeypatch.setattr(retraites_engine, 'READY_FILE', str(chemin))
+    monkeypatch.setattr(retraites_engine, 'ProcessPoolExecutor', BrokenPool)
+    monkeypatch.setattr(retraites_engine, 'load_territory_frames', frames)
+    return chemin
+
+
+def test_pool_casse_chargement_dans_le_fil(ready_file):
+    store = TerritoryDataStore()
+    warm_up = TerritoryWarmUp(store, seed=1, territory_codes=TERRITOIRES)
+    assert warm_up.finished.wait(10)
+    status = warm_up.status()
+    assert status['pret'] and status['termine'] and not status['erreurs']
+    assert all((code, 1) in store for code in TERRITOIRES)
+    assert json.loads(ready_file.read_text())['territoires_charges'] == len(TERRITOIRES)
+
+
+def test_territoire_en_echec_pas_pret(ready_file):
+    store = TerritoryDataStore()
+    warm_up = TerritoryWarmUp(store, seed=666, territory_codes=TERRITOIRES)
+    assert warm_up.finished.wait(10)
+    status = warm_up.status()
+    assert status['termine'] and not status['pret'] and not warm_up.is_ready()
+    assert list(status['erreurs']) == ['MAYOTTE']
+    assert ('REUNION', 666) in store and ('GUYANE', 666) in store
+    assert not ready_file.exists()